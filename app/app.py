@@ -3,26 +3,77 @@ from flask import Flask
 from dotenv import load_dotenv
 from routes.index import index_bp
 from routes.api import api_bp
-from models import db, init_db
+from routes.sync import sync_bp
+from routes.bulk import bulk_bp
+from routes.batch import batch_bp
+from routes.stats import stats_bp
+from routes.search import search_bp
+from routes.products import products_bp
+from routes.health import health_bp
+from routes.tenants import tenants_bp
+from routes.admin import admin_bp
+from models import db, init_db, rebuild_search_index, search_index_aligned
+from models.db import configure_sqlite
+from email_alerts import start_alert_dispatcher
+from metrics import init_metrics, instrument_engine
+from idempotency import init_idempotency
+from tenants import init_tenants
+from response_cache import init_compression
+from low_stock import start_low_stock_sweeper
+from snapshots import start_snapshot_worker
 
 load_dotenv()
 
 app = Flask(__name__)
 
 app.config['SECRET_KEY'] = os.getenv('SESSION_TOKEN')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.getenv('STOCK_DB_PATH', os.path.join(
     os.path.dirname(os.path.abspath(__file__)), 'instances/stock.db'
-)
+))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = configure_sqlite(os.getenv('SQLITE_PROFILE', 'performance'))
 
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
 
 db.init_app(app)
 app.register_blueprint(index_bp)
 app.register_blueprint(api_bp)
+app.register_blueprint(sync_bp)
+app.register_blueprint(bulk_bp)
+app.register_blueprint(batch_bp)
+app.register_blueprint(stats_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(products_bp)
+app.register_blueprint(health_bp)
+app.register_blueprint(tenants_bp)
+app.register_blueprint(admin_bp)
+# Multi-site (TENANTS_DIR) : le site doit être choisi avant tout accès à la base
+tenant_pool = init_tenants(app, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+if tenant_pool is not None:
+    tenant_pool.on_create.append(instrument_engine)
+init_idempotency(app)
 
 with app.app_context():
+    init_metrics(app, db.engine)
     init_db()
 
+# Enregistrée après les métriques : elle s'exécute avant elles, la compression est comptée dans la latence
+init_compression(app)
+
+start_alert_dispatcher(app)
+start_low_stock_sweeper(app)
+start_snapshot_worker(app)
+
+
+@app.cli.command('reindex-search')
+def reindex_search():
+    """Reconstruit l'index de /api/search, désaligné par un VACUUM (rowid renumérotés)."""
+    with db.engine.begin() as conn:
+        if search_index_aligned(conn):
+            print("Index de recherche aligné : rien à faire")
+            return
+        rebuild_search_index(conn)
+    print("Index de recherche reconstruit")
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=DEBUG_MODE)
\ No newline at end of file
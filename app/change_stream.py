@@ -0,0 +1,122 @@
+"""Diffusion des changements aux clients connectés sur /api/stream (Server-Sent Events)
+
+Un ``ChangeBroker`` par site et par processus (``broker_for``). Il apprend les nouvelles révisions de deux façons :
+- immédiatement, par le hook ``on_revision_committed``, pour les écritures de ce worker ;
+- en relisant ``sync_state`` toutes les ``STREAM_POLL_INTERVAL`` secondes, pour celles des
+  autres workers (la base SQLite partagée sert de canal entre processus).
+Le delta entre deux révisions est calculé une fois et partagé par tous les abonnés
+qui en sont au même point.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from models import db, SyncState, on_revision_committed
+from tenants import current_tenant, tenant_context
+
+logger = logging.getLogger(__name__)
+
+# Nombre de deltas (since, until) gardés en mémoire
+_DELTA_CACHE_SIZE = 32
+
+
+class ChangeBroker:
+    """Réveille les abonnés quand la révision globale avance."""
+
+    def __init__(self, tenant=None):
+        self.tenant = tenant
+        self.poll_interval = float(os.getenv('STREAM_POLL_INTERVAL', '1'))
+        self.revision = None
+        self.subscribers = 0
+        self._cond = threading.Condition()
+        self._deltas = OrderedDict()
+        self._deltas_lock = threading.Lock()
+        self._app = None
+        self._poller = None
+        self._stop_event = threading.Event()
+
+    def publish(self, revision):
+        with self._cond:
+            if self.revision is None or revision > self.revision:
+                self.revision = revision
+                self._cond.notify_all()
+
+    def subscribe(self, app):
+        with self._cond:
+            self.subscribers += 1
+            # Réveille le poller endormi faute d'abonnés (sinon seul un publish local le relance)
+            self._cond.notify_all()
+            if self._poller is None:
+                self._app = app
+                name = f'change-stream-{self.tenant}' if self.tenant else 'change-stream'
+                self._poller = threading.Thread(target=self._poll, name=name, daemon=True)
+                self._poller.start()
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait(self, after, timeout):
+        """Attend une révision différente de ``after`` ; renvoie la révision connue (inchangée si timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.revision is not None and self.revision != after, timeout)
+            return self.revision
+
+    def _poll(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                # Personne n'écoute : inutile d'interroger la base
+                self._cond.wait_for(lambda: self.subscribers > 0 or self._stop_event.is_set())
+            if self._stop_event.is_set():
+                return
+            try:
+                with tenant_context(self._app, self.tenant):
+                    revision = db.session.query(SyncState.revision).filter_by(id=1).scalar() or 0
+                    db.session.rollback()
+                with self._cond:
+                    if revision != self.revision:
+                        # Un retour en arrière (base recréée) est aussi signalé : les clients se réinitialisent
+                        self.revision = revision
+                        self._cond.notify_all()
+            except Exception:
+                logger.exception("Flux de changements : lecture de la révision impossible")
+            self._stop_event.wait(self.poll_interval)
+
+    def delta(self, since, until, build):
+        """Delta ``]since, until]`` sérialisé, calculé une seule fois par ``build``."""
+        key = (since, until)
+        with self._deltas_lock:
+            payload = self._deltas.get(key)
+            if payload is None:
+                payload = json.dumps(build(since, until), ensure_ascii=False, separators=(',', ':'))
+                self._deltas[key] = payload
+                if len(self._deltas) > _DELTA_CACHE_SIZE:
+                    self._deltas.popitem(last=False)
+            else:
+                self._deltas.move_to_end(key)
+        return payload
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def broker_for(tenant):
+    """Broker du site ``tenant`` (``None`` en mode mono-site), créé au premier usage."""
+    broker = _brokers.get(tenant)
+    if broker is None:
+        with _brokers_lock:
+            broker = _brokers.setdefault(tenant, ChangeBroker(tenant))
+    return broker
+
+
+@on_revision_committed
+def _publish_revision(revision):
+    broker_for(current_tenant()).publish(revision)
@@ -1,58 +1,262 @@
-"""Envoi d'email quand un produit passe sous le seuil de stock"""
+"""Envoi d'email quand un produit passe sous le seuil de stock
+
+Les routes ne parlent plus au serveur SMTP : elles déposent l'alerte dans la table
+``alert_outbox`` (dans la même transaction que la modification du produit) et un
+thread de fond regroupe les alertes d'une courte fenêtre en un seul email.
+"""
 import logging
 import os
 import smtplib
+import socket
+import threading
+import time
+from datetime import timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from models import db, AlertOutbox
+from metrics import smtp_send_seconds
+from models.db import utcnow
+from tenants import tenant_context, tenants_with_rows
+
 logger = logging.getLogger(__name__)
 
 
-def send_low_stock_alert(product, category):
+def queue_low_stock_alerts(rows, conn=None):
     """
-    Envoie un email à ALERT_EMAIL si la config SMTP est présente.
+    Met en file des alertes (un seul executemany) : ``rows`` sont des dicts aux colonnes
+    de ``alert_outbox``. Ne commit pas : elles partent avec la transaction en cours
+    (celle de ``conn`` si elle est donnée, sinon celle de la session).
     """
+    if rows:
+        now = utcnow()
+        (conn or db.session).execute(
+            db.insert(AlertOutbox), [{'created_at': now, 'attempts': 0, **row} for row in rows],
+        )
+
+
+def _smtp_config():
+    """Lit la config SMTP depuis l'environnement ; None si elle est incomplète."""
     to_email = os.getenv('ALERT_EMAIL', '').strip()
     host = os.getenv('SMTP_HOST', '').strip()
     user = os.getenv('SMTP_USER', '').strip()
-    password = os.getenv('SMTP_PASSWORD', '')
-    if not to_email or not host or not user or not password:
+    if not to_email or not host:
         logger.warning(
             "Alerte stock faible : envoi ignoré (config SMTP incomplète: ALERT_EMAIL=%s, SMTP_HOST=%s, SMTP_USER=%s)",
             "ok" if to_email else "manquant",
             "ok" if host else "manquant",
             "ok" if user else "manquant",
         )
-        return
-
-    port = int(os.getenv('SMTP_PORT', '587'))
-    from_email = os.getenv('SMTP_FROM', user).strip()
-    threshold = product.low_stock_threshold if product.low_stock_threshold is not None else 5
-    qty_display = str(product.qty) if product.qty is not None else '?'
-    unit = (product.unit or '').strip()
-    unit_suffix = f' {unit}' if unit else ''
-
-    subject = f"[Poulstock] Stock faible — {product.name}"
-    body = (
-        f"Le produit « {product.name} » (catégorie {category.name}) "
-        f"est passé sous le seuil minimal.\n\n"
-        f"Quantité actuelle : {qty_display}{unit_suffix}\n"
-        f"Seuil minimal : {threshold}{unit_suffix}\n\n"
-        "Pensez à réapprovisionner, bisous !"
+        return None
+    return {
+        'to_email': to_email,
+        'host': host,
+        'port': int(os.getenv('SMTP_PORT', '587')),
+        'user': user,
+        'password': os.getenv('SMTP_PASSWORD', ''),
+        'from_email': os.getenv('SMTP_FROM', '').strip() or user or to_email,
+        'starttls': os.getenv('SMTP_STARTTLS', 'true').lower() == 'true',
+    }
+
+
+def _format_alert(alert):
+    qty_display = str(alert.qty) if alert.qty is not None else '?'
+    unit_suffix = f' {alert.unit}' if alert.unit else ''
+    return (
+        f"« {alert.product_name} » (catégorie {alert.category_name}) : "
+        f"{qty_display}{unit_suffix} (seuil minimal : {alert.threshold}{unit_suffix})"
     )
 
+
+def build_digest(alerts, from_email, to_email):
+    """Construit un seul email pour une liste d'alertes (la plus récente par produit)."""
+    latest = {}
+    for alert in alerts:
+        latest[alert.product_id or alert.id] = alert
+    alerts = sorted(latest.values(), key=lambda a: (a.category_name, a.product_name))
+
+    if len(alerts) == 1:
+        alert = alerts[0]
+        subject = f"[Poulstock] Stock faible — {alert.product_name}"
+        body = (
+            f"Le produit {_format_alert(alert)} est passé sous le seuil minimal.\n\n"
+            "Pensez à réapprovisionner, bisous !"
+        )
+    else:
+        subject = f"[Poulstock] Stock faible — {len(alerts)} produits"
+        lines = '\n'.join(f"- {_format_alert(a)}" for a in alerts)
+        body = (
+            "Les produits suivants sont passés sous leur seuil minimal :\n\n"
+            f"{lines}\n\n"
+            "Pensez à réapprovisionner, bisous !"
+        )
+
     msg = MIMEMultipart('alternative')
     msg['Subject'] = subject
     msg['From'] = from_email
     msg['To'] = to_email
     msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    return msg
+
+
+class SmtpLink:
+    """Connexion SMTP gardée ouverte entre deux envois et rouverte si le relais l'a coupée."""
+
+    def __init__(self, config):
+        self.config = config
+        # Au-delà de cette inactivité, la connexion est fermée plutôt que gardée ouverte
+        self.idle_timeout = float(os.getenv('SMTP_IDLE_TIMEOUT', '120'))
+        self._server = None
+        self._last_used = 0.0
 
-    try:
-        logger.info("Envoi alerte stock faible : %s -> %s", product.name, to_email)
-        with smtplib.SMTP(host, port) as server:
+    def _connect(self):
+        cfg = self.config
+        server = smtplib.SMTP(cfg['host'], cfg['port'], timeout=30)
+        if cfg['starttls']:
             server.starttls()
-            server.login(user, password)
-            server.sendmail(from_email, [to_email], msg.as_string())
-        logger.info("Alerte stock faible envoyée avec succès pour %s", product.name)
-    except Exception as e:
-        logger.exception("Échec envoi alerte stock faible pour %s : %s", product.name, e)
+        if cfg['user']:
+            server.login(cfg['user'], cfg['password'])
+        return server
+
+    def _alive(self):
+        if self._server is None:
+            return False
+        if time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+            return False
+        try:
+            return self._server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            self.close()
+            return False
+
+    def send(self, msg):
+        started = time.perf_counter()
+        try:
+            self._send(msg)
+        except Exception:
+            smtp_send_seconds.observe(time.perf_counter() - started, 'error')
+            raise
+        smtp_send_seconds.observe(time.perf_counter() - started, 'sent')
+
+    def _send(self, msg):
+        cfg = self.config
+        if not self._alive():
+            self._server = self._connect()
+        try:
+            self._server.sendmail(cfg['from_email'], [cfg['to_email']], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # Le relais a fermé la connexion entre le NOOP et l'envoi : une seule reconnexion
+            self._server = self._connect()
+            self._server.sendmail(cfg['from_email'], [cfg['to_email']], msg.as_string())
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+class AlertDispatcher(threading.Thread):
+    """
+    Vide périodiquement ``alert_outbox``. Chaque worker gunicorn a le sien ; les
+    lots sont réclamés par un UPDATE atomique pour qu'une alerte ne parte qu'une fois.
+    """
+
+    def __init__(self, app):
+        super().__init__(name='alert-dispatcher', daemon=True)
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # Délai de regroupement : on attend que la plus ancienne alerte ait cet âge avant d'envoyer
+        self.digest_window = float(os.getenv('ALERT_DIGEST_WINDOW', '30'))
+        # Fréquence à laquelle la file est consultée
+        self.poll_interval = float(os.getenv('ALERT_POLL_INTERVAL', '5'))
+        # Délai avant de retenter un lot en échec (ou réclamé par un worker mort)
+        self.retry_delay = float(os.getenv('ALERT_RETRY_DELAY', '60'))
+        self._stop_event = threading.Event()
+        self._link = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            # Seuls les sites ayant des alertes en attente sont ouverts
+            for tenant in tenants_with_rows('alert_outbox'):
+                try:
+                    with tenant_context(self.app, tenant):
+                        self.flush()
+                except Exception:
+                    logger.exception("Dispatcher d'alertes : échec du traitement de la file (site %s)", tenant or 'par défaut')
+        if self._link is not None:
+            self._link.close()
+
+    def flush(self, force=False):
+        """Envoie un récapitulatif si la plus ancienne alerte en attente a dépassé la fenêtre."""
+        now = utcnow()
+        ready = db.or_(
+            AlertOutbox.claimed_at.is_(None),
+            AlertOutbox.claimed_at < now - timedelta(seconds=self.retry_delay),
+        )
+        oldest = db.session.query(db.func.min(AlertOutbox.created_at)).filter(ready).scalar()
+        if oldest is None:
+            return 0
+        if not force and now - oldest < timedelta(seconds=self.digest_window):
+            return 0
+
+        AlertOutbox.query.filter(ready).update(
+            {'claimed_by': self.worker_id, 'claimed_at': now}, synchronize_session=False
+        )
+        db.session.commit()
+        alerts = (
+            AlertOutbox.query
+            .filter_by(claimed_by=self.worker_id, claimed_at=now)
+            .order_by(AlertOutbox.created_at)
+            .all()
+        )
+        if not alerts:
+            return 0
+
+        config = _smtp_config()
+        if config is None:
+            self._drop(alerts)
+            return 0
+
+        msg = build_digest(alerts, config['from_email'], config['to_email'])
+        try:
+            if self._link is None or self._link.config != config:
+                if self._link is not None:
+                    self._link.close()
+                self._link = SmtpLink(config)
+            logger.info("Envoi alerte stock faible (%d produit(s)) -> %s", len(alerts), config['to_email'])
+            self._link.send(msg)
+        except Exception as e:
+            logger.exception("Échec envoi alerte stock faible (%d produit(s)) : %s", len(alerts), e)
+            for alert in alerts:
+                alert.claimed_by = None
+                alert.attempts += 1
+            db.session.commit()
+            return 0
+
+        self._drop(alerts)
+        logger.info("Alerte stock faible envoyée avec succès (%d produit(s))", len(alerts))
+        return len(alerts)
+
+    def _drop(self, alerts):
+        AlertOutbox.query.filter(AlertOutbox.id.in_([a.id for a in alerts])).delete(synchronize_session=False)
+        db.session.commit()
+
+
+_dispatcher = None
+
+
+def start_alert_dispatcher(app):
+    """Démarre (une seule fois par processus) le thread d'envoi des alertes."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = AlertDispatcher(app)
+        _dispatcher.start()
+    return _dispatcher
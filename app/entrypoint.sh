@@ -1,3 +1,4 @@
 #!/bin/sh
 
-gunicorn --bind 0.0.0.0:5000 --access-logfile - --error-logfile - "app:app"
\ No newline at end of file
+# Workers gevent : les connexions /api/stream inactives ne bloquent pas un worker chacune
+gunicorn --bind 0.0.0.0:5000 --worker-class gevent --worker-connections 1000 --access-logfile - --error-logfile - "app:app"
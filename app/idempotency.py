@@ -0,0 +1,95 @@
+"""Écritures idempotentes : en-tête ``Idempotency-Key`` sur les requêtes d'écriture de /api
+
+Le service worker rejoue les écritures faites hors ligne ; si la première tentative est
+arrivée au serveur mais que la réponse s'est perdue, le rejeu ne doit rien refaire. La
+réponse d'une écriture réussie est enregistrée sous sa clé dans la même transaction que
+l'écriture : une clé déjà vue renvoie la réponse d'origine sans rien exécuter.
+Les clés expirent après ``IDEMPOTENCY_TTL`` secondes (24 h par défaut).
+"""
+import os
+import time
+from datetime import timedelta
+
+from flask import current_app, g, request
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdempotencyKey
+from models.db import utcnow
+from tenants import current_tenant
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL = 60   # secondes entre deux purges des clés expirées (par processus)
+
+_WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+_last_purge = {}     # site -> instant de la dernière purge
+
+
+def _ttl():
+    return float(os.getenv('IDEMPOTENCY_TTL', '86400'))
+
+
+def _purge_expired():
+    now = time.monotonic()
+    tenant = current_tenant()
+    if now - _last_purge.get(tenant, 0.0) < PURGE_INTERVAL:
+        return
+    _last_purge[tenant] = now
+    cutoff = utcnow() - timedelta(seconds=_ttl())
+    db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+    db.session.commit()
+
+
+def _replay(stored):
+    response = current_app.response_class(stored.body, status=stored.status, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _check_key():
+    key = request.headers.get(HEADER)
+    if not key or request.method not in _WRITE_METHODS or not request.path.startswith('/api/'):
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        return {'error': f'{HEADER} trop longue (max {MAX_KEY_LENGTH} caractères)'}, 400
+
+    _purge_expired()
+    stored = db.session.get(IdempotencyKey, key)
+    if stored is None:
+        g.idempotency_key = key
+        return None
+    if stored.method != request.method or stored.path != request.path:
+        return {'error': f'{HEADER} déjà utilisée pour une autre requête'}, 422
+    return _replay(stored)
+
+
+def commit_idempotent(commit, body, status):
+    """
+    Enregistre ``(body, status)`` sous la clé de la requête puis appelle ``commit()``.
+    Renvoie ``None``, ou la réponse déjà stockée si une requête concurrente portant
+    la même clé a commité la première (l'écriture en cours est alors annulée).
+    """
+    key = g.get('idempotency_key')
+    if key is None:
+        commit()
+        return None
+    db.session.add(IdempotencyKey(
+        key=key,
+        method=request.method,
+        path=request.path,
+        status=status,
+        body=current_app.json.dumps(body).encode('utf-8'),
+    ))
+    try:
+        commit()
+    except IntegrityError:
+        db.session.rollback()
+        stored = db.session.get(IdempotencyKey, key)
+        if stored is None:
+            raise
+        return _replay(stored)
+    return None
+
+
+def init_idempotency(app):
+    app.before_request(_check_key)
@@ -0,0 +1,136 @@
+"""Évaluation du stock faible : une seule règle, appliquée en SQL sur un ensemble de produits
+
+Seuil effectif = seuil du produit, sinon celui de sa catégorie, sinon ``LOW_STOCK_THRESHOLD``
+(5 par défaut). ``products.low_stock_alert_sent`` vaut 1 tant que le produit est sous ce
+seuil : il est basculé en masse par ``evaluate`` et sert d'index à ``GET /api/low-stock``.
+Chaque passage 0 -> 1 met une alerte dans ``alert_outbox``, dans la même transaction.
+"""
+import logging
+import os
+import threading
+
+from sqlalchemy import bindparam
+
+from models import db
+from email_alerts import queue_low_stock_alerts
+from tenants import open_tenants, tenant_context
+
+logger = logging.getLogger(__name__)
+
+
+def default_threshold():
+    return int(os.getenv('LOW_STOCK_THRESHOLD', '5'))
+
+
+EFFECTIVE_THRESHOLD_SQL = """COALESCE(
+    products.low_stock_threshold,
+    (SELECT categories.low_stock_threshold FROM categories WHERE categories.id = products.category_id),
+    :default_threshold
+)"""
+
+_IS_LOW_SQL = f"(products.qty IS NOT NULL AND products.qty <= {EFFECTIVE_THRESHOLD_SQL})"
+
+# Ne touche que les lignes dont l'état change ; renvoie de quoi construire les alertes
+_EVALUATE_SQL = f"""
+    UPDATE products
+    SET low_stock_alert_sent = {_IS_LOW_SQL}
+    WHERE ({{scope}}) AND low_stock_alert_sent IS NOT {_IS_LOW_SQL}
+    RETURNING id, name, qty, unit, low_stock_alert_sent,
+              {EFFECTIVE_THRESHOLD_SQL} AS threshold,
+              (SELECT name FROM categories WHERE categories.id = products.category_id) AS category_name
+"""
+
+_BY_IDS = db.text(_EVALUATE_SQL.format(scope='products.id IN :ids')).bindparams(bindparam('ids', expanding=True))
+_BY_CATEGORY = db.text(_EVALUATE_SQL.format(scope='products.category_id = :category_id'))
+_ALL = db.text(_EVALUATE_SQL.format(scope='1'))
+
+
+def _apply(statement, params, conn=None):
+    if conn is None:
+        db.session.flush()
+    rows = (conn or db.session).execute(statement, {'default_threshold': default_threshold(), **params}).all()
+    newly_low = [row for row in rows if row.low_stock_alert_sent]
+    queue_low_stock_alerts([
+        {
+            'product_id': row.id,
+            'product_name': row.name,
+            'category_name': row.category_name or '',
+            'qty': row.qty,
+            'unit': (row.unit or '').strip(),
+            'threshold': row.threshold,
+        }
+        for row in newly_low
+    ], conn)
+    return len(newly_low), len(rows) - len(newly_low)
+
+
+def evaluate_products(product_ids):
+    """Réévalue les produits donnés ; renvoie ``(passés sous le seuil, revenus au-dessus)``."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0, 0
+    return _apply(_BY_IDS, {'ids': product_ids})
+
+
+def evaluate_category(category_id):
+    """Réévalue tous les produits d'une catégorie (changement de seuil de catégorie)."""
+    return _apply(_BY_CATEGORY, {'category_id': category_id})
+
+
+def evaluate_all(conn=None):
+    """
+    Balayage complet (seuil global modifié, données éditées hors de l'application...).
+    ``conn`` : connexion à utiliser hors session (migrations).
+    """
+    return _apply(_ALL, {}, conn)
+
+
+class LowStockSweeper(threading.Thread):
+    """Réévalue périodiquement tout le stock ; les nouvelles alertes partent dans un seul récapitulatif."""
+
+    def __init__(self, app):
+        super().__init__(name='low-stock-sweeper', daemon=True)
+        self.app = app
+        # 0 désactive le balayage
+        self.interval = float(os.getenv('LOW_STOCK_SWEEP_INTERVAL', '3600'))
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        # Premier passage au démarrage : rattrape ce qui a changé pendant l'arrêt.
+        # En multi-site, seuls les sites déjà ouverts par ce processus sont balayés : les ouvrir
+        # tous ferait tourner le LRU et fermerait les moteurs des requêtes en cours.
+        while True:
+            for tenant in open_tenants():
+                try:
+                    with tenant_context(self.app, tenant, open_only=True) as is_open:
+                        if is_open:
+                            self.sweep()
+                except Exception:
+                    logger.exception("Balayage stock faible : échec (site %s)", tenant or 'par défaut')
+            if self._stop_event.wait(self.interval):
+                return
+
+    def sweep(self):
+        newly_low, recovered = evaluate_all()
+        db.session.commit()
+        if newly_low or recovered:
+            logger.info(
+                "Balayage stock faible : %d produit(s) sous le seuil, %d revenu(s) au-dessus",
+                newly_low, recovered,
+            )
+        return newly_low, recovered
+
+
+_sweeper = None
+
+
+def start_low_stock_sweeper(app):
+    """Démarre (une seule fois par processus) le balayage périodique, sauf si l'intervalle vaut 0."""
+    global _sweeper
+    if _sweeper is None and float(os.getenv('LOW_STOCK_SWEEP_INTERVAL', '3600')) > 0:
+        _sweeper = LowStockSweeper(app)
+        _sweeper.start()
+    return _sweeper
@@ -0,0 +1,222 @@
+"""Métriques au format texte Prometheus, exposées sur /metrics
+
+Compteurs et histogrammes en mémoire, propres à chaque processus (gunicorn ne lance
+qu'un worker gevent : un scrape voit tout). Trois sources :
+- les requêtes Flask (latence par endpoint, nombre et durée des requêtes SQL par requête) ;
+- les événements du moteur SQLAlchemy ;
+- des appels explicites depuis les modules (envoi SMTP, caches).
+Avec ``PROFILE_SLOW_REQUESTS_MS``, chaque requête passe sous cProfile et celles qui
+dépassent ce seuil sont enregistrées dans ``PROFILE_DIR``.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Secondes : de la requête SQL triviale à la requête HTTP très lente
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+_registry = []
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(n, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for n, v in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}     # valeurs des labels -> [compte par bucket..., +Inf, somme]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                labels = _format_labels(self.labels + ('le',), label_values + (bound,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+http_request_seconds = Histogram(
+    'poulstock_http_request_duration_seconds', 'Durée des requêtes HTTP', ('endpoint', 'method', 'status'),
+)
+http_sql_statements = Histogram(
+    'poulstock_http_sql_statements', 'Requêtes SQL émises par requête HTTP', ('endpoint',), COUNT_BUCKETS,
+)
+http_sql_seconds = Histogram(
+    'poulstock_http_sql_duration_seconds', 'Temps SQL cumulé par requête HTTP', ('endpoint',),
+)
+sql_statement_seconds = Histogram(
+    'poulstock_sql_statement_duration_seconds', 'Durée de chaque requête SQL', ('statement',),
+)
+smtp_send_seconds = Histogram(
+    'poulstock_smtp_send_duration_seconds', "Durée d'envoi d'un email d'alerte", ('outcome',),
+)
+cache_requests = Counter(
+    'poulstock_cache_requests_total', 'Consultations des caches de réponses', ('cache', 'result'),
+)
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _statement_kind(statement):
+    # Premier mot seulement : des étiquettes en nombre borné
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return word if word in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'PRAGMA') else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    sql_statement_seconds.observe(elapsed, _statement_kind(statement))
+    if has_request_context() and hasattr(g, 'metrics_sql'):
+        g.metrics_sql[0] += 1
+        g.metrics_sql[1] += elapsed
+
+
+def _on_error(context):
+    # La requête a échoué : after_cursor_execute ne sera pas appelé
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+
+def _profile_threshold():
+    value = os.getenv('PROFILE_SLOW_REQUESTS_MS', '').strip()
+    return float(value) / 1000 if value else None
+
+
+def _dump_profile(profiler, elapsed):
+    profile_dir = os.getenv('PROFILE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'instances', 'profiles'
+    )
+    os.makedirs(profile_dir, exist_ok=True)
+    endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+    path = os.path.join(profile_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint}-{int(elapsed * 1000)}ms.prof')
+    profiler.dump_stats(path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(15)
+    logger.warning(
+        "Requête lente %s %s : %.0f ms (profil : %s)\n%s",
+        request.method, request.path, elapsed * 1000, path, summary.getvalue(),
+    )
+
+
+def instrument_engine(engine):
+    """Mesure les requêtes SQL de ``engine`` (appelée aussi pour chaque base de site ouverte)."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _on_error)
+
+
+def init_metrics(app, engine):
+    """Branche la mesure des requêtes sur ``app`` et celle du SQL sur ``engine``."""
+    instrument_engine(engine)
+    profile_threshold = _profile_threshold()
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+        if profile_threshold is not None:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return  # un autre profileur tourne déjà dans ce thread (greenlets concurrents)
+            g.metrics_profiler = profiler
+            g.metrics_profile_start = g.metrics_start
+
+    @app.after_request
+    def _record(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        http_request_seconds.observe(elapsed, endpoint, request.method, response.status_code)
+        statements, sql_time = g.pop('metrics_sql')
+        http_sql_statements.observe(statements, endpoint)
+        http_sql_seconds.observe(sql_time, endpoint)
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(_exc):
+        # Ici et non dans after_request : appelé même si la requête lève. Un profileur resté
+        # actif ferait échouer tous les enable() suivants de ce thread, sans bruit
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        elapsed = time.perf_counter() - g.pop('metrics_profile_start')
+        if elapsed >= profile_threshold:
+            try:
+                _dump_profile(profiler, elapsed)
+            except Exception:
+                logger.exception("Profil de requête lente : écriture impossible")
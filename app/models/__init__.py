@@ -1,28 +1,18 @@
 from models.db import db
 from models.category import Category
 from models.product import Product
+from models.alert import AlertOutbox
+from models.idempotency import IdempotencyKey
+from models.audit import AuditLog, record_audit
+from models.change import (
+    Change, SyncState, current_revision, next_revision, on_revision_committed, pruned_revision, record_change,
+    touch,
+)
+from models.movement import StockMovement, StockDaily, record_movement, record_movements
+from models.search import init_search_index, match_expression, rebuild_search_index, search_index_aligned
+from models.migrations import migrate, schema_version
 
 
-def init_db():
-    db.create_all()
-
-    from sqlalchemy import text, inspect
-    inspector = inspect(db.engine)
-
-    # Migration : ajouter low_stock_threshold aux produits si la colonne est absente
-    product_cols = [col['name'] for col in inspector.get_columns('products')]
-    if 'low_stock_threshold' not in product_cols:
-        with db.engine.connect() as conn:
-            conn.execute(text('ALTER TABLE products ADD COLUMN low_stock_threshold INTEGER DEFAULT 5'))
-            conn.commit()
-    if 'low_stock_alert_sent' not in product_cols:
-        with db.engine.connect() as conn:
-            conn.execute(text('ALTER TABLE products ADD COLUMN low_stock_alert_sent INTEGER DEFAULT 0'))
-            conn.commit()
-
-    # Migration : ajouter sort_order aux catégories si la colonne est absente
-    cat_cols = [col['name'] for col in inspector.get_columns('categories')]
-    if 'sort_order' not in cat_cols:
-        with db.engine.connect() as conn:
-            conn.execute(text('ALTER TABLE categories ADD COLUMN sort_order INTEGER DEFAULT 0'))
-            conn.commit()
+def init_db(engine=None):
+    """Met le schéma de ``engine`` (par défaut la base de l'application) à jour, voir models/migrations.py."""
+    return migrate(db.engine if engine is None else engine)
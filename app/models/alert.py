@@ -0,0 +1,18 @@
+from models.db import db, utcnow
+
+
+class AlertOutbox(db.Model):
+    """Alerte de stock faible en attente d'envoi (file durable lue par le dispatcher)."""
+    __tablename__ = "alert_outbox"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    product_id = db.Column(db.String)
+    product_name = db.Column(db.String, nullable=False)
+    category_name = db.Column(db.String, nullable=False)
+    qty = db.Column(db.Integer)
+    unit = db.Column(db.String, default="", nullable=False)
+    threshold = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+    claimed_by = db.Column(db.String)
+    claimed_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
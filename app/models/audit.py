@@ -0,0 +1,71 @@
+from flask import has_request_context, request
+
+from models.db import db, utcnow
+
+
+class AuditLog(db.Model):
+    """
+    Journal d'audit en ajout seul (triggers posés par la migration 2) : l'image complète
+    de chaque catégorie / produit après chaque écriture, ou sa suppression. Rejouer les
+    dernières images jusqu'à un instant donné redonne l'état de la base à cet instant.
+    """
+    __tablename__ = "audit_log"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    at = db.Column(db.DateTime, nullable=False, index=True)
+    revision = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String, nullable=False)      # 'category' | 'product'
+    entity_id = db.Column(db.String, nullable=False)
+    op = db.Column(db.String, nullable=False)          # 'upsert' | 'delete'
+    data = db.Column(db.Text)                          # ligne JSON après écriture, NULL si supprimée
+    method = db.Column(db.String)
+    path = db.Column(db.String)
+
+
+# Colonnes rejouées par la restauration (revision et low_stock_alert_sent sont recalculées)
+CATEGORY_COLUMNS = ('id', 'name', 'icon', 'color', 'sort_order', 'low_stock_threshold')
+PRODUCT_COLUMNS = ('id', 'category_id', 'name', 'qty', 'unit', 'note', 'grp', 'low_stock_threshold')
+
+
+def _json_object(alias, columns):
+    return 'json_object({})'.format(', '.join(f"'{col}', {alias}.{col}" for col in columns))
+
+
+# Dernière opération de chaque entité dans la révision ; l'image est lue dans la table elle-même
+_AUDIT_SQL = """
+    INSERT INTO audit_log (at, revision, entity, entity_id, op, data, method, path)
+    SELECT :at, c.revision, c.entity, c.entity_id, c.op,
+           CASE WHEN c.op = 'upsert' THEN (SELECT {image} FROM {table} t WHERE t.id = c.entity_id) END,
+           :method, :path
+    FROM changes c
+    WHERE c.id IN (
+        SELECT MAX(id) FROM changes WHERE revision = :revision AND entity = :entity GROUP BY entity_id
+    )
+    ORDER BY c.id
+"""
+_AUDIT = {
+    'category': db.text(_AUDIT_SQL.format(
+        image=_json_object('t', CATEGORY_COLUMNS), table='categories',
+    )).bindparams(db.bindparam('at', type_=db.DateTime)),
+    'product': db.text(_AUDIT_SQL.format(
+        image=_json_object('t', PRODUCT_COLUMNS), table='products',
+    )).bindparams(db.bindparam('at', type_=db.DateTime)),
+}
+
+
+def record_audit():
+    """
+    Copie dans ``audit_log`` les entités journalisées par la révision de la transaction
+    en cours. À appeler juste avant le commit, une fois toutes les écritures faites.
+    """
+    revision = db.session.info.get('revision')
+    if revision is None:
+        return
+    params = {
+        'at': utcnow(),
+        'revision': revision,
+        'method': request.method if has_request_context() else None,
+        'path': request.path if has_request_context() else None,
+    }
+    for entity, statement in _AUDIT.items():
+        db.session.execute(statement, {**params, 'entity': entity})
@@ -3,6 +3,9 @@ from models.db import db
 
 class Category(db.Model):
     __tablename__ = "categories"
+    __table_args__ = (
+        db.Index("ix_categories_sort_order_name", "sort_order", "name"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String, nullable=False)
@@ -10,5 +13,6 @@ class Category(db.Model):
     color = db.Column(db.String, nullable=False)
     sort_order = db.Column(db.Integer, default=0)
     low_stock_threshold = db.Column(db.Integer, default=5)
+    revision = db.Column(db.Integer, default=0, nullable=False)
 
     products = db.relationship("Product", back_populates="category", cascade="all, delete-orphan")
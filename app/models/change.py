@@ -0,0 +1,125 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.db import db
+
+
+class Change(db.Model):
+    """Journal des modifications lu par ``GET /api/changes`` (une ligne par entité touchée)."""
+    __tablename__ = "changes"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    revision = db.Column(db.Integer, nullable=False, index=True)
+    entity = db.Column(db.String, nullable=False)      # 'category' | 'product'
+    entity_id = db.Column(db.String, nullable=False)
+    op = db.Column(db.String, nullable=False)          # 'upsert' | 'delete'
+
+
+class SyncState(db.Model):
+    """Ligne unique portant la révision globale des données."""
+    __tablename__ = "sync_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    # Révisions <= pruned_revision purgées de ``changes`` : un client plus ancien recharge tout
+    pruned_revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+
+def current_revision():
+    rev = db.session.query(SyncState.revision).filter_by(id=1).scalar()
+    return rev or 0
+
+
+def pruned_revision():
+    """Horizon du journal : ``]since, ...]`` n'est complet que pour ``since >= pruned_revision()``."""
+    return db.session.query(SyncState.pruned_revision).filter_by(id=1).scalar() or 0
+
+
+def _prune_changes(revision):
+    """
+    Ne garde que les ``CHANGES_RETENTION`` dernières révisions du journal (0 : tout garder).
+    Fait toutes les ``CHANGES_PRUNE_EVERY`` révisions, dans la transaction d'écriture qui
+    l'alloue : la suppression ne porte que sur les révisions sorties depuis la dernière fois.
+    """
+    retention = int(os.getenv('CHANGES_RETENTION', '10000'))
+    every = max(1, int(os.getenv('CHANGES_PRUNE_EVERY', '100')))
+    if retention <= 0 or revision % every or revision <= retention:
+        return
+    horizon = revision - retention
+    db.session.execute(db.delete(Change).where(Change.revision <= horizon))
+    db.session.execute(
+        db.text('UPDATE sync_state SET pruned_revision = MAX(pruned_revision, :horizon) WHERE id = 1'),
+        {'horizon': horizon},
+    )
+
+
+def next_revision():
+    """
+    Révision de la transaction en cours. Elle est allouée au premier changement
+    puis réutilisée jusqu'au commit : une requête = une révision.
+    """
+    session = db.session()
+    rev = session.info.get('revision')
+    if rev is None:
+        rev = db.session.execute(
+            db.text('UPDATE sync_state SET revision = revision + 1 WHERE id = 1 RETURNING revision')
+        ).scalar_one()
+        session.info['revision'] = rev
+        _prune_changes(rev)
+    return rev
+
+
+def record_change(entity, entity_ids, op='upsert'):
+    """Inscrit ``entity_ids`` au journal et renvoie la révision de la transaction."""
+    rev = next_revision()
+    rows = [
+        {'revision': rev, 'entity': entity, 'entity_id': str(entity_id), 'op': op}
+        for entity_id in entity_ids
+    ]
+    if rows:
+        db.session.execute(db.insert(Change), rows)
+    return rev
+
+
+def touch(*objs):
+    """Marque des catégories / produits comme modifiés (journal + révision de ligne)."""
+    from models.category import Category
+    from models.product import Product
+
+    rev = next_revision()
+    for entity, cls in (('category', Category), ('product', Product)):
+        items = [o for o in objs if isinstance(o, cls)]
+        if items:
+            record_change(entity, [o.id for o in items])
+            for o in items:
+                o.revision = rev
+    return rev
+
+
+_revision_listeners = []
+
+
+def on_revision_committed(fn):
+    """Enregistre ``fn(revision)``, appelée après chaque commit ayant produit une révision."""
+    _revision_listeners.append(fn)
+    return fn
+
+
+@event.listens_for(Session, 'after_commit')
+def _revision_committed(session):
+    if session.in_nested_transaction():
+        # SAVEPOINT libéré : la transaction racine, et sa révision, continuent
+        return
+    rev = session.info.pop('revision', None)
+    if rev is not None:
+        for fn in _revision_listeners:
+            fn(rev)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _reset_revision(session, transaction):
+    # Un SAVEPOINT annulé ne libère pas la révision : elle appartient à la transaction racine
+    if transaction.parent is None:
+        session.info.pop('revision', None)
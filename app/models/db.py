@@ -1,8 +1,67 @@
+from datetime import datetime, timezone
+
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
 
-db = SQLAlchemy()
+
+class TenantSession(Session):
+    """Session liée à la base du site courant (``g.tenant_engine``, posé par tenants.py), sinon à la base par défaut."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            engine = g.get('tenant_engine')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': TenantSession})
+
+# Profils de réglage SQLite (variable SQLITE_PROFILE)
+SQLITE_PROFILES = {
+    # Comportement d'origine : journal rollback, écritures sérialisées avec les lectures
+    'legacy': {
+        'pragmas': {'journal_mode': 'DELETE'},
+        'busy_timeout_ms': 5000,
+        'pool_size': 5,
+    },
+    # Plusieurs workers gunicorn : lecteurs et rédacteur ne se bloquent plus (WAL)
+    'performance': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',      # sûr en WAL : seul le dernier commit peut être perdu sur coupure
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -32 * 1024,     # en Kio (négatif) : 32 Mio par connexion
+            'temp_store': 'MEMORY',
+        },
+        'busy_timeout_ms': 10000,
+        'pool_size': 10,
+    },
+}
+
+_active_profile = SQLITE_PROFILES['legacy']
+
+
+def utcnow():
+    """Horodatage UTC naïf, tel que stocké par SQLite."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def configure_sqlite(profile_name):
+    """Active un profil pour les prochaines connexions et renvoie les options du moteur SQLAlchemy."""
+    global _active_profile
+    if profile_name not in SQLITE_PROFILES:
+        raise ValueError(f"Profil SQLite inconnu : {profile_name} (choix : {', '.join(SQLITE_PROFILES)})")
+    _active_profile = SQLITE_PROFILES[profile_name]
+    return {
+        'pool_size': _active_profile['pool_size'],
+        'max_overflow': _active_profile['pool_size'],
+        'pool_timeout': 30,
+        'connect_args': {'timeout': _active_profile['busy_timeout_ms'] / 1000},
+    }
 
 
 @event.listens_for(Engine, "connect")
@@ -10,4 +69,7 @@ def _sqlite_fk_pragma(dbapi_connection, _):
     if "sqlite" in str(type(dbapi_connection)):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(_active_profile['busy_timeout_ms'])}")
+        for name, value in _active_profile['pragmas'].items():
+            cursor.execute(f"PRAGMA {name}={value}")
         cursor.close()
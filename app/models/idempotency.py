@@ -0,0 +1,13 @@
+from models.db import db, utcnow
+
+
+class IdempotencyKey(db.Model):
+    """Réponse d'une écriture, rejouée telle quelle si la même clé ``Idempotency-Key`` revient."""
+    __tablename__ = "idempotency_keys"
+
+    key = db.Column(db.String, primary_key=True)
+    method = db.Column(db.String, nullable=False)
+    path = db.Column(db.String, nullable=False)
+    status = db.Column(db.Integer, nullable=False)
+    body = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=utcnow, nullable=False, index=True)
@@ -0,0 +1,173 @@
+"""Migrations versionnées du schéma, version appliquée stockée dans ``PRAGMA user_version``
+
+Au démarrage, ``migrate`` lit ``user_version`` (une requête, aucune inspection) : si le
+schéma est à jour, c'est tout. Sinon les migrations manquantes sont appliquées dans l'ordre,
+chacune dans sa transaction avec sa nouvelle version, sous un verrou de fichier : un seul
+worker gunicorn migre, les autres attendent puis trouvent la base à jour.
+
+Une migration déployée ne se modifie plus : on en ajoute une nouvelle en fin de liste.
+"""
+import logging
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, text
+
+from models.audit import _AUDIT, AuditLog
+from models.db import db, utcnow
+from models.search import init_search_index
+
+try:
+    import fcntl
+except ImportError:  # pas de flock hors POSIX : la transaction BEGIN IMMEDIATE protège seule
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+
+def migration(fn):
+    MIGRATIONS.append(fn)
+    return fn
+
+
+def schema_version():
+    """Version que le code attend : nombre de migrations connues."""
+    return len(MIGRATIONS)
+
+
+def _user_version(conn):
+    return conn.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+@contextmanager
+def _file_lock(engine):
+    path = engine.url.database
+    if fcntl is None or not path or path == ':memory:':
+        yield
+        return
+    with open(f'{path}.migrate.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def migrate(engine):
+    """Amène la base de ``engine`` à ``schema_version()`` ; renvoie le nombre de migrations appliquées."""
+    target = schema_version()
+    with engine.connect() as conn:
+        current = _user_version(conn)
+    if current > target:
+        logger.warning("Schéma en version %d, plus récent que ce code (%d) : aucune migration", current, target)
+    if current >= target:
+        return 0
+
+    with _file_lock(engine), engine.connect() as conn:
+        # Relue sous le verrou : un autre worker a pu migrer pendant l'attente
+        version = _user_version(conn)
+        for number in range(version + 1, target + 1):
+            fn = MIGRATIONS[number - 1]
+            # pysqlite n'ouvre pas de transaction avant un DDL : on la prend nous-mêmes
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+            fn(conn)
+            conn.exec_driver_sql(f'PRAGMA user_version = {number}')
+            conn.commit()
+            logger.info("Schéma : migration %d (%s) appliquée", number, fn.__name__)
+        return max(target - version, 0)
+
+
+# ──────────────────────────────────────────
+# Migrations
+# ──────────────────────────────────────────
+@migration
+def baseline(conn):
+    """
+    Schéma de référence. Idempotente : amène aussi une base antérieure aux migrations
+    versionnées (user_version = 0), quel que soit son âge, au même état.
+    """
+    db.metadata.create_all(conn)
+    inspector = inspect(conn)
+
+    # Colonnes ajoutées au fil des versions, absentes des anciennes bases
+    product_cols = [col['name'] for col in inspector.get_columns('products')]
+    if 'low_stock_threshold' not in product_cols:
+        conn.execute(text('ALTER TABLE products ADD COLUMN low_stock_threshold INTEGER DEFAULT 5'))
+    if 'low_stock_alert_sent' not in product_cols:
+        conn.execute(text('ALTER TABLE products ADD COLUMN low_stock_alert_sent INTEGER DEFAULT 0'))
+    if 'revision' not in product_cols:
+        conn.execute(text('ALTER TABLE products ADD COLUMN revision INTEGER NOT NULL DEFAULT 0'))
+
+    cat_cols = [col['name'] for col in inspector.get_columns('categories')]
+    if 'sort_order' not in cat_cols:
+        conn.execute(text('ALTER TABLE categories ADD COLUMN sort_order INTEGER DEFAULT 0'))
+    if 'revision' not in cat_cols:
+        conn.execute(text('ALTER TABLE categories ADD COLUMN revision INTEGER NOT NULL DEFAULT 0'))
+
+    # Index de GET /api/data et /api/products (create_all ne les ajoute pas aux tables existantes)
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_products_category_id_id ON products (category_id, id)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_categories_sort_order_name ON categories (sort_order, name)'))
+    # Remplacé par l'index sur le drapeau, qui tient compte du seuil de catégorie
+    conn.execute(text('DROP INDEX IF EXISTS ix_products_low_stock'))
+    conn.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_products_low_stock_flag ON products (category_id, id) '
+        'WHERE low_stock_alert_sent = 1'
+    ))
+
+    # Ligne unique de la révision globale (journal des modifications)
+    conn.execute(text('INSERT OR IGNORE INTO sync_state (id, revision) VALUES (1, 0)'))
+
+    # Index plein texte de /api/search (table virtuelle + triggers, inconnus de create_all)
+    init_search_index(conn)
+
+
+@migration
+def audit_log(conn):
+    """Journal d'audit (models/audit.py), protégé contre toute modification ou suppression."""
+    db.metadata.create_all(conn, tables=[AuditLog.__table__])
+    for action in ('UPDATE', 'DELETE'):
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS audit_log_no_{action.lower()} BEFORE {action} ON audit_log
+            BEGIN
+                SELECT RAISE(ABORT, 'audit_log est en ajout seul');
+            END
+        """))
+
+
+@migration
+def changes_retention(conn):
+    """Horizon de purge du journal des modifications (models/change.py)."""
+    # Déjà là si baseline vient de créer sync_state
+    if 'pruned_revision' not in [col['name'] for col in inspect(conn).get_columns('sync_state')]:
+        conn.execute(text('ALTER TABLE sync_state ADD COLUMN pruned_revision INTEGER NOT NULL DEFAULT 0'))
+
+
+@migration
+def inherit_default_thresholds(conn):
+    """
+    L'ancien create_product écrivait 5 dans chaque produit : le seuil de la catégorie ne
+    s'appliquait jamais. Ces 5 redeviennent NULL (hérités) ; sans perte, car la catégorie
+    et le seuil global valent 5 par défaut. Écriture comme une autre : révision, journal,
+    audit, puis stock faible réévalué.
+    """
+    from low_stock import evaluate_all
+
+    ids = [row[0] for row in conn.execute(text('SELECT id FROM products WHERE low_stock_threshold = 5'))]
+    if not ids:
+        return
+    revision = conn.execute(
+        text('UPDATE sync_state SET revision = revision + 1 WHERE id = 1 RETURNING revision')
+    ).scalar_one()
+    conn.execute(
+        text('UPDATE products SET low_stock_threshold = NULL, revision = :revision WHERE low_stock_threshold = 5'),
+        {'revision': revision},
+    )
+    conn.execute(
+        text("INSERT INTO changes (revision, entity, entity_id, op) VALUES (:revision, 'product', :id, 'upsert')"),
+        [{'revision': revision, 'id': prod_id} for prod_id in ids],
+    )
+    conn.execute(_AUDIT['product'], {
+        'at': utcnow(), 'revision': revision, 'method': None, 'path': None, 'entity': 'product',
+    })
+    evaluate_all(conn)
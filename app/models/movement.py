@@ -0,0 +1,89 @@
+from datetime import datetime
+
+from models.db import db, utcnow
+
+
+class StockMovement(db.Model):
+    """Journal des variations de quantité (ajout seul, jamais modifié ni purgé avec le produit)."""
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        db.Index("ix_stock_movements_product_id_id", "product_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    product_id = db.Column(db.String, nullable=False)
+    category_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+    delta = db.Column(db.Integer, nullable=False)
+    qty_after = db.Column(db.Integer)
+    reason = db.Column(db.String, nullable=False)     # 'create' | 'update' | 'adjust' | 'import' | 'restore'
+
+
+class StockDaily(db.Model):
+    """
+    Cumul journalier par produit, tenu à jour à chaque mouvement (lu par /api/stats). Les
+    modifications du formulaire produit ('update') comptent : c'est par lui qu'on ajoute et
+    retire du stock. Une restauration ('restore') rembobine la base et n'y entre pas.
+    """
+    __tablename__ = "stock_daily"
+    __table_args__ = (
+        # Index couvrants : les agrégats sur une période ne lisent jamais la table elle-même
+        db.Index("ix_stock_daily_day_product", "day", "product_id", "consumed", "added"),
+        db.Index("ix_stock_daily_category_day", "category_id", "day", "consumed", "added"),
+    )
+
+    day = db.Column(db.String, primary_key=True)           # 'AAAA-MM-JJ', jour local du serveur
+    product_id = db.Column(db.String, primary_key=True)
+    category_id = db.Column(db.Integer, nullable=False)
+    consumed = db.Column(db.Integer, default=0, nullable=False)
+    added = db.Column(db.Integer, default=0, nullable=False)
+    movements = db.Column(db.Integer, default=0, nullable=False)
+
+
+# Mouvements gardés au journal mais exclus du cumul (ni consommation ni réapprovisionnement)
+ROLLUP_EXCLUDED_REASONS = ('restore',)
+
+_ROLLUP_SQL = db.text("""
+    INSERT INTO stock_daily (day, product_id, category_id, consumed, added, movements)
+    VALUES (:day, :product_id, :category_id, :consumed, :added, 1)
+    ON CONFLICT (day, product_id) DO UPDATE SET
+        category_id = excluded.category_id,
+        consumed = consumed + excluded.consumed,
+        added = added + excluded.added,
+        movements = movements + 1
+""")
+
+
+def record_movements(rows, reason):
+    """
+    Inscrit des variations de stock dans la transaction en cours : ``rows`` sont des
+    dicts ``product_id, category_id, delta, qty_after``. Les variations nulles sont ignorées.
+    """
+    rows = [row for row in rows if row['delta']]
+    if not rows:
+        return
+    now = utcnow()
+    day = datetime.now().date().isoformat()
+    db.session.execute(db.insert(StockMovement), [{'created_at': now, 'reason': reason, **row} for row in rows])
+    if reason in ROLLUP_EXCLUDED_REASONS:
+        return
+    db.session.execute(_ROLLUP_SQL, [
+        {
+            'day': day,
+            'product_id': row['product_id'],
+            'category_id': row['category_id'],
+            'consumed': -row['delta'] if row['delta'] < 0 else 0,
+            'added': row['delta'] if row['delta'] > 0 else 0,
+        }
+        for row in rows
+    ])
+
+
+def record_movement(product_id, category_id, old_qty, new_qty, reason):
+    """Variante pour un seul produit, à partir de l'ancienne et de la nouvelle quantité."""
+    record_movements([{
+        'product_id': product_id,
+        'category_id': category_id,
+        'delta': (new_qty or 0) - (old_qty or 0),
+        'qty_after': new_qty,
+    }], reason)
@@ -3,6 +3,14 @@ from models.db import db
 
 class Product(db.Model):
     __tablename__ = "products"
+    __table_args__ = (
+        db.Index("ix_products_category_id_id", "category_id", "id"),
+        # Index partiel : seuls les produits sous leur seuil effectif y figurent (voir low_stock.py)
+        db.Index(
+            "ix_products_low_stock_flag", "category_id", "id",
+            sqlite_where=db.text("low_stock_alert_sent = 1"),
+        ),
+    )
 
     id = db.Column(db.String, primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
@@ -11,7 +19,8 @@ class Product(db.Model):
     unit = db.Column(db.String, default="", nullable=False)
     note = db.Column(db.String, default="")
     grp = db.Column(db.String, default="")
-    low_stock_threshold = db.Column(db.Integer, default=5)
+    low_stock_threshold = db.Column(db.Integer)     # NULL : seuil de la catégorie
     low_stock_alert_sent = db.Column(db.Boolean, default=False)
+    revision = db.Column(db.Integer, default=0, nullable=False)
 
     category = db.relationship("Category", back_populates="products")
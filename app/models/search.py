@@ -0,0 +1,90 @@
+"""Index plein texte des produits (FTS5), tenu à jour par des triggers SQLite."""
+import re
+
+from sqlalchemy import text
+
+# Accents ignorés (« creme » trouve « Crème »), préfixes de 2 à 4 lettres pré-indexés
+_FTS_DDL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        product_id UNINDEXED, name, note, grp, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+"""
+
+# rowid de l'index = rowid de la ligne products. Seules les colonnes indexées
+# déclenchent une réindexation : un changement de quantité ne coûte rien ici.
+_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, product_id, name, note, grp, category)
+        VALUES (new.rowid, new.id, new.name, new.note, new.grp,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF id, name, note, grp, category_id ON products
+    BEGIN
+        DELETE FROM products_fts WHERE rowid = old.rowid;
+        INSERT INTO products_fts (rowid, product_id, name, note, grp, category)
+        VALUES (new.rowid, new.id, new.name, new.note, new.grp,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS categories_fts_rename AFTER UPDATE OF name ON categories BEGIN
+        UPDATE products_fts SET category = new.name
+        WHERE rowid IN (SELECT rowid FROM products WHERE category_id = new.id);
+    END
+    """,
+]
+
+_REBUILD_SQL = """
+    INSERT INTO products_fts (rowid, product_id, name, note, grp, category)
+    SELECT p.rowid, p.id, p.name, p.note, p.grp, c.name
+    FROM products p LEFT JOIN categories c ON c.id = p.category_id
+"""
+
+# Mots d'au moins un caractère alphanumérique ; tout le reste (guillemets, opérateurs FTS) est ignoré
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def init_search_index(conn):
+    """Crée l'index et ses triggers ; le reconstruit s'il ne correspond plus à ``products``."""
+    conn.execute(text(_FTS_DDL))
+    for trigger in _FTS_TRIGGERS:
+        conn.execute(text(trigger))
+    if not search_index_aligned(conn):
+        # Base existante sans index, ou rowid renumérotés par un VACUUM : on repart de zéro
+        rebuild_search_index(conn)
+
+
+def search_index_aligned(conn):
+    """Les triggers s'appuient sur le rowid de products : vérifie qu'il correspond toujours."""
+    indexed = conn.execute(text('SELECT COUNT(*) FROM products_fts')).scalar()
+    aligned = conn.execute(text(
+        'SELECT COUNT(*) FROM products_fts f JOIN products p ON p.rowid = f.rowid AND p.id = f.product_id'
+    )).scalar()
+    total = conn.execute(text('SELECT COUNT(*) FROM products')).scalar()
+    return indexed == aligned == total
+
+
+def rebuild_search_index(conn):
+    conn.execute(text('DELETE FROM products_fts'))
+    conn.execute(text(_REBUILD_SQL))
+
+
+def match_expression(query, any_word=False):
+    """
+    Traduit une saisie libre en requête FTS5 : chaque mot devient un préfixe
+    (``"lai"*``), tous requis sauf si ``any_word``. None si la saisie est vide.
+    """
+    words = _WORD_RE.findall(query)
+    if not words:
+        return None
+    return (' OR ' if any_word else ' ').join(f'"{word}"*' for word in words)
@@ -0,0 +1,142 @@
+"""Cache des réponses JSON : corps sérialisé et compressé une fois par révision des données
+
+``init_compression`` compresse aussi, à la volée, les autres réponses JSON / MessagePack.
+"""
+import gzip
+import hashlib
+import threading
+
+from flask import Response, request
+
+from models import on_revision_committed
+from metrics import cache_requests
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip seul sinon
+    brotli = None
+
+# En dessous de cette taille, compresser coûte plus que ça ne rapporte
+MIN_COMPRESS_SIZE = 1024
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class CachedBody:
+    """Corps de réponse figé, avec ses variantes compressées calculées à la demande, une seule fois."""
+
+    def __init__(self, body, revision=None, mimetype='application/json'):
+        self.body = body
+        self.revision = revision
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = _compress(self.body, encoding)
+        return data
+
+
+def _pick_encoding(size):
+    if size < MIN_COMPRESS_SIZE:
+        return None
+    if brotli is not None and 'br' in request.accept_encodings:
+        return 'br'
+    if 'gzip' in request.accept_encodings:
+        return 'gzip'
+    return None
+
+
+def cached_response(entry, cache_control='no-cache', vary='Accept-Encoding'):
+    """
+    Réponse pour ``entry`` : variante compressée selon Accept-Encoding, ETag fort
+    (un par encodage) et 304 sans corps si If-None-Match correspond.
+    """
+    encoding = _pick_encoding(len(entry.body))
+    if encoding is None:
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+    else:
+        response = Response(entry.encoded(encoding), mimetype=entry.mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{entry.etag}-{encoding}')
+    response.headers['Vary'] = vary
+    response.headers['Cache-Control'] = cache_control
+    if entry.revision is not None:
+        response.headers['X-Revision'] = str(entry.revision)
+    response = response.make_conditional(request)
+    cache_requests.inc('http', 'not_modified' if response.status_code == 304 else 'full')
+    return response
+
+
+class RevisionCache:
+    """Une entrée par clé, valable tant que la révision globale des données n'a pas bougé."""
+
+    def __init__(self, name):
+        self.name = name
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, revision, build, mimetype='application/json'):
+        entry = self._entries.get(key)
+        if entry is not None and entry.revision == revision:
+            cache_requests.inc(self.name, 'hit')
+            return entry
+        cache_requests.inc(self.name, 'miss')
+        entry = CachedBody(build(), revision, mimetype)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or current.revision is None or current.revision <= revision:
+                self._entries[key] = entry
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+data_cache = RevisionCache('data')
+
+
+@on_revision_committed
+def _invalidate_data_cache(_revision):
+    # Les autres workers s'en rendent compte via la révision lue en base
+    data_cache.invalidate()
+
+
+def _is_compressible(mimetype):
+    return mimetype in ('application/json', 'application/msgpack') or mimetype.endswith('+json')
+
+
+def _compress_response(response):
+    # Déjà compressée (cached_response), fichier statique, flux SSE ou réponse sans corps : rien à faire
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.status_code in (204, 304)
+        or not _is_compressible(response.mimetype or '')
+    ):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = _pick_encoding(len(body))
+    if encoding is not None:
+        response.set_data(_compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Compresse (gzip, ou brotli s'il est installé) toutes les réponses JSON selon Accept-Encoding."""
+    app.after_request(_compress_response)
@@ -0,0 +1,76 @@
+import hmac
+import os
+import re
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify
+import snapshots
+from routes import api
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+@admin_bp.before_request
+def _require_admin_token():
+    """Jeton ``Authorization: Bearer <ADMIN_TOKEN>`` obligatoire ; sans ADMIN_TOKEN ces routes n'existent pas."""
+    token = os.getenv('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Administration désactivée (ADMIN_TOKEN non défini)'}), 404
+    given = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(given.encode(), token.encode()):
+        return jsonify({'error': 'Jeton d\'administration invalide'}), 401
+    return None
+
+
+def _parse_instant(value):
+    """ISO 8601 (heure locale du serveur si sans fuseau) ou secondes epoch -> datetime UTC naïf."""
+    try:
+        instant = datetime.fromtimestamp(float(value), timezone.utc)
+    except ValueError:
+        # '+02:00' non encodé dans l'URL arrive en ' 02:00'
+        value = re.sub(r' (\d\d:?\d\d)$', r'+\1', value.replace('Z', '+00:00'))
+        instant = datetime.fromisoformat(value)
+        if instant.tzinfo is None:
+            instant = instant.astimezone()
+    return instant.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _describe(taken_at, path):
+    return {'name': os.path.basename(path), 'at': taken_at.isoformat() + 'Z', 'size': os.path.getsize(path)}
+
+
+# ──────────────────────────────────────────
+# GET /api/admin/snapshots
+# ──────────────────────────────────────────
+@admin_bp.route('/snapshots', methods=['GET'])
+def list_snapshots():
+    existing = snapshots.list_snapshots(*snapshots.current_database())
+    return jsonify({'snapshots': [_describe(*snapshot) for snapshot in existing]})
+
+
+# ──────────────────────────────────────────
+# POST /api/admin/snapshot
+# ──────────────────────────────────────────
+@admin_bp.route('/snapshot', methods=['POST'])
+def take_snapshot():
+    """Instantané immédiat (avant une opération risquée), en plus des instantanés périodiques."""
+    taken_at, path, elapsed = snapshots.take_snapshot(*snapshots.current_database())
+    return jsonify({'success': True, **_describe(taken_at, path), 'seconds': round(elapsed, 3)}), 201
+
+
+# ──────────────────────────────────────────
+# POST /api/admin/restore?at=2026-10-18T09:30:00Z
+# ──────────────────────────────────────────
+@admin_bp.route('/restore', methods=['POST'])
+def restore():
+    """
+    Ramène catégories et produits à leur état à l'instant ``at`` : dernier instantané
+    antérieur + rejeu du journal d'audit. La restauration est elle-même journalisée.
+    """
+    value = request.args.get('at', '').strip()
+    if not value:
+        return jsonify({'error': 'Paramètre at requis (ISO 8601 ou secondes epoch)'}), 400
+    try:
+        at = _parse_instant(value)
+    except (ValueError, OverflowError, OSError):
+        return jsonify({'error': f'Instant invalide : {value}'}), 400
+    return api._respond(*snapshots.restore(at))
@@ -3,27 +3,47 @@ import json
 import uuid
 import random
 import colorsys
-from flask import Blueprint, request, jsonify
-from models import db, Category, Product
-from email_alerts import send_low_stock_alert
+from flask import Blueprint, current_app, request, jsonify
+from models import (
+    db, Category, Product, current_revision, next_revision, record_audit, record_change, record_movement, touch,
+)
+from idempotency import commit_idempotent
+from low_stock import evaluate_category, evaluate_products
+from response_cache import CachedBody, cached_response, data_cache
+from routes.serializers import (
+    compact_products, data_media_types, encode_compact, product_fields, product_row,
+    serialize_category,
+)
+from tenants import current_tenant
 
 CHANGELOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'changelog.json')
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 
+def _load_changelog():
+    try:
+        with open(CHANGELOG_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return []
+
+
+# Ne changent qu'au déploiement : lus une fois au démarrage du worker
+VERSION = CachedBody(json.dumps({'sha': os.getenv('COMMIT_SHA', 'dev')}).encode('utf-8'))
+CHANGELOG = CachedBody(json.dumps(_load_changelog(), ensure_ascii=False).encode('utf-8'))
+
+
 @api_bp.route('/version', methods=['GET'])
 def get_version():
-    return jsonify({'sha': os.getenv('COMMIT_SHA', 'dev')})
+    # Sert à détecter les déploiements : toujours revalidé (304 tant que le SHA ne bouge pas)
+    return cached_response(VERSION)
 
 
 @api_bp.route('/changelog', methods=['GET'])
 def get_changelog():
-    try:
-        with open(CHANGELOG_PATH, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
-    except Exception:
-        return jsonify([])
+    # Le client ajoute ?v=<sha> : l'URL change à chaque déploiement, on peut cacher longtemps
+    return cached_response(CHANGELOG, cache_control='public, max-age=604800')
 
 
 def _generate_id():
@@ -95,34 +115,90 @@ def _generate_distant_color(existing_colors):
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
+def _stock_changed(prod_id):
+    """Note un produit dont le stock faible sera réévalué une seule fois, au commit."""
+    db.session.info.setdefault('stock_products', set()).add(prod_id)
+
+
+def _category_stock_changed(cat_id):
+    db.session.info.setdefault('stock_categories', set()).add(cat_id)
+
+
+def _expire_cached(cls, ids):
+    """Oublie les objets ORM déjà chargés (lot /api/batch) modifiés par un UPDATE SQL direct."""
+    for obj_id in ids:
+        cached = db.session.identity_map.get(db.session.identity_key(cls, obj_id))
+        if cached is not None:
+            db.session.expire(cached)
+
+
+def commit_changes():
+    """Réévalue en SQL le stock faible des produits et catégories touchés, journalise l'audit puis commit."""
+    for cat_id in db.session.info.pop('stock_categories', ()):
+        evaluate_category(cat_id)
+    evaluate_products(db.session.info.pop('stock_products', ()))
+    record_audit()
+    db.session.commit()
+
+
+def _respond(body, status=200):
+    if status < 400:
+        replayed = commit_idempotent(commit_changes, body, status)
+        if replayed is not None:
+            return replayed
+    else:
+        db.session.rollback()
+    return jsonify(body), status
+
+
 # ──────────────────────────────────────────
 # GET /api/data
 # ──────────────────────────────────────────
 @api_bp.route('/data', methods=['GET'])
 def get_all_data():
-    categories = Category.query.order_by(Category.sort_order, Category.name).all()
+    # JSON par défaut ; format compact en colonnes (JSON ou MessagePack) si Accept le demande
+    offers = data_media_types()
+    media_type = request.accept_mimetypes.best_match(offers, default=offers[0])
+    # Révision lue avant les données : au pire le client rejouera des changements déjà vus
+    revision = current_revision()
+    entry = data_cache.get(
+        (media_type, current_tenant()), revision, lambda: _build_all_data(media_type), mimetype=media_type,
+    )
+    return cached_response(entry, vary='Accept, Accept-Encoding')
+
+
+def _build_all_data(media_type='application/json'):
+    # Deux requêtes ordonnées par index, lignes sérialisées directement (pas d'objets ORM)
+    compact = media_type != 'application/json'
     result = []
+    by_category = {}
+    c = Category.__table__.c
+    categories = db.session.execute(
+        db.select(c.id, c.name, c.icon, c.color, c.sort_order, c.low_stock_threshold)
+        .order_by(c.sort_order, c.name)
+    )
     for cat in categories:
-        result.append({
-            'id': cat.id,
-            'name': cat.name,
-            'icon': cat.icon,
-            'color': cat.color,
-            'low_stock_threshold': cat.low_stock_threshold if cat.low_stock_threshold is not None else 5,
-            'products': [
-                {
-                    'id': p.id,
-                    'name': p.name,
-                    'qty': p.qty,
-                    'unit': p.unit,
-                    'note': p.note if p.note else None,
-                    'group': p.grp if p.grp else None,
-                    'low_stock_threshold': p.low_stock_threshold if p.low_stock_threshold is not None else 5,
-                }
-                for p in sorted(cat.products, key=lambda x: x.id)
-            ]
-        })
-    return jsonify(result)
+        entry = serialize_category(cat, [])
+        by_category[cat.id] = entry['products']
+        result.append(entry)
+
+    p = Product.__table__.c
+    products = db.session.execute(
+        db.select(p.category_id, p.id, p.name, p.qty, p.unit, p.note, p.grp, p.low_stock_threshold)
+        .order_by(p.category_id, p.id)
+        .execution_options(yield_per=1000)
+    )
+    make = product_row if compact else product_fields
+    for category_id, *fields in products:
+        bucket = by_category.get(category_id)
+        if bucket is not None:
+            bucket.append(make(*fields))
+
+    if compact:
+        for entry in result:
+            entry['products'] = compact_products(entry['products'])
+        return encode_compact(result, media_type)
+    return current_app.json.dumps(result).encode('utf-8')
 
 
 # ──────────────────────────────────────────
@@ -130,7 +206,10 @@ def get_all_data():
 # ──────────────────────────────────────────
 @api_bp.route('/categories', methods=['POST'])
 def create_category():
-    data = request.get_json()
+    return _respond(*create_category_op(request.get_json()))
+
+
+def create_category_op(data):
     name = data.get('name', '').strip()
     icon = data.get('icon', 'fa-solid fa-box').strip()
     
@@ -139,7 +218,7 @@ def create_category():
         color = data.get('color', '').strip()
         # Vérifier que c'est un hex valide
         if not color.startswith('#') or len(color) != 7:
-            return jsonify({'error': 'Couleur invalide (format hex requis: #RRGGBB)'}), 400
+            return {'error': 'Couleur invalide (format hex requis: #RRGGBB)'}, 400
     else:
         # Récupérer toutes les couleurs existantes (uniquement les hex valides)
         existing_colors = [
@@ -149,12 +228,12 @@ def create_category():
         color = _generate_distant_color(existing_colors)
 
     if not name:
-        return jsonify({'error': 'Le nom est requis'}), 400
+        return {'error': 'Le nom est requis'}, 400
 
     # Vérifier si une catégorie avec ce nom existe déjà (insensible à la casse)
     existing = Category.query.filter(db.func.lower(Category.name) == name.lower()).first()
     if existing is not None:
-        return jsonify({'error': 'Une catégorie avec ce nom existe déjà.'}), 400
+        return {'error': 'Une catégorie avec ce nom existe déjà.'}, 400
 
     last = Category.query.order_by(Category.sort_order.desc()).first()
     next_order = (last.sort_order + 1) if last is not None else 0
@@ -165,8 +244,11 @@ def create_category():
         sort_order=next_order,
     )
     db.session.add(cat)
-    db.session.commit()
-    return jsonify({'id': cat.id, 'name': name, 'icon': icon, 'color': color, 'products': []}), 201
+    db.session.flush()
+    revision = touch(cat)
+    return {
+        'id': cat.id, 'name': name, 'icon': icon, 'color': color, 'products': [], 'revision': revision
+    }, 201
 
 
 # ──────────────────────────────────────────
@@ -174,24 +256,27 @@ def create_category():
 # ──────────────────────────────────────────
 @api_bp.route('/categories/<int:cat_id>', methods=['PUT'])
 def update_category(cat_id):
+    return _respond(*update_category_op(cat_id, request.get_json()))
+
+
+def update_category_op(cat_id, data):
     cat = Category.query.get(cat_id)
     if not cat:
-        return jsonify({'error': 'Catégorie introuvable'}), 404
-    data = request.get_json()
+        return {'error': 'Catégorie introuvable'}, 404
     name = data.get('name', cat.name).strip()
     icon = data.get('icon', cat.icon)
     if not name:
-        return jsonify({'error': 'Le nom est requis'}), 400
+        return {'error': 'Le nom est requis'}, 400
     existing = Category.query.filter(
         db.func.lower(Category.name) == name.lower(),
         Category.id != cat_id
     ).first()
     if existing:
-        return jsonify({'error': 'Une catégorie avec ce nom existe déjà.'}), 400
+        return {'error': 'Une catégorie avec ce nom existe déjà.'}, 400
     cat.name = name
     cat.icon = icon
-    db.session.commit()
-    return jsonify({'success': True})
+    revision = touch(cat)
+    return {'success': True, 'revision': revision}, 200
 
 
 # ──────────────────────────────────────────
@@ -199,13 +284,35 @@ def update_category(cat_id):
 # ──────────────────────────────────────────
 @api_bp.route('/categories/reorder', methods=['PUT'])
 def reorder_categories():
-    items = request.get_json()
+    return _respond(*reorder_categories_op(request.get_json()))
+
+
+def reorder_categories_op(items):
+    if not isinstance(items, list):
+        return {'error': 'Liste attendue'}, 400
+    orders = {}
     for item in items:
-        cat = Category.query.get(item['id'])
-        if cat:
-            cat.sort_order = item['sort_order']
-    db.session.commit()
-    return jsonify({'success': True})
+        if not isinstance(item, dict):
+            return {'error': 'Chaque élément doit être un objet {id, sort_order}'}, 400
+        cat_id, sort_order = item.get('id'), item.get('sort_order')
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in (cat_id, sort_order)):
+            return {'error': 'Chaque élément doit avoir un id et un sort_order entiers'}, 400
+        orders[cat_id] = sort_order
+    if not orders:
+        return {'success': True, 'revision': current_revision()}, 200
+
+    # Un seul UPDATE ... CASE : les ids inconnus sont ignorés, RETURNING dit lesquels existent
+    revision = next_revision()
+    c = Category.__table__.c
+    changed = db.session.execute(
+        db.update(Category.__table__)
+        .where(c.id.in_(list(orders)))
+        .values(sort_order=db.case(orders, value=c.id), revision=revision)
+        .returning(c.id)
+    ).scalars().all()
+    record_change('category', changed)
+    _expire_cached(Category, changed)
+    return {'success': True, 'revision': revision}, 200
 
 
 # ──────────────────────────────────────────
@@ -213,9 +320,100 @@ def reorder_categories():
 # ──────────────────────────────────────────
 @api_bp.route('/categories/<int:cat_id>', methods=['DELETE'])
 def delete_category(cat_id):
+    return _respond(*delete_category_op(cat_id))
+
+
+def delete_category_op(cat_id):
+    # Les produits partent en cascade côté SQLite : on les journalise avant
+    product_ids = [row.id for row in db.session.query(Product.id).filter_by(category_id=cat_id)]
+    deleted = Category.query.filter_by(id=cat_id).delete()
+    if deleted:
+        record_change('product', product_ids, 'delete')
+        revision = record_change('category', [cat_id], 'delete')
+    else:
+        revision = current_revision()
+    return {'success': True, 'revision': revision}, 200
+
+
+# ──────────────────────────────────────────
+# POST /api/categories/<id>/merge
+# ──────────────────────────────────────────
+@api_bp.route('/categories/<int:cat_id>/merge', methods=['POST'])
+def merge_category(cat_id):
+    return _respond(*merge_category_op(cat_id, request.get_json()))
+
+
+def merge_category_op(cat_id, data):
+    """Déplace tous les produits de ``cat_id`` dans ``data['into']`` puis supprime ``cat_id``."""
+    if not isinstance(data, dict):
+        return {'error': 'Objet JSON attendu'}, 400
+    target_id = data.get('into')
+    if isinstance(target_id, bool) or not isinstance(target_id, int):
+        return {'error': 'Catégorie cible (into) requise'}, 400
+    if target_id == cat_id:
+        return {'error': 'Une catégorie ne peut pas être fusionnée avec elle-même'}, 400
+    found = set(db.session.execute(
+        db.select(Category.id).where(Category.id.in_([cat_id, target_id]))
+    ).scalars())
+    if found != {cat_id, target_id}:
+        return {'error': 'Catégorie introuvable'}, 404
+
+    revision = next_revision()
+    moved = _move_products(Product.category_id == cat_id, target_id, revision)
     Category.query.filter_by(id=cat_id).delete()
-    db.session.commit()
-    return jsonify({'success': True})
+    record_change('category', [cat_id], 'delete')
+    return {'success': True, 'moved': len(moved), 'revision': revision}, 200
+
+
+# ──────────────────────────────────────────
+# POST /api/products/move
+# ──────────────────────────────────────────
+MAX_MOVE_PRODUCTS = 10000
+
+
+@api_bp.route('/products/move', methods=['POST'])
+def move_products():
+    return _respond(*move_products_op(request.get_json()))
+
+
+def move_products_op(data):
+    """Range les produits ``data['product_ids']`` dans la catégorie ``data['category_id']``."""
+    if not isinstance(data, dict):
+        return {'error': 'Objet JSON attendu'}, 400
+    target_id = data.get('category_id')
+    product_ids = data.get('product_ids')
+    if isinstance(target_id, bool) or not isinstance(target_id, int):
+        return {'error': 'Catégorie cible (category_id) requise'}, 400
+    if not isinstance(product_ids, list) or not all(isinstance(i, str) for i in product_ids):
+        return {'error': 'Liste de product_ids attendue'}, 400
+    if len(product_ids) > MAX_MOVE_PRODUCTS:
+        return {'error': f'Maximum {MAX_MOVE_PRODUCTS} produits par déplacement'}, 413
+    if Category.query.get(target_id) is None:
+        return {'error': 'Catégorie introuvable'}, 404
+    if not product_ids:
+        return {'success': True, 'moved': 0, 'revision': current_revision()}, 200
+
+    revision = next_revision()
+    moved = _move_products(
+        Product.id.in_(list(set(product_ids))) & (Product.category_id != target_id), target_id, revision
+    )
+    return {'success': True, 'moved': len(moved), 'revision': revision}, 200
+
+
+def _move_products(where, target_id, revision):
+    """Un seul UPDATE pour tous les produits visés ; le stock faible suit le seuil de la nouvelle catégorie."""
+    p = Product.__table__.c
+    moved = db.session.execute(
+        db.update(Product.__table__)
+        .where(where)
+        .values(category_id=target_id, revision=revision)
+        .returning(p.id)
+    ).scalars().all()
+    record_change('product', moved)
+    _expire_cached(Product, moved)
+    if moved:
+        _category_stock_changed(target_id)
+    return moved
 
 
 # ──────────────────────────────────────────
@@ -223,7 +421,10 @@ def delete_category(cat_id):
 # ──────────────────────────────────────────
 @api_bp.route('/products', methods=['POST'])
 def create_product():
-    data = request.get_json()
+    return _respond(*create_product_op(request.get_json()))
+
+
+def create_product_op(data):
     category_id = data.get('category_id')
     if category_id is not None and isinstance(category_id, str):
         category_id = category_id.strip()
@@ -238,18 +439,19 @@ def create_product():
     grp = data.get('group', '').strip()
 
     if not name or category_id is None:
-        return jsonify({'error': 'Le nom et la catégorie sont requis'}), 400
+        return {'error': 'Le nom et la catégorie sont requis'}, 400
 
     cat = Category.query.get(int(category_id))
     if not cat:
-        return jsonify({'error': 'Catégorie introuvable'}), 404
+        return {'error': 'Catégorie introuvable'}, 404
 
-    threshold = data.get('low_stock_threshold', 5)
+    # Sans seuil propre, le produit hérite de celui de sa catégorie
+    threshold = data.get('low_stock_threshold')
 
     prod_id = _generate_id()
     product = Product(
         id=prod_id,
-        category_id=int(category_id),
+        category=cat,
         name=name,
         qty=qty,
         unit=unit or '',
@@ -258,17 +460,14 @@ def create_product():
         low_stock_threshold=threshold,
     )
     db.session.add(product)
-    db.session.commit()
+    _stock_changed(prod_id)
+    revision = touch(product)
+    record_movement(prod_id, cat.id, None, qty, 'create')
 
-    threshold_val = product.low_stock_threshold if product.low_stock_threshold is not None else 5
-    if product.qty is not None and product.qty <= threshold_val:
-        send_low_stock_alert(product, cat)
-        product.low_stock_alert_sent = True
-        db.session.commit()
-
-    return jsonify({
-        'id': prod_id, 'name': name, 'qty': qty, 'unit': unit, 'note': note, 'group': grp
-    }), 201
+    return {
+        'id': prod_id, 'name': name, 'qty': qty, 'unit': unit, 'note': note, 'group': grp,
+        'revision': revision
+    }, 201
 
 
 # ──────────────────────────────────────────
@@ -276,9 +475,13 @@ def create_product():
 # ──────────────────────────────────────────
 @api_bp.route('/products/<prod_id>', methods=['DELETE'])
 def delete_product(prod_id):
-    Product.query.filter_by(id=prod_id).delete()
-    db.session.commit()
-    return jsonify({'success': True})
+    return _respond(*delete_product_op(prod_id))
+
+
+def delete_product_op(prod_id):
+    deleted = Product.query.filter_by(id=prod_id).delete()
+    revision = record_change('product', [prod_id], 'delete') if deleted else current_revision()
+    return {'success': True, 'revision': revision}, 200
 
 
 # ──────────────────────────────────────────
@@ -286,11 +489,15 @@ def delete_product(prod_id):
 # ──────────────────────────────────────────
 @api_bp.route('/products/<prod_id>', methods=['PUT'])
 def update_product(prod_id):
-    data = request.get_json()
+    return _respond(*update_product_op(prod_id, request.get_json()))
+
+
+def update_product_op(prod_id, data):
     product = Product.query.get(prod_id)
     if not product:
-        return jsonify({'error': 'Produit introuvable'}), 404
+        return {'error': 'Produit introuvable'}, 404
 
+    old_qty = product.qty
     product.name = data.get('name', product.name).strip()
     product.qty = data.get('qty', product.qty)
     product.unit = data.get('unit', product.unit).strip()
@@ -300,27 +507,60 @@ def update_product(prod_id):
         product.low_stock_threshold = data['low_stock_threshold']
     if 'category_id' in data:
         new_cat_id = data['category_id']
-        cat = Category.query.get(int(new_cat_id))
-        if cat:
-            product.category_id = int(new_cat_id)
-    db.session.commit()
+        new_cat = Category.query.get(int(new_cat_id))
+        if new_cat:
+            product.category = new_cat
+    _stock_changed(prod_id)
+    revision = touch(product)
+    record_movement(prod_id, product.category.id, old_qty, product.qty, 'update')
+
+    return {
+        'id': prod_id, 'name': product.name, 'qty': product.qty,
+        'unit': product.unit, 'note': product.note, 'group': product.grp,
+        'revision': revision
+    }, 200
 
-    cat = product.category
-    threshold_val = product.low_stock_threshold if product.low_stock_threshold is not None else 5
-    if product.qty is not None and product.qty <= threshold_val:
-        if not product.low_stock_alert_sent:
-            send_low_stock_alert(product, cat)
-            product.low_stock_alert_sent = True
-            db.session.commit()
-    else:
-        if product.low_stock_alert_sent:
-            product.low_stock_alert_sent = False
-            db.session.commit()
 
-    return jsonify({
-        'id': prod_id, 'name': product.name, 'qty': product.qty,
-        'unit': product.unit, 'note': product.note, 'group': product.grp
-    })
+# ──────────────────────────────────────────
+# POST /api/products/<id>/adjust
+# ──────────────────────────────────────────
+@api_bp.route('/products/<prod_id>/adjust', methods=['POST'])
+def adjust_product(prod_id):
+    return _respond(*adjust_product_op(prod_id, request.get_json()))
+
+
+# Incrément atomique calculé par SQLite : deux téléphones ne s'écrasent plus.
+# Le delta est appliqué tel quel ou pas du tout : jamais de stock négatif, jamais de delta rogné
+_ADJUST_SQL = db.text("""
+    UPDATE products
+    SET qty = COALESCE(qty, 0) + :delta, revision = :revision
+    WHERE id = :id AND COALESCE(qty, 0) + :delta >= 0
+    RETURNING qty, category_id
+""")
+
+
+def adjust_product_op(prod_id, data):
+    delta = data.get('delta')
+    if isinstance(delta, bool) or not isinstance(delta, int):
+        return {'error': 'Le delta doit être un entier'}, 400
+
+    revision = next_revision()
+    # Le verrou d'écriture est pris (révision allouée) : l'ancienne quantité ne peut plus bouger
+    current = db.session.execute(db.select(Product.qty).where(Product.id == prod_id)).first()
+    if current is None:
+        return {'error': 'Produit introuvable'}, 404
+    old_qty = current.qty
+    row = db.session.execute(_ADJUST_SQL, {'id': prod_id, 'delta': delta, 'revision': revision}).first()
+    if row is None:
+        return {'error': 'Stock insuffisant', 'id': prod_id, 'qty': old_qty or 0, 'delta': delta}, 409
+    record_change('product', [prod_id])
+    record_movement(prod_id, row.category_id, old_qty, row.qty, 'adjust')
+    _stock_changed(prod_id)
+
+    # Un objet Product déjà chargé (lot /api/batch) ne doit pas garder l'ancienne quantité
+    _expire_cached(Product, [prod_id])
+
+    return {'id': prod_id, 'qty': row.qty, 'revision': revision}, 200
 
 
 # ──────────────────────────────────────────
@@ -328,27 +568,21 @@ def update_product(prod_id):
 # ──────────────────────────────────────────
 @api_bp.route('/products/<prod_id>/threshold', methods=['PUT'])
 def update_product_threshold(prod_id):
-    data = request.get_json()
-    threshold = data.get('low_stock_threshold', 5)
+    return _respond(*update_product_threshold_op(prod_id, request.get_json()))
+
+
+def update_product_threshold_op(prod_id, data):
+    # null : le produit reprend le seuil de sa catégorie
+    threshold = data.get('low_stock_threshold')
 
     product = Product.query.get(prod_id)
     if not product:
-        return jsonify({'error': 'Produit introuvable'}), 404
+        return {'error': 'Produit introuvable'}, 404
     product.low_stock_threshold = threshold
-    db.session.commit()
+    _stock_changed(prod_id)
+    revision = touch(product)
 
-    cat = product.category
-    if product.qty is not None and product.qty <= threshold:
-        if not product.low_stock_alert_sent:
-            send_low_stock_alert(product, cat)
-            product.low_stock_alert_sent = True
-            db.session.commit()
-    else:
-        if product.low_stock_alert_sent:
-            product.low_stock_alert_sent = False
-            db.session.commit()
-
-    return jsonify({'success': True, 'low_stock_threshold': threshold})
+    return {'success': True, 'low_stock_threshold': threshold, 'revision': revision}, 200
 
 
 # ──────────────────────────────────────────
@@ -356,12 +590,17 @@ def update_product_threshold(prod_id):
 # ──────────────────────────────────────────
 @api_bp.route('/categories/<int:cat_id>/threshold', methods=['PUT'])
 def update_threshold(cat_id):
-    data = request.get_json()
-    threshold = data.get('low_stock_threshold', 5)
+    return _respond(*update_threshold_op(cat_id, request.get_json()))
+
+
+def update_threshold_op(cat_id, data):
+    # null : les produits sans seuil propre reprennent le seuil global
+    threshold = data.get('low_stock_threshold')
 
     cat = Category.query.get(cat_id)
     if not cat:
-        return jsonify({'error': 'Catégorie introuvable'}), 404
+        return {'error': 'Catégorie introuvable'}, 404
     cat.low_stock_threshold = threshold
-    db.session.commit()
-    return jsonify({'success': True, 'low_stock_threshold': threshold})
+    _category_stock_changed(cat_id)
+    revision = touch(cat)
+    return {'success': True, 'low_stock_threshold': threshold, 'revision': revision}, 200
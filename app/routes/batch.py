@@ -0,0 +1,93 @@
+import logging
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError, OperationalError
+from idempotency import commit_idempotent
+from models import db, current_revision
+from routes import api
+from routes.sync import collect_changes
+
+batch_bp = Blueprint('batch', __name__, url_prefix='/api')
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_OPERATIONS = 500
+
+# op -> fonction(opération) renvoyant (corps, statut), sans commit
+OPERATIONS = {
+    'create_category': lambda op: api.create_category_op(op.get('data') or {}),
+    'update_category': lambda op: api.update_category_op(int(op['id']), op.get('data') or {}),
+    'delete_category': lambda op: api.delete_category_op(int(op['id'])),
+    'category_threshold': lambda op: api.update_threshold_op(int(op['id']), op.get('data') or {}),
+    'reorder_categories': lambda op: api.reorder_categories_op(op.get('data') or []),
+    'merge_category': lambda op: api.merge_category_op(int(op['id']), op.get('data') or {}),
+    'create_product': lambda op: api.create_product_op(op.get('data') or {}),
+    'update_product': lambda op: api.update_product_op(str(op['id']), op.get('data') or {}),
+    'delete_product': lambda op: api.delete_product_op(str(op['id'])),
+    'adjust_product': lambda op: api.adjust_product_op(str(op['id']), op.get('data') or {}),
+    'product_threshold': lambda op: api.update_product_threshold_op(str(op['id']), op.get('data') or {}),
+    'move_products': lambda op: api.move_products_op(op.get('data') or {}),
+}
+
+
+# ──────────────────────────────────────────
+# POST /api/batch
+# ──────────────────────────────────────────
+@batch_bp.route('/batch', methods=['POST'])
+def apply_batch():
+    """
+    Applique une liste ordonnée d'opérations dans une seule transaction SQLite.
+    Chaque opération a son SAVEPOINT : une erreur n'annule qu'elle-même.
+    """
+    payload = request.get_json(silent=True)
+    if isinstance(payload, list):
+        payload = {'operations': payload}
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Liste d\'opérations attendue'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'Maximum {MAX_BATCH_OPERATIONS} opérations par lot'}), 413
+    since = payload.get('since')
+
+    # Transaction ouverte (et verrou d'écriture pris) avant le premier SAVEPOINT : sinon le
+    # RELEASE du SAVEPOINT le plus externe committerait à lui seul. La révision, elle, n'est
+    # allouée que par la première opération qui écrit : un lot sans effet ne la fait pas avancer
+    if not db.session.connection().connection.dbapi_connection.in_transaction:
+        db.session.execute(db.text('BEGIN IMMEDIATE'))
+
+    results = []
+    for op in operations:
+        handler = OPERATIONS.get(op.get('op')) if isinstance(op, dict) else None
+        if handler is None:
+            results.append({'status': 400, 'body': {'error': 'Opération inconnue'}})
+            continue
+        had_revision = 'revision' in db.session.info
+        savepoint = db.session.begin_nested()
+        try:
+            body, status = handler(op)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            body, status = {'error': 'Opération invalide'}, 400
+        except IntegrityError:
+            body, status = {'error': 'Conflit avec les données existantes'}, 409
+        except OperationalError:
+            logger.exception("Lot : échec SQL de l'opération %s", op.get('op'))
+            body, status = {'error': 'Erreur de la base de données'}, 500
+        if status < 400:
+            savepoint.commit()
+        else:
+            savepoint.rollback()
+            if not had_revision:
+                # Révision allouée par cette opération : l'UPDATE de sync_state vient d'être annulé
+                db.session.info.pop('revision', None)
+        results.append({'status': status, 'body': body})
+
+    # Réponse construite dans la transaction : elle est enregistrée avec elle (Idempotency-Key)
+    revision = current_revision()
+    response = {'results': results, 'revision': revision}
+    if isinstance(since, int) and 0 <= since <= revision:
+        response['changes'] = collect_changes(since, revision)
+
+    # Stock faible évalué une fois par produit touché, puis un seul commit
+    replayed = commit_idempotent(api.commit_changes, response, 200)
+    if replayed is not None:
+        return replayed
+    return jsonify(response)
@@ -0,0 +1,283 @@
+import csv
+import io
+import json
+import re
+import uuid
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from models import db, Category, Product, current_revision, record_audit, record_change, record_movements
+from low_stock import evaluate_products
+
+bulk_bp = Blueprint('bulk', __name__, url_prefix='/api')
+
+# Nombre de lignes insérées (et commitées) par executemany
+IMPORT_CHUNK_SIZE = 1000
+# Au-delà, le rapport ne détaille plus les erreurs (seul le compteur continue)
+MAX_REPORTED_ERRORS = 1000
+
+# Réimportable tel quel : une ligne dont l'id existe met le produit à jour au lieu de le dupliquer
+EXPORT_COLUMNS = ['id', 'category_id', 'category', 'name', 'qty', 'unit', 'note', 'group', 'low_stock_threshold']
+# Ids fournis à l'import (ceux de l'application font 8 ou 32 caractères hexadécimaux)
+_PRODUCT_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# Colonnes réécrites quand l'id importé existe déjà (le drapeau de stock faible est réévalué)
+_UPSERT_COLUMNS = ('category_id', 'name', 'qty', 'unit', 'note', 'grp', 'low_stock_threshold', 'revision')
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+def _import_format():
+    fmt = request.args.get('format', '').lower()
+    if fmt in ('csv', 'ndjson'):
+        return fmt
+    mimetype = request.mimetype
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if mimetype in NDJSON_MIMETYPES:
+        return 'ndjson'
+    return None
+
+
+def _iter_records(fmt, stream):
+    """Produit ``(numéro de ligne, dict | message d'erreur)`` sans charger tout le fichier."""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_num, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_num, 'JSON invalide'
+            continue
+        if not isinstance(record, dict):
+            yield line_num, 'Objet JSON attendu'
+            continue
+        yield line_num, record
+
+
+def _optional_int(value, label):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f'{label} invalide')
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f'{label} invalide') from None
+
+
+def _text(record, key):
+    value = record.get(key)
+    return str(value).strip() if value is not None else ''
+
+
+def _validate(record, categories_by_id, categories_by_name):
+    """Transforme un enregistrement importé en ligne ``products`` (ValueError si invalide)."""
+    name = _text(record, 'name')
+    if not name:
+        raise ValueError('Le nom est requis')
+
+    category_id = _optional_int(record.get('category_id'), 'category_id')
+    if category_id is None:
+        category_name = _text(record, 'category')
+        if not category_name:
+            raise ValueError('La catégorie est requise')
+        category_id = categories_by_name.get(category_name.lower())
+        if category_id is None:
+            raise ValueError(f'Catégorie introuvable : {category_name}')
+    elif category_id not in categories_by_id:
+        raise ValueError(f'Catégorie introuvable : {category_id}')
+
+    product_id = _text(record, 'id')
+    if product_id and not _PRODUCT_ID_RE.match(product_id):
+        raise ValueError('id invalide')
+    threshold = _optional_int(record.get('low_stock_threshold'), 'low_stock_threshold')
+    return {
+        'id': product_id or None,     # None : nouveau produit, id attribué à l'écriture
+        'category_id': category_id,
+        'name': name,
+        'qty': _optional_int(record.get('qty'), 'qty'),
+        'unit': _text(record, 'unit'),
+        'note': _text(record, 'note'),
+        'grp': _text(record, 'group') or _text(record, 'grp'),
+        'low_stock_threshold': threshold,
+        'low_stock_alert_sent': False,
+    }
+
+
+def _flush_chunk(rows):
+    """
+    Écrit le lot ; renvoie ``(révision, mis à jour)``. Les lignes sans id sont insérées sous un
+    nouvel id, celles qui en portent un (export réimporté) mettent à jour le produit existant.
+    """
+    # uuid complet : 8 caractères (32 bits) finissent par entrer en collision sur de gros imports
+    new_rows = [{**row, 'id': uuid.uuid4().hex} for row in rows if row['id'] is None]
+    given_rows = [row for row in rows if row['id'] is not None]
+    ids = [row['id'] for row in given_rows + new_rows]
+    revision = record_change('product', ids)
+    # Quantités avant import des ids fournis : un seul SELECT par lot, pour des mouvements exacts
+    qty_before = {}
+    if given_rows:
+        qty_before = dict(db.session.execute(
+            db.select(Product.id, Product.qty).where(Product.id.in_([row['id'] for row in given_rows]))
+        ).all())
+    updated = sum(1 for row in given_rows if row['id'] in qty_before)
+    movements = []
+    for row in given_rows + new_rows:
+        row['revision'] = revision
+        before = qty_before.get(row['id']) or 0
+        qty_before[row['id']] = row['qty']
+        movements.append({
+            'product_id': row['id'], 'category_id': row['category_id'],
+            'delta': (row['qty'] or 0) - before, 'qty_after': row['qty'],
+        })
+    if given_rows:
+        insert = sqlite_insert(Product)
+        db.session.execute(
+            insert.on_conflict_do_update(
+                index_elements=[Product.id], set_={col: insert.excluded[col] for col in _UPSERT_COLUMNS},
+            ),
+            given_rows,
+        )
+    # Jamais d'upsert pour un id généré : une collision doit échouer, pas écraser un produit
+    if new_rows:
+        db.session.execute(db.insert(Product), new_rows)
+    record_movements(movements, 'import')
+    # Seuils (hérités ou non) évalués en une requête pour tout le lot
+    evaluate_products(ids)
+    record_audit()
+    db.session.commit()
+    return revision, updated
+
+
+class _ImportReport:
+    """Compteurs et erreurs par ligne renvoyés par l'import (appelé pour signaler une ligne rejetée)."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def __call__(self, line_num, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_num, 'error': message})
+
+
+def _flush_or_report(chunk, report):
+    """
+    Écrit un lot ``[(ligne, produit)]`` ; en cas de conflit, le lot est rejoué ligne à ligne
+    pour écrire les autres et signaler les fautives dans ``report``. Renvoie la dernière révision.
+    """
+    try:
+        revision, updated = _flush_chunk([row for _, row in chunk])
+    except IntegrityError:
+        db.session.rollback()
+    else:
+        report.inserted += len(chunk) - updated
+        report.updated += updated
+        return revision
+    revision = None
+    for line_num, row in chunk:
+        try:
+            revision, updated = _flush_chunk([row])
+        except IntegrityError as e:
+            db.session.rollback()
+            report(line_num, f'Conflit à l\'écriture : {e.orig}')
+        else:
+            report.inserted += 1 - updated
+            report.updated += updated
+    return revision
+
+
+# ──────────────────────────────────────────
+# POST /api/products/bulk  (CSV ou NDJSON)
+# ──────────────────────────────────────────
+@bulk_bp.route('/products/bulk', methods=['POST'])
+def import_products():
+    fmt = _import_format()
+    if fmt is None:
+        return jsonify({'error': 'Format non supporté (text/csv ou application/x-ndjson attendu)'}), 415
+
+    # Une seule requête pour toutes les catégories : validation en mémoire ensuite
+    categories_by_id = {}
+    categories_by_name = {}
+    for cat_id, cat_name in db.session.execute(db.select(Category.id, Category.name)):
+        categories_by_id[cat_id] = cat_name
+        categories_by_name[cat_name.lower()] = cat_id
+
+    report = _ImportReport()
+    revision = None
+    chunk = []
+    for line_num, record in _iter_records(fmt, request.stream):
+        try:
+            if isinstance(record, str):
+                raise ValueError(record)
+            chunk.append((line_num, _validate(record, categories_by_id, categories_by_name)))
+        except ValueError as e:
+            report(line_num, str(e))
+            continue
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            revision = _flush_or_report(chunk, report) or revision
+            chunk = []
+    if chunk:
+        revision = _flush_or_report(chunk, report) or revision
+
+    return jsonify({
+        'inserted': report.inserted,
+        'updated': report.updated,
+        'error_count': report.error_count,
+        'errors': report.errors,
+        # Rien d'écrit : la révision courante, pour que le client sache où il en est
+        'revision': revision if revision is not None else current_revision(),
+    }), 200 if report.error_count == 0 else 207
+
+
+# ──────────────────────────────────────────
+# GET /api/export?format=csv|ndjson
+# ──────────────────────────────────────────
+@bulk_bp.route('/export', methods=['GET'])
+def export_products():
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format non supporté (csv ou ndjson)'}), 400
+
+    p = Product.__table__.c
+    c = Category.__table__.c
+    query = (
+        db.select(p.id, p.category_id, c.name, p.name, p.qty, p.unit, p.note, p.grp, p.low_stock_threshold)
+        .join(Category.__table__, c.id == p.category_id)
+        .order_by(p.category_id, p.id)
+        .execution_options(yield_per=IMPORT_CHUNK_SIZE)
+    )
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+        if writer is not None:
+            writer.writerow(EXPORT_COLUMNS)
+        for n, row in enumerate(db.session.execute(query), start=1):
+            if writer is not None:
+                writer.writerow(['' if v is None else v for v in row])
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+                buffer.write('\n')
+            if n % IMPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=poulstock-export.{fmt}'},
+    )
@@ -0,0 +1,31 @@
+import logging
+
+from flask import Blueprint, Response, jsonify
+from models import db
+import metrics
+
+logger = logging.getLogger(__name__)
+
+health_bp = Blueprint('health', __name__)
+
+
+# ──────────────────────────────────────────
+# GET /health  (HEALTHCHECK du Dockerfile)
+# ──────────────────────────────────────────
+@health_bp.route('/health', methods=['GET'])
+def health():
+    try:
+        db.session.execute(db.text('SELECT 1'))
+    except Exception:
+        # Le détail (chemins, SQL) reste dans les logs : /health est exposé sans authentification
+        logger.exception("Healthcheck : base de données inaccessible")
+        return jsonify({'status': 'error', 'database': 'unavailable'}), 503
+    return jsonify({'status': 'ok'})
+
+
+# ──────────────────────────────────────────
+# GET /metrics  (format texte Prometheus)
+# ──────────────────────────────────────────
+@health_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -1,7 +1,20 @@
-from flask import Blueprint, render_template
+import os
+from flask import Blueprint, current_app, render_template
 
 index_bp = Blueprint('index', __name__)
 
 @index_bp.route('/')
 def index():
-    return render_template('index.html') 
\ No newline at end of file
+    return render_template('index.html')
+
+
+@index_bp.route('/sw.js')
+def service_worker():
+    # Servi à la racine (portée "/") et estampillé du SHA : chaque déploiement
+    # installe un nouveau service worker, qui remplace la coquille en cache
+    path = os.path.join(current_app.static_folder, 'sw.js')
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read().replace('__COMMIT_SHA__', os.getenv('COMMIT_SHA', 'dev'))
+    response = current_app.response_class(source, mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,130 @@
+import base64
+import json
+from flask import Blueprint, request, jsonify
+from models import db, Product
+from low_stock import EFFECTIVE_THRESHOLD_SQL, default_threshold
+
+products_bp = Blueprint('products', __name__, url_prefix='/api')
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+_p = Product.__table__.c
+
+# Champ JSON -> (colonne, normalisation identique à serializers.product_fields)
+FIELDS = {
+    'id': (_p.id, None),
+    'name': (_p.name, None),
+    'qty': (_p.qty, None),
+    'unit': (_p.unit, None),
+    'note': (_p.note, lambda v: v if v else None),
+    'group': (_p.grp, lambda v: v if v else None),
+    'low_stock_threshold': (_p.low_stock_threshold, None),
+    'category_id': (_p.category_id, None),
+}
+
+# Même expression que l'index partiel ix_products_low_stock_flag, sinon SQLite ne l'utilise pas
+_LOW_STOCK = db.text('low_stock_alert_sent = 1')
+
+
+def _encode_cursor(category_id, prod_id):
+    raw = json.dumps([category_id, prod_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except ValueError:
+        return None
+    # JSON valide mais pas [category_id, id] (null, 5, {...}) : curseur invalide, pas une 500
+    if not isinstance(position, list) or len(position) != 2:
+        return None
+    category_id, prod_id = position
+    if isinstance(category_id, bool) or not isinstance(category_id, int) or not isinstance(prod_id, str):
+        return None
+    return category_id, prod_id
+
+
+# ──────────────────────────────────────────
+# GET /api/products?category_id=&group=&unit=&low_stock=1&fields=id,name,qty&limit=&cursor=
+# ──────────────────────────────────────────
+@products_bp.route('/products', methods=['GET'])
+def list_products():
+    fields = request.args.get('fields')
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in FIELDS]
+        if unknown:
+            return jsonify({'error': f"Champ(s) inconnu(s) : {', '.join(unknown)}"}), 400
+    else:
+        fields = list(FIELDS)
+    limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+
+    # category_id et id sont toujours lus : ils forment le curseur
+    columns = [FIELDS[f][0] for f in fields]
+    query = (
+        db.select(_p.category_id, _p.id, *columns)
+        .order_by(_p.category_id, _p.id)
+        .limit(limit + 1)
+    )
+
+    category_id = request.args.get('category_id', type=int)
+    if category_id is not None:
+        query = query.where(_p.category_id == category_id)
+    if 'group' in request.args:
+        query = query.where(_p.grp == request.args['group'])
+    if 'unit' in request.args:
+        query = query.where(_p.unit == request.args['unit'])
+    if request.args.get('low_stock') in ('1', 'true'):
+        query = query.where(_LOW_STOCK)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = _decode_cursor(cursor)
+        if position is None:
+            return jsonify({'error': 'Curseur invalide'}), 400
+        query = query.where(db.tuple_(_p.category_id, _p.id) > db.tuple_(*position))
+
+    rows = db.session.execute(query).all()
+    normalizers = [(f, FIELDS[f][1]) for f in fields]
+    products = []
+    for row in rows[:limit]:
+        values = row[2:]
+        products.append({
+            field: normalize(value) if normalize else value
+            for (field, normalize), value in zip(normalizers, values)
+        })
+    next_cursor = _encode_cursor(rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+    return jsonify({'products': products, 'next_cursor': next_cursor})
+
+
+# ──────────────────────────────────────────
+# GET /api/low-stock
+# ──────────────────────────────────────────
+_LOW_STOCK_SQL = db.text(f"""
+    SELECT products.id, products.name, products.qty, products.unit, products.category_id,
+           categories.name AS category_name, {EFFECTIVE_THRESHOLD_SQL} AS threshold
+    FROM products JOIN categories ON categories.id = products.category_id
+    WHERE products.low_stock_alert_sent = 1
+    ORDER BY products.category_id, products.id
+""")
+
+
+@products_bp.route('/low-stock', methods=['GET'])
+def list_low_stock():
+    """Produits sous leur seuil effectif, lus dans l'index partiel tenu par low_stock.evaluate_*."""
+    rows = db.session.execute(_LOW_STOCK_SQL, {'default_threshold': default_threshold()})
+    return jsonify([
+        {
+            'id': row.id,
+            'name': row.name,
+            'qty': row.qty,
+            'unit': row.unit,
+            'category_id': row.category_id,
+            'category': row.category_name,
+            'threshold': row.threshold,
+        }
+        for row in rows
+    ])
@@ -0,0 +1,67 @@
+from flask import Blueprint, request, jsonify
+from models import db, match_expression
+from routes.serializers import product_fields
+
+search_bp = Blueprint('search', __name__, url_prefix='/api')
+
+MAX_PER_PAGE = 100
+
+# Poids bm25 par colonne (product_id, name, note, grp, category) : le nom compte le plus.
+# Le classement et la pagination se font dans l'index seul ; seule la page est jointe aux tables.
+_SEARCH_SQL = db.text("""
+    SELECT p.id, p.name, p.qty, p.unit, p.note, p.grp, p.low_stock_threshold,
+           p.category_id, c.name AS category_name
+    FROM (
+        SELECT product_id, rowid, bm25(products_fts, 0.0, 10.0, 2.0, 3.0, 1.0) AS score
+        FROM products_fts
+        WHERE products_fts MATCH :match
+        ORDER BY score, rowid
+        LIMIT :limit OFFSET :offset
+    ) f
+    JOIN products p ON p.id = f.product_id
+    JOIN categories c ON c.id = p.category_id
+    ORDER BY f.score, f.rowid
+""")
+
+
+def _search(match, limit, offset):
+    return db.session.execute(_SEARCH_SQL, {'match': match, 'limit': limit, 'offset': offset}).all()
+
+
+# ──────────────────────────────────────────
+# GET /api/search?q=<texte>&page=1&per_page=20[&any=1]
+# ──────────────────────────────────────────
+@search_bp.route('/search', methods=['GET'])
+def search_products():
+    query = request.args.get('q', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), MAX_PER_PAGE)
+
+    relaxed = request.args.get('any') == '1'
+    match = match_expression(query, any_word=relaxed)
+    if match is None:
+        return jsonify({'error': 'Le paramètre q est requis'}), 400
+
+    offset = (page - 1) * per_page
+    # Une ligne de plus que demandé : indique s'il existe une page suivante sans COUNT(*)
+    rows = _search(match, per_page + 1, offset)
+    if not rows and not relaxed and page == 1 and ' ' in match:
+        # Aucun produit ne contient tous les mots : on accepte n'importe lequel, le classement fait le tri.
+        # Le client demande les pages suivantes avec any=1.
+        match = match_expression(query, any_word=True)
+        rows = _search(match, per_page + 1, offset)
+        relaxed = True
+
+    results = []
+    for row in rows[:per_page]:
+        data = product_fields(row.id, row.name, row.qty, row.unit, row.note, row.grp, row.low_stock_threshold)
+        data['category_id'] = row.category_id
+        data['category'] = row.category_name
+        results.append(data)
+    return jsonify({
+        'results': results,
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(rows) > per_page,
+        'relaxed': relaxed,
+    })
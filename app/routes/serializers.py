@@ -0,0 +1,85 @@
+"""Représentation JSON des catégories et produits, partagée par les routes."""
+import json
+
+from low_stock import default_threshold
+
+try:
+    import msgpack
+except ImportError:  # msgpack est optionnel : format compact en JSON seul sinon
+    msgpack = None
+
+# Format compact de /api/data (négocié par Accept) : les produits d'une catégorie en colonnes,
+# une liste par champ ; une colonne dont toutes les valeurs valent le défaut est omise
+COMPACT_MEDIA_TYPE = 'application/vnd.poulstock.compact+json'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+COMPACT_VERSION = 1
+PRODUCT_COLUMNS = ('id', 'name', 'qty', 'unit', 'note', 'group', 'low_stock_threshold')
+PRODUCT_DEFAULTS = {'qty': None, 'unit': '', 'note': None, 'group': None, 'low_stock_threshold': None}
+
+
+def product_fields(prod_id, name, qty, unit, note, grp, low_stock_threshold):
+    """Forme JSON d'un produit à partir de ses colonnes (chemin rapide pour les lignes brutes)."""
+    return {
+        'id': prod_id,
+        'name': name,
+        'qty': qty,
+        'unit': unit,
+        'note': note if note else None,
+        'group': grp if grp else None,
+        # null : seuil hérité de la catégorie
+        'low_stock_threshold': low_stock_threshold,
+    }
+
+
+def product_row(prod_id, name, qty, unit, note, grp, low_stock_threshold):
+    """Mêmes valeurs que ``product_fields``, en tuple ordonné comme ``PRODUCT_COLUMNS``."""
+    return (prod_id, name, qty, unit, note if note else None, grp if grp else None, low_stock_threshold)
+
+
+def compact_products(rows):
+    """Lignes ``product_row`` -> ``{champ: [valeurs]}`` sans les colonnes entièrement par défaut."""
+    if not rows:
+        return {}
+    columns = {}
+    for name, values in zip(PRODUCT_COLUMNS, zip(*rows)):
+        if name in PRODUCT_DEFAULTS and values.count(PRODUCT_DEFAULTS[name]) == len(values):
+            continue
+        columns[name] = values
+    return columns
+
+
+def data_media_types():
+    """Représentations de /api/data, la première étant celle par défaut (Accept: */*)."""
+    offers = ['application/json', COMPACT_MEDIA_TYPE]
+    if msgpack is not None:
+        offers.append(MSGPACK_MEDIA_TYPE)
+    return offers
+
+
+def encode_compact(categories, media_type):
+    payload = {'v': COMPACT_VERSION, 'categories': categories}
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def serialize_product(p, with_category=False):
+    """Accepte un objet ``Product`` comme une ligne de requête ayant les mêmes colonnes."""
+    data = product_fields(p.id, p.name, p.qty, p.unit, p.note, p.grp, p.low_stock_threshold)
+    if with_category:
+        data['category_id'] = p.category_id
+    return data
+
+
+def serialize_category(cat, products=None):
+    data = {
+        'id': cat.id,
+        'name': cat.name,
+        'icon': cat.icon,
+        'color': cat.color,
+        'sort_order': cat.sort_order or 0,
+        'low_stock_threshold': cat.low_stock_threshold if cat.low_stock_threshold is not None else default_threshold(),
+    }
+    if products is not None:
+        data['products'] = products
+    return data
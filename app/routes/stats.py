@@ -0,0 +1,175 @@
+from datetime import date, timedelta
+from flask import Blueprint, request, jsonify
+from models import db, Product, StockMovement
+
+stats_bp = Blueprint('stats', __name__, url_prefix='/api')
+
+# Fenêtre maximale des agrégats (en jours)
+MAX_WINDOW = 366
+# Taille max d'une page du journal
+MAX_PAGE = 500
+
+
+def _window(default):
+    """Premier jour (inclus) de la fenêtre ``?days=`` qui se termine aujourd'hui."""
+    days = request.args.get('days', default, type=int)
+    days = min(max(days, 1), MAX_WINDOW)
+    return days, date.today() - timedelta(days=days - 1)
+
+
+def _per_product_totals(start, category_id=None):
+    """``{product_id: (consumed, added, premier jour)}`` sur la fenêtre, lu uniquement dans le cumul journalier."""
+    sql = """
+        SELECT product_id, SUM(consumed) AS consumed, SUM(added) AS added, MIN(day) AS first_day
+        FROM stock_daily
+        WHERE day >= :start {category_filter}
+        GROUP BY product_id
+    """
+    params = {'start': start.isoformat()}
+    if category_id is not None:
+        params['category_id'] = category_id
+        sql = sql.format(category_filter='AND category_id = :category_id')
+    else:
+        sql = sql.format(category_filter='')
+    rows = db.session.execute(db.text(sql), params)
+    return {row.product_id: (row.consumed, row.added, row.first_day) for row in rows}
+
+
+def _products_by_id(ids):
+    p = Product.__table__.c
+    rows = db.session.execute(
+        db.select(p.id, p.name, p.category_id, p.qty, p.unit).where(p.id.in_(list(ids)))
+    )
+    return {row.id: row for row in rows}
+
+
+# ──────────────────────────────────────────
+# GET /api/stats/consumption?product_id=|category_id=&days=30
+# ──────────────────────────────────────────
+@stats_bp.route('/stats/consumption', methods=['GET'])
+def get_consumption():
+    days, start = _window(30)
+    product_id = request.args.get('product_id')
+    category_id = request.args.get('category_id', type=int)
+
+    if product_id:
+        where, params = 'product_id = :product_id AND day >= :start', {'product_id': product_id}
+    elif category_id is not None:
+        where, params = 'category_id = :category_id AND day >= :start', {'category_id': category_id}
+    else:
+        where, params = 'day >= :start', {}
+    params['start'] = start.isoformat()
+    rows = db.session.execute(db.text(f"""
+        SELECT day, SUM(consumed) AS consumed, SUM(added) AS added
+        FROM stock_daily WHERE {where}
+        GROUP BY day
+    """), params)
+    by_day = {row.day: (row.consumed, row.added) for row in rows}
+
+    # Série continue : les jours sans mouvement valent 0
+    series = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        consumed, added = by_day.get(day, (0, 0))
+        series.append({'day': day, 'consumed': consumed, 'added': added})
+    return jsonify({'days': days, 'series': series})
+
+
+# ──────────────────────────────────────────
+# GET /api/stats/forecast?days=28&category_id=
+# ──────────────────────────────────────────
+@stats_bp.route('/stats/forecast', methods=['GET'])
+def get_forecast():
+    days, start = _window(28)
+    category_id = request.args.get('category_id', type=int)
+
+    totals = {pid: t for pid, t in _per_product_totals(start, category_id).items() if t[0] > 0}
+    products = _products_by_id(totals)
+    today = date.today()
+    result = []
+    for prod_id, (consumed, _added, first_day) in totals.items():
+        product = products.get(prod_id)
+        if product is None:
+            continue  # produit supprimé depuis
+        # Un produit suivi depuis moins longtemps que la fenêtre n'est pas dilué par des jours sans données
+        observed = min(days, (today - date.fromisoformat(first_day)).days + 1)
+        rate = consumed / observed
+        qty = max(product.qty or 0, 0)
+        days_left = qty / rate
+        result.append({
+            'id': prod_id,
+            'name': product.name,
+            'category_id': product.category_id,
+            'qty': product.qty,
+            'unit': product.unit,
+            'daily_consumption': round(rate, 2),
+            'days_left': round(days_left, 1),
+            'empty_on': (today + timedelta(days=int(days_left))).isoformat(),
+        })
+    result.sort(key=lambda r: (r['days_left'], r['name']))
+    return jsonify({'days': days, 'products': result})
+
+
+# ──────────────────────────────────────────
+# GET /api/stats/top-movers?days=7&limit=10&by=consumed|added
+# ──────────────────────────────────────────
+@stats_bp.route('/stats/top-movers', methods=['GET'])
+def get_top_movers():
+    days, start = _window(7)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    by = request.args.get('by', 'consumed')
+    if by not in ('consumed', 'added'):
+        return jsonify({'error': 'Paramètre by invalide (consumed ou added)'}), 400
+
+    rows = db.session.execute(db.text(f"""
+        SELECT product_id, SUM(consumed) AS consumed, SUM(added) AS added
+        FROM stock_daily
+        WHERE day >= :start
+        GROUP BY product_id
+        HAVING SUM({by}) > 0
+        ORDER BY SUM({by}) DESC
+        LIMIT :limit
+    """), {'start': start.isoformat(), 'limit': limit}).all()
+    products = _products_by_id(row.product_id for row in rows)
+    result = []
+    for row in rows:
+        product = products.get(row.product_id)
+        result.append({
+            'id': row.product_id,
+            'name': product.name if product else None,
+            'category_id': product.category_id if product else None,
+            'consumed': row.consumed,
+            'added': row.added,
+        })
+    return jsonify({'days': days, 'by': by, 'products': result})
+
+
+# ──────────────────────────────────────────
+# GET /api/products/<id>/movements?before=<id>&limit=50
+# ──────────────────────────────────────────
+@stats_bp.route('/products/<prod_id>/movements', methods=['GET'])
+def get_movements(prod_id):
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_PAGE)
+    before = request.args.get('before', type=int)
+
+    m = StockMovement.__table__.c
+    query = (
+        db.select(m.id, m.created_at, m.delta, m.qty_after, m.reason)
+        .where(m.product_id == prod_id)
+        .order_by(m.id.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        query = query.where(m.id < before)
+    movements = [
+        {
+            'id': row.id,
+            'at': row.created_at.isoformat() + 'Z',
+            'delta': row.delta,
+            'qty_after': row.qty_after,
+            'reason': row.reason,
+        }
+        for row in db.session.execute(query)
+    ]
+    next_before = movements[-1]['id'] if len(movements) == limit else None
+    return jsonify({'movements': movements, 'next_before': next_before})
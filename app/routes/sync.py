@@ -0,0 +1,134 @@
+import os
+import time
+
+from flask import Blueprint, Response, current_app, request, jsonify
+from models import db, Category, Product, Change, current_revision, pruned_revision
+from change_stream import broker_for
+from routes.serializers import serialize_category, serialize_product
+from tenants import current_tenant, tenant_context
+
+sync_bp = Blueprint('sync', __name__, url_prefix='/api')
+
+
+def collect_changes(since, until):
+    """
+    Regroupe les changements de révision ``]since, until]`` : la dernière opération
+    de chaque entité l'emporte, les upserts sont relus depuis les tables. ``since`` antérieur
+    à la purge du journal : ``{'reset': True}``, le client recharge tout.
+    """
+    rows = (
+        db.session.query(Change.entity, Change.entity_id, Change.op)
+        .filter(Change.revision > since, Change.revision <= until)
+        .order_by(Change.revision, Change.id)
+    )
+    latest = {}
+    for entity, entity_id, op in rows:
+        latest[(entity, entity_id)] = op
+    # Horizon relu après le journal : une purge concurrente se voit forcément ici
+    if since < pruned_revision():
+        return {'reset': True, 'revision': until}
+
+    upserted = {'category': [], 'product': []}
+    deleted = {'category': [], 'product': []}
+    for (entity, entity_id), op in latest.items():
+        (upserted if op == 'upsert' else deleted)[entity].append(entity_id)
+
+    categories = []
+    if upserted['category']:
+        ids = [int(i) for i in upserted['category']]
+        categories = [
+            serialize_category(c)
+            for c in Category.query.filter(Category.id.in_(ids)).order_by(Category.sort_order, Category.name)
+        ]
+    products = []
+    if upserted['product']:
+        products = [
+            serialize_product(p, with_category=True)
+            for p in Product.query.filter(Product.id.in_(upserted['product'])).order_by(Product.id)
+        ]
+
+    return {
+        'revision': until,
+        'categories': categories,
+        'products': products,
+        'deleted': {
+            'categories': [int(i) for i in deleted['category']],
+            'products': deleted['product'],
+        },
+    }
+
+
+# ──────────────────────────────────────────
+# GET /api/changes?since=<rev>
+# ──────────────────────────────────────────
+@sync_bp.route('/changes', methods=['GET'])
+def get_changes():
+    since = request.args.get('since', type=int)
+    revision = current_revision()
+    if since is None or since < 0 or since > revision:
+        # Révision inconnue (base recréée, client neuf) : rechargement complet via /api/data
+        return jsonify({'reset': True, 'revision': revision})
+    return jsonify(collect_changes(since, revision))
+
+
+# ──────────────────────────────────────────
+# GET /api/stream?since=<rev>  (Server-Sent Events)
+# ──────────────────────────────────────────
+# Commentaire envoyé sans activité pour que les proxys ne coupent pas la connexion
+STREAM_HEARTBEAT = 15
+# Durée max d'une connexion : le navigateur se reconnecte seul (avec Last-Event-ID)
+STREAM_MAX_AGE = float(os.getenv('STREAM_MAX_AGE', '300'))
+
+
+def _sse(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+def _build_delta(app, tenant, since, until):
+    with tenant_context(app, tenant):
+        return collect_changes(since, until)
+
+
+@sync_bp.route('/stream', methods=['GET'])
+def stream_changes():
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', type=int)
+    app = current_app._get_current_object()
+    tenant = current_tenant()
+    broker = broker_for(tenant)
+    revision = current_revision()
+    broker.publish(revision)
+    # La session est rendue avant de streamer : la connexion ne garde aucune connexion SQLite
+    db.session.remove()
+
+    def generate():
+        last = since
+        broker.subscribe(app)
+        try:
+            yield "retry: 3000\n\n"
+            if last is None or last < 0 or last > revision:
+                last = revision
+                yield _sse('reset', '{"revision":%d}' % revision, revision)
+            deadline = time.monotonic() + STREAM_MAX_AGE
+            while time.monotonic() < deadline:
+                current = broker.wait(last, STREAM_HEARTBEAT)
+                if current == last:
+                    yield ': ping\n\n'
+                    continue
+                if current < last:
+                    # Base recréée : le client recharge tout
+                    last = current
+                    yield _sse('reset', '{"revision":%d}' % current, current)
+                    continue
+                payload = broker.delta(last, current, lambda a, b: _build_delta(app, tenant, a, b))
+                last = current
+                yield _sse('changes', payload, current)
+        finally:
+            broker.unsubscribe()
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from flask import Blueprint, current_app, request, jsonify
+import tenants
+
+tenants_bp = Blueprint('tenants', __name__, url_prefix='/api/tenants')
+
+# Fenêtre maximale de consommation du rapport (en jours)
+MAX_WINDOW = 366
+
+# Une requête par site : tout est lu dans les index (compteurs, drapeau de stock faible, cumul journalier)
+_REPORT_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM categories) AS categories,
+        (SELECT COUNT(*) FROM products) AS products,
+        (SELECT COUNT(*) FROM products WHERE low_stock_alert_sent = 1) AS low_stock,
+        (SELECT COALESCE(SUM(consumed), 0) FROM stock_daily WHERE day >= :start) AS consumed,
+        (SELECT COALESCE(SUM(added), 0) FROM stock_daily WHERE day >= :start) AS added,
+        (SELECT revision FROM sync_state WHERE id = 1) AS revision
+"""
+
+
+def _tenant_report(app, tenant, start):
+    # Connexion sqlite3 éphémère : passer par le LRU des moteurs fermerait ceux des requêtes en cours
+    try:
+        with tenants.readonly_connection(app, tenant) as conn:
+            cursor = conn.execute(_REPORT_SQL, {'start': start.isoformat()})
+            report = dict(zip((column[0] for column in cursor.description), cursor.fetchone()))
+    except Exception as e:
+        # Un site illisible ne fait pas échouer tout le rapport
+        return {'tenant': tenant, 'error': str(e)}
+    return {'tenant': tenant, **report}
+
+
+# ──────────────────────────────────────────
+# GET /api/tenants/report?days=30
+# ──────────────────────────────────────────
+@tenants_bp.route('/report', methods=['GET'])
+def get_report():
+    """Compteurs de chaque site, calculés en parallèle (une base par site), et leurs totaux."""
+    days = min(max(request.args.get('days', 30, type=int), 1), MAX_WINDOW)
+    start = date.today() - timedelta(days=days - 1)
+    keys = tenants.all_tenants()
+    app = current_app._get_current_object()
+
+    workers = min(int(os.getenv('TENANT_REPORT_WORKERS', '8')), max(len(keys), 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tenant-report') as executor:
+        sites = list(executor.map(lambda key: _tenant_report(app, key, start), keys))
+
+    totals = {field: 0 for field in ('categories', 'products', 'low_stock', 'consumed', 'added')}
+    for site in sites:
+        if 'error' not in site:
+            for field in totals:
+                totals[field] += site[field]
+    return jsonify({
+        'days': days,
+        'tenants': sites,
+        'totals': totals,
+        'failed': sum(1 for site in sites if 'error' in site),
+    })
@@ -0,0 +1,300 @@
+"""Instantanés de la base par l'API de sauvegarde en ligne de SQLite, et restauration à un instant donné
+
+Un thread de fond copie la base toutes les ``SNAPSHOT_INTERVAL`` secondes (0 désactive) dans
+``SNAPSHOT_DIR`` (``snapshots/`` à côté de la base par défaut). En WAL (profil performance) la
+copie se fait d'une traite dans une transaction de lecture : les écritures continuent pendant
+ce temps. En journal rollback (profil legacy) elle avance par tranches de
+``SNAPSHOT_PAGES_PER_STEP`` pages en rendant la main entre deux tranches ; une écriture la fait
+reprendre. Dans les deux cas l'instantané est cohérent. Une base qui n'a pas été écrite depuis
+son dernier instantané est sautée. Les ``SNAPSHOT_KEEP`` derniers instantanés de chaque base
+sont gardés.
+
+``restore(at)`` repart du dernier instantané antérieur à ``at``, y applique la dernière image
+de chaque entité inscrite au journal d'audit jusqu'à ``at``, puis écrit la différence avec la
+base courante : c'est une écriture comme une autre (révision, journal, audit, stock faible).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from models import db, next_revision, record_change, record_movements
+from models.audit import CATEGORY_COLUMNS, PRODUCT_COLUMNS
+from low_stock import evaluate_all
+from tenants import all_tenants, current_tenant, database_path
+
+logger = logging.getLogger(__name__)
+
+_NAME_FORMAT = '%Y%m%dT%H%M%S%fZ'
+
+# Un instantané à la fois par base : le worker et POST /api/admin/snapshot peuvent se croiser
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(db_path):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(db_path), threading.Lock())
+
+
+def current_database():
+    """``(fichier SQLite, site)`` de la requête ou du contexte en cours."""
+    return db.session.get_bind().url.database, current_tenant()
+
+
+def snapshot_dir(db_path):
+    return os.getenv('SNAPSHOT_DIR') or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'snapshots')
+
+
+def _prefix(tenant):
+    return f'{tenant or "stock"}-'
+
+
+def _modified_since(db_path, instant):
+    """La base (ou son WAL) a-t-elle été écrite après ``instant`` (UTC naïf) ?"""
+    mtimes = [os.path.getmtime(path) for path in (db_path, db_path + '-wal') if os.path.exists(path)]
+    return any(datetime.fromtimestamp(mtime, timezone.utc).replace(tzinfo=None) > instant for mtime in mtimes)
+
+
+def list_snapshots(db_path, tenant):
+    """Instantanés d'une base, du plus ancien au plus récent : ``[(instant UTC, chemin)]``."""
+    directory = snapshot_dir(db_path)
+    prefix = _prefix(tenant)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    snapshots = []
+    for name in names:
+        if name.startswith(prefix) and name.endswith('.db'):
+            try:
+                taken_at = datetime.strptime(name[len(prefix):-3], _NAME_FORMAT)
+            except ValueError:
+                continue
+            snapshots.append((taken_at, os.path.join(directory, name)))
+    return sorted(snapshots)
+
+
+def take_snapshot(db_path, tenant):
+    """Copie en ligne de la base ``db_path`` ; renvoie ``(instant UTC, chemin, secondes)``."""
+    with _lock_for(db_path):
+        return _take_snapshot(db_path, tenant)
+
+
+def _take_snapshot(db_path, tenant):
+    pages = int(os.getenv('SNAPSHOT_PAGES_PER_STEP', '1024'))
+    pause = float(os.getenv('SNAPSHOT_STEP_PAUSE', '0.005'))
+    directory = snapshot_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    # Nom unique : un autre processus (worker gunicorn) peut copier la même base en même temps
+    partial = os.path.join(directory, f'{_prefix(tenant)}{uuid.uuid4().hex}.part')
+
+    started = time.perf_counter()
+    try:
+        source = sqlite3.connect(db_path, timeout=30)
+        target = sqlite3.connect(partial)
+        try:
+            if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+                # WAL : la copie lit un état figé sans bloquer les écritures (elles vont au WAL).
+                # En tranches, chaque écriture d'une autre connexion la ferait repartir de zéro.
+                source.backup(target)
+            else:
+                # Journal rollback : la lecture bloquerait les écritures pendant toute la copie.
+                # sleep=0 : la pause est faite par le callback, en Python, pour laisser tourner les autres greenlets
+                source.backup(target, pages=pages, sleep=0, progress=lambda *_: time.sleep(pause))
+        finally:
+            target.close()
+            source.close()
+        # Horodaté à la fin de la copie : l'état copié n'est jamais postérieur à son nom
+        taken_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        path = os.path.join(directory, f'{_prefix(tenant)}{taken_at.strftime(_NAME_FORMAT)}.db')
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    keep = int(os.getenv('SNAPSHOT_KEEP', '24'))
+    for _, old in list_snapshots(db_path, tenant)[:-keep] if keep > 0 else []:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass    # déjà supprimé par un autre worker
+    return taken_at, path, time.perf_counter() - started
+
+
+class SnapshotWorker(threading.Thread):
+    """Instantané périodique de chaque base (une par site en mode multi-site)."""
+
+    def __init__(self, app):
+        super().__init__(name='snapshots', daemon=True)
+        self.app = app
+        self.interval = float(os.getenv('SNAPSHOT_INTERVAL', '3600'))
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            for tenant in all_tenants():
+                try:
+                    self.snapshot(tenant)
+                except Exception:
+                    logger.exception("Instantané : échec (site %s)", tenant or 'par défaut')
+
+    def snapshot(self, tenant):
+        """
+        Instantané d'un site s'il a été écrit depuis le précédent. Tout passe par le fichier :
+        aucun moteur n'est ouvert, le LRU des sites n'est pas touché.
+        """
+        db_path = database_path(self.app, tenant)
+        existing = list_snapshots(db_path, tenant)
+        if existing and not _modified_since(db_path, existing[-1][0]):
+            return None
+        taken_at, path, elapsed = take_snapshot(db_path, tenant)
+        logger.info("Instantané %s en %.1f s", os.path.basename(path), elapsed)
+        return path
+
+
+_worker = None
+
+
+def start_snapshot_worker(app):
+    """Démarre (une seule fois par processus) les instantanés périodiques, sauf si l'intervalle vaut 0."""
+    global _worker
+    if _worker is None and float(os.getenv('SNAPSHOT_INTERVAL', '3600')) > 0:
+        _worker = SnapshotWorker(app)
+        _worker.start()
+    return _worker
+
+
+# ──────────────────────────────────────────
+# Restauration
+# ──────────────────────────────────────────
+def _read_snapshot(path):
+    """État d'un instantané : ``({id: ligne}, {id: ligne}, dernier id d'audit contenu)``."""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        categories = {
+            str(row[0]): row
+            for row in conn.execute(f'SELECT {", ".join(CATEGORY_COLUMNS)} FROM categories')
+        }
+        products = {row[0]: row for row in conn.execute(f'SELECT {", ".join(PRODUCT_COLUMNS)} FROM products')}
+        try:
+            last_audit_id = conn.execute('SELECT MAX(id) FROM audit_log').fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            last_audit_id = 0   # instantané antérieur au journal d'audit
+    finally:
+        conn.close()
+    return categories, products, last_audit_id
+
+
+def _replay(state, columns, entity, after_id, at):
+    """Applique à ``state`` la dernière image de chaque entité journalisée dans ``]after_id, at]``."""
+    latest = db.session.execute(db.text("""
+        SELECT entity_id, op, data FROM audit_log
+        WHERE id IN (
+            SELECT MAX(id) FROM audit_log
+            WHERE id > :after_id AND at <= :at AND entity = :entity
+            GROUP BY entity_id
+        )
+    """).bindparams(db.bindparam('at', type_=db.DateTime)), {'after_id': after_id, 'at': at, 'entity': entity})
+    count = 0
+    for entity_id, op, data in latest:
+        count += 1
+        if op == 'delete' or data is None:
+            state.pop(entity_id, None)
+        else:
+            image = json.loads(data)
+            state[entity_id] = tuple(image[col] for col in columns)
+    return count
+
+
+def _upsert_sql(table, columns):
+    assignments = ', '.join(f'{col} = excluded.{col}' for col in columns[1:] + ('revision',))
+    return db.text(
+        f'INSERT INTO {table} ({", ".join(columns)}, revision) '
+        f'VALUES ({", ".join(":" + col for col in columns)}, :revision) '
+        f'ON CONFLICT (id) DO UPDATE SET {assignments}'
+    )
+
+
+def restore(at):
+    """
+    Ramène catégories et produits à leur état à ``at`` (datetime UTC naïf), dans la transaction
+    en cours, sans commit. Renvoie ``(corps, statut)`` comme les opérations de routes/api.py.
+    """
+    candidates = [(taken_at, path) for taken_at, path in list_snapshots(*current_database()) if taken_at <= at]
+    if not candidates:
+        return {'error': 'Aucun instantané antérieur à cet instant'}, 404
+    snapshot_at, path = candidates[-1]
+
+    started = time.perf_counter()
+    categories, products, last_audit_id = _read_snapshot(path)
+    replayed = _replay(categories, CATEGORY_COLUMNS, 'category', last_audit_id, at)
+    replayed += _replay(products, PRODUCT_COLUMNS, 'product', last_audit_id, at)
+
+    # Différence avec l'état courant : seules les lignes qui changent sont écrites
+    revision = next_revision()
+    live_categories = {
+        str(row[0]): tuple(row)
+        for row in db.session.execute(db.text(f'SELECT {", ".join(CATEGORY_COLUMNS)} FROM categories'))
+    }
+    live_products = {
+        row[0]: tuple(row)
+        for row in db.session.execute(db.text(f'SELECT {", ".join(PRODUCT_COLUMNS)} FROM products'))
+    }
+    upsert_categories = [row for cat_id, row in categories.items() if live_categories.get(cat_id) != tuple(row)]
+    upsert_products = [row for prod_id, row in products.items() if live_products.get(prod_id) != tuple(row)]
+    delete_categories = [cat_id for cat_id in live_categories if cat_id not in categories]
+    delete_products = [prod_id for prod_id in live_products if prod_id not in products]
+
+    # Catégories d'abord (les produits restaurés y sont rattachés), suppressions de catégories en dernier
+    if upsert_categories:
+        db.session.execute(_upsert_sql('categories', CATEGORY_COLUMNS), [
+            {**dict(zip(CATEGORY_COLUMNS, row)), 'revision': revision} for row in upsert_categories
+        ])
+    if delete_products:
+        db.session.execute(db.text('DELETE FROM products WHERE id = :id'), [{'id': i} for i in delete_products])
+    if upsert_products:
+        db.session.execute(_upsert_sql('products', PRODUCT_COLUMNS), [
+            {**dict(zip(PRODUCT_COLUMNS, row)), 'revision': revision} for row in upsert_products
+        ])
+    if delete_categories:
+        db.session.execute(db.text('DELETE FROM categories WHERE id = :id'), [{'id': int(i)} for i in delete_categories])
+
+    record_change('category', [row[0] for row in upsert_categories])
+    record_change('category', delete_categories, 'delete')
+    record_change('product', [row[0] for row in upsert_products])
+    record_change('product', delete_products, 'delete')
+
+    # Quantités rétablies : des mouvements de stock comme les autres (une suppression n'en crée pas)
+    movements = []
+    for row in upsert_products:
+        old = live_products.get(row[0])
+        movements.append({
+            'product_id': row[0], 'category_id': row[1],
+            'delta': (row[3] or 0) - ((old[3] or 0) if old else 0), 'qty_after': row[3],
+        })
+    record_movements(movements, 'restore')
+
+    # Objets ORM éventuellement chargés : leur état n'est plus celui de la base
+    db.session.expire_all()
+    evaluate_all()
+
+    return {
+        'success': True,
+        'restored_to': at.isoformat() + 'Z',
+        'snapshot': os.path.basename(path),
+        'snapshot_at': snapshot_at.isoformat() + 'Z',
+        'replayed': replayed,
+        'categories': {'upserted': len(upsert_categories), 'deleted': len(delete_categories)},
+        'products': {'upserted': len(upsert_products), 'deleted': len(delete_products)},
+        'seconds': round(time.perf_counter() - started, 3),
+        'revision': revision,
+    }, 200
@@ -25,10 +25,15 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // ——— État ———
     let DB = [];                    // Données chargées depuis l'API
+    let DB_REVISION = null;         // Révision serveur de DB (pour /api/changes)
     let deleteCallback = null;      // Callback pour la suppression confirmée
     let editingProductId = null;    // ID du produit en cours d'édition (null = ajout)
     let editingProductCurrentQty = null; // Qté actuelle du produit en cours d'édition
     let editingCategoryId = null;   // ID de la catégorie en cours d'édition (null = ajout)
+    // Site de la page (multi-site), figé au chargement : un changement de site dans un autre
+    // onglet ne doit pas envoyer les écritures de celui-ci ailleurs. ?tenant= d'abord : hors
+    // ligne, la coquille en cache répond et le serveur n'a pas pu poser le cookie
+    const TENANT = new URLSearchParams(location.search).get('tenant') || readCookie('tenant');
 
     /* ===========================================
        HELPERS — Utilitaires
@@ -41,6 +46,16 @@ document.addEventListener('DOMContentLoaded', () => {
         return `rgba(${r}, ${g}, ${b}, ${opacity})`;
     }
 
+    function readCookie(name) {
+        const match = document.cookie.split('; ').find(c => c.startsWith(`${name}=`));
+        return match ? decodeURIComponent(match.slice(name.length + 1)) : null;
+    }
+
+    // X-Tenant explicite : le service worker s'en sert pour son cache et sa file hors ligne
+    function withTenant(headers = {}) {
+        return TENANT ? { 'X-Tenant': TENANT, ...headers } : headers;
+    }
+
     function smoothScrollTo(el) {
         if (!el) return;
         setTimeout(() => {
@@ -60,23 +75,191 @@ document.addEventListener('DOMContentLoaded', () => {
     =========================================== */
 
     async function api(url, options = {}) {
+        // Les opérations en file partent avant toute autre écriture, pour garder l'ordre
+        if (options.method && options.method !== 'GET' && url !== '/api/batch') {
+            await flushOps();
+        }
         if (options.body && typeof options.body === 'object') {
             options.body = JSON.stringify(options.body);
             options.headers = { 'Content-Type': 'application/json', ...options.headers };
         }
+        if (options.method && options.method !== 'GET') {
+            // Une clé par écriture : rejouée par le service worker, elle ne s'applique qu'une fois
+            options.headers = { 'Idempotency-Key': newIdempotencyKey(), ...options.headers };
+        }
+        options.headers = withTenant(options.headers);
         const res = await fetch(url, options);
         return res.json();
     }
 
-    async function loadData() {
-        DB = await api('/api/data');
+    function newIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+    }
+
+    // ——— File d'opérations groupées (POST /api/batch) ———
+    const BATCH_DELAY_MS = 800;
+    let pendingOps = [];
+    let batchTimer = null;
+
+    function queueOp(op) {
+        // Une seule mise à jour en attente par cible : les données successives sont fusionnées
+        const existing = op.id !== undefined && pendingOps.find(o => o.op === op.op && o.id === op.id);
+        if (existing && op.op === 'adjust_product') {
+            existing.data.delta += op.data.delta;
+        } else if (existing) {
+            Object.assign(existing.data, op.data);
+        } else {
+            pendingOps.push({ ...op, data: { ...op.data } });
+        }
+        clearTimeout(batchTimer);
+        batchTimer = setTimeout(flushOps, BATCH_DELAY_MS);
+    }
+
+    async function flushOps(keepalive = false) {
+        clearTimeout(batchTimer);
+        batchTimer = null;
+        if (pendingOps.length === 0) return;
+        const operations = pendingOps;
+        pendingOps = [];
+        const res = await api('/api/batch', {
+            method: 'POST',
+            body: { operations, since: DB_REVISION },
+            keepalive,
+        });
+        if (res.changes) applyChanges(res.changes);
+        // Stock insuffisant (409) : le retrait n'a pas eu lieu, on reprend la quantité du serveur
+        const refused = (res.results || []).filter(r => r.status === 409 && r.body && r.body.id !== undefined);
+        if (refused.length > 0) {
+            const products = new Map(DB.flatMap(c => c.products).map(p => [p.id, p]));
+            refused.forEach(r => {
+                const product = products.get(r.body.id);
+                if (product) product.qty = r.body.qty;
+            });
+            render();
+        }
+    }
+
+    // Ne pas perdre la file si l'app passe en arrière-plan
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') flushOps(true);
+    });
+
+    function sortCategories() {
         // Tri alphabétique des catégories par défaut, sauf si l'utilisateur a défini un ordre custom
+        const byName = (a, b) => a.name.localeCompare(b.name, 'fr', { numeric: true, sensitivity: 'base' });
         if (!localStorage.getItem('categories_custom_ordered')) {
-            DB.sort((a, b) => a.name.localeCompare(b.name, 'fr', { numeric: true, sensitivity: 'base' }));
+            DB.sort(byName);
+        } else {
+            DB.sort((a, b) => (a.sort_order ?? 0) - (b.sort_order ?? 0) || byName(a, b));
         }
+    }
+
+    async function loadData() {
+        // Format compact en colonnes (bien plus léger sur réseau mobile), décodé dans la forme habituelle
+        const res = await fetch('/api/data', { headers: withTenant({ Accept: PoulstockWire.COMPACT_TYPE }) });
+        DB = await PoulstockWire.readData(res);
+        DB_REVISION = parseInt(res.headers.get('X-Revision')) || 0;
+        sortCategories();
         render();
     }
 
+    // Récupère uniquement ce qui a changé depuis DB_REVISION (y compris nos propres écritures)
+    async function syncChanges() {
+        if (DB_REVISION === null) return loadData();
+        try {
+            const delta = await api(`/api/changes?since=${DB_REVISION}`);
+            applyChanges(delta);
+        } catch (_) {
+            // Hors ligne : l'écriture attend dans la file du service worker, on resynchronise après le rejeu
+        }
+    }
+
+    function applyChanges(delta) {
+        if (delta.reset) return loadData();
+        if (delta.revision <= DB_REVISION) return;
+
+        const catsById = new Map(DB.map(c => [c.id, c]));
+
+        delta.categories.forEach(c => {
+            const existing = catsById.get(c.id);
+            if (existing) {
+                Object.assign(existing, c);
+            } else {
+                const cat = { ...c, products: [] };
+                DB.push(cat);
+                catsById.set(cat.id, cat);
+            }
+        });
+
+        const removedProducts = new Set([
+            ...delta.deleted.products,
+            ...delta.products.map(p => p.id),
+        ]);
+        if (removedProducts.size > 0) {
+            DB.forEach(cat => {
+                cat.products = cat.products.filter(p => !removedProducts.has(p.id));
+            });
+        }
+        delta.products.forEach(p => {
+            const cat = catsById.get(p.category_id);
+            if (cat) cat.products.push(p);
+        });
+
+        if (delta.deleted.categories.length > 0) {
+            const removedCats = new Set(delta.deleted.categories);
+            DB = DB.filter(c => !removedCats.has(c.id));
+        }
+
+        DB_REVISION = delta.revision;
+        sortCategories();
+        render();
+    }
+
+    // Changements des autres utilisateurs poussés par le serveur (Server-Sent Events)
+    function openStream() {
+        if (!window.EventSource) return;
+        // En cas de reconnexion, le navigateur renvoie seul le dernier id reçu (Last-Event-ID)
+        const tenant = TENANT ? `&tenant=${encodeURIComponent(TENANT)}` : '';
+        const stream = new EventSource(`/api/stream?since=${DB_REVISION}${tenant}`);
+        stream.addEventListener('changes', e => applyChanges(JSON.parse(e.data)));
+        stream.addEventListener('reset', () => loadData());
+    }
+
+    /* ===========================================
+       HORS LIGNE — File d'écritures du service worker
+    =========================================== */
+
+    const offlineBanner = document.createElement('div');
+    offlineBanner.className = 'offline-banner';
+    offlineBanner.hidden = true;
+    document.body.appendChild(offlineBanner);
+
+    function updateOfflineBanner(pending) {
+        offlineBanner.hidden = pending === 0 && navigator.onLine;
+        offlineBanner.innerHTML = pending > 0
+            ? `<i class="fa-solid fa-cloud-arrow-up"></i><span>${pending} modification${pending > 1 ? 's' : ''} en attente de connexion</span>`
+            : `<i class="fa-solid fa-wifi"></i><span>Hors ligne — données du dernier chargement</span>`;
+    }
+
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.addEventListener('message', e => {
+            const msg = e.data || {};
+            if (msg.type === 'outbox') updateOfflineBanner(msg.pending);
+            if (msg.type === 'outbox-replayed') {
+                updateOfflineBanner(msg.pending);
+                if (msg.replayed > 0) syncChanges();
+            }
+        });
+    }
+
+    window.addEventListener('online', () => {
+        updateOfflineBanner(0);
+        navigator.serviceWorker?.controller?.postMessage({ type: 'replay-outbox' });
+    });
+    window.addEventListener('offline', () => updateOfflineBanner(0));
+    if (!navigator.onLine) updateOfflineBanner(0);
+
     /* ===========================================
        RENDER — Génère tout le DOM depuis DB
     =========================================== */
@@ -205,7 +388,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     `Supprimer la catégorie « ${cat.name} » et tous ses produits ?`,
                     async () => {
                         await api(`/api/categories/${cat.id}`, { method: 'DELETE' });
-                        await loadData();
+                        await syncChanges();
                     }
                 );
             });
@@ -266,12 +449,17 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // Seuil effectif : celui du produit, sinon celui de sa catégorie (le serveur applique la même règle)
+    function effectiveThreshold(product, category) {
+        return product.low_stock_threshold ?? category.low_stock_threshold ?? 5;
+    }
+
     function createProductCard(product, category) {
         const card = document.createElement('div');
         card.className = 'product-card';
         card.dataset.productId = product.id;
 
-        const threshold = product.low_stock_threshold ?? 5;
+        const threshold = effectiveThreshold(product, category);
         const isLow = product.qty !== null && product.qty <= threshold;
 
         let qtyClass = 'product-qty';
@@ -282,7 +470,7 @@ document.addEventListener('DOMContentLoaded', () => {
             ? `<p class="product-note"><i class="fa-solid fa-circle-info"></i> ${product.note}</p>`
             : '';
 
-        const qtyNum = product.qty !== null ? product.qty : 0;
+        let qtyNum = product.qty !== null ? product.qty : 0;
         const qtyText = product.qty !== null ? product.qty : '?';
         const unitText = product.unit ? ' ' + product.unit : '';
         const color = category.color || '#C0574F';
@@ -343,15 +531,15 @@ document.addEventListener('DOMContentLoaded', () => {
             validateBtn.style.display = (localQty !== qtyNum) ? '' : 'none';
         });
 
-        validateBtn.addEventListener('click', async (e) => {
+        validateBtn.addEventListener('click', (e) => {
             e.stopPropagation();
-            const savedProductId = product.id;
-            await api(`/api/products/${product.id}`, {
-                method: 'PUT',
-                body: { name: product.name, qty: localQty, unit: product.unit || '', note: product.note || '' }
-            });
-            await loadData();
-            smoothScrollTo(document.querySelector(`[data-product-id="${savedProductId}"]`));
+            // Appliqué localement tout de suite, envoyé avec les autres saisies via /api/batch.
+            // On envoie l'écart et non la valeur : la saisie d'un autre téléphone n'est pas écrasée
+            queueOp({ op: 'adjust_product', id: product.id, data: { delta: localQty - qtyNum } });
+            product.qty = localQty;
+            qtyNum = localQty;
+            validateBtn.style.display = 'none';
+            updateAlertsBell();
         });
 
         // Bouton crayon → modifier le produit
@@ -379,7 +567,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 `Supprimer « ${product.name} » ?`,
                 async () => {
                     await api(`/api/products/${product.id}`, { method: 'DELETE' });
-                    await loadData();
+                    await syncChanges();
                 }
             );
         });
@@ -388,13 +576,15 @@ document.addEventListener('DOMContentLoaded', () => {
         card.querySelector('.threshold-badge').addEventListener('click', (e) => {
             e.stopPropagation();
             const badge = card.querySelector('.threshold-badge');
-            const currentVal = product.low_stock_threshold ?? 5;
+            // Champ vide : le produit reprend le seuil de sa catégorie (affiché en placeholder)
+            const ownVal = product.low_stock_threshold ?? '';
+            const inherited = effectiveThreshold({ low_stock_threshold: null }, category);
 
             const editor = document.createElement('span');
             editor.className = 'threshold-editor';
             editor.innerHTML = `
                 <i class="fa-solid fa-triangle-exclamation"></i>
-                <input type="number" min="0" value="${currentVal}" class="threshold-inline-input">
+                <input type="number" min="0" value="${ownVal}" placeholder="${inherited}" class="threshold-inline-input">
                 <button class="threshold-save-btn" title="Valider"><i class="fa-solid fa-check"></i></button>
             `;
             badge.replaceWith(editor);
@@ -403,19 +593,18 @@ document.addEventListener('DOMContentLoaded', () => {
             input.focus();
             input.select();
 
-            const saveThreshold = async () => {
-                const newVal = parseInt(input.value) || 0;
-                await api(`/api/products/${product.id}/threshold`, {
-                    method: 'PUT',
-                    body: { low_stock_threshold: newVal }
-                });
-                await loadData();
+            const saveThreshold = () => {
+                const parsed = parseInt(input.value, 10);
+                const newVal = Number.isNaN(parsed) ? null : Math.max(0, parsed);
+                queueOp({ op: 'product_threshold', id: product.id, data: { low_stock_threshold: newVal } });
+                product.low_stock_threshold = newVal;
+                render();
             };
 
             editor.querySelector('.threshold-save-btn').addEventListener('click', saveThreshold);
             input.addEventListener('keydown', (e) => {
                 if (e.key === 'Enter') saveThreshold();
-                if (e.key === 'Escape') loadData();
+                if (e.key === 'Escape') render();
             });
         });
 
@@ -582,7 +771,7 @@ document.addEventListener('DOMContentLoaded', () => {
             `Supprimer ce produit ?`,
             async () => {
                 await api(`/api/products/${productId}`, { method: 'DELETE' });
-                await loadData();
+                await syncChanges();
             }
         );
     });
@@ -631,7 +820,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const savedProductId = editingProductId;
         resetProductForm();
         closeModal(modalAddProduct);
-        await loadData();
+        await syncChanges();
         if (savedProductId) {
             smoothScrollTo(document.querySelector(`[data-product-id="${savedProductId}"]`));
         }
@@ -744,7 +933,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
         resetCategoryForm();
         closeModal(modalAddCategory);
-        await loadData();
+        await syncChanges();
     });
 
     // Confirmer suppression
@@ -764,7 +953,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const alerts = [];
         DB.forEach(cat => {
             const lowProducts = cat.products.filter(p => {
-                const t = p.low_stock_threshold ?? 5;
+                const t = effectiveThreshold(p, cat);
                 return p.qty === null || p.qty <= t;
             });
             if (lowProducts.length > 0) {
@@ -811,7 +1000,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 </div>
                 ${group.products.map(p => {
                     const isUnknown = p.qty === null;
-                    const t = p.low_stock_threshold ?? 5;
+                    const t = effectiveThreshold(p, group.category);
                     return `
                         <div class="alert-item ${isUnknown ? 'unknown' : ''}">
                             <div class="alert-item-info">
@@ -982,10 +1171,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (settings.update_notif === false) return;
 
         try {
-            const [versionData, changelog] = await Promise.all([
-                api('/api/version'),
-                api('/api/changelog')
-            ]);
+            const versionData = await api('/api/version');
 
             const currentSha = versionData.sha;
             const storedSha = localStorage.getItem('poulstock_sha');
@@ -999,6 +1185,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
             localStorage.setItem('poulstock_sha', currentSha);
 
+            // URL versionnée par le SHA : le changelog peut rester longtemps en cache HTTP
+            const changelog = await api(`/api/changelog?v=${encodeURIComponent(currentSha)}`);
             if (!changelog || changelog.length === 0) return;
 
             const latest = changelog[0];
@@ -1018,7 +1206,7 @@ document.addEventListener('DOMContentLoaded', () => {
        INIT — Charger les données depuis l'API
     =========================================== */
 
-    loadData();
+    loadData().then(openStream);
     checkForUpdate();
 
 });
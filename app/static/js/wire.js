@@ -0,0 +1,49 @@
+/* =============================================
+   Poulstock — wire.js
+   Format compact de /api/data : produits d'une catégorie en colonnes,
+   colonnes omises quand toutes leurs valeurs valent le défaut.
+   Doit rester aligné sur routes/serializers.py (PRODUCT_COLUMNS / PRODUCT_DEFAULTS).
+   ============================================= */
+
+(function (root) {
+
+    const COMPACT_TYPE = 'application/vnd.poulstock.compact+json';
+    const COMPACT_VERSION = 1;
+
+    // Colonnes -> [{ id, name, qty, ... }] : la forme que main.js garde dans DB.
+    // Objet littéral de forme fixe (une seule "hidden class" V8) ; colonne absente -> valeur par défaut
+    function decodeProducts(columns) {
+        const { id = [], name, qty, unit, note, group, low_stock_threshold: threshold } = columns;
+        const n = id.length;
+        const products = new Array(n);
+        for (let i = 0; i < n; i++) {
+            products[i] = {
+                id: id[i],
+                name: name[i],
+                qty: qty ? qty[i] : null,
+                unit: unit ? unit[i] : '',
+                note: note ? note[i] : null,
+                group: group ? group[i] : null,
+                low_stock_threshold: threshold ? threshold[i] : null,
+            };
+        }
+        return products;
+    }
+
+    function decodeData(payload) {
+        if (payload.v !== COMPACT_VERSION) {
+            throw new Error(`Format compact inconnu : v${payload.v}`);
+        }
+        return payload.categories.map(cat => ({ ...cat, products: decodeProducts(cat.products) }));
+    }
+
+    // Corps de /api/data -> DB, quel que soit le format renvoyé (un cache peut servir l'ancien)
+    async function readData(response) {
+        const body = await response.json();
+        const type = response.headers.get('Content-Type') || '';
+        return type.startsWith(COMPACT_TYPE) ? decodeData(body) : body;
+    }
+
+    root.PoulstockWire = { COMPACT_TYPE, decodeData, readData };
+
+})(typeof self !== 'undefined' ? self : globalThis);
@@ -1 +1,240 @@
-self.addEventListener('fetch', () => {});
+/* =============================================
+   Poulstock — Service worker
+   Coquille de l'app en cache (une version par déploiement), /api/data en
+   stale-while-revalidate, écritures hors ligne mises en file (IndexedDB)
+   puis rejouées dans l'ordre au retour du réseau.
+   ============================================= */
+
+// Remplacé par le SHA du déploiement (le même que /api/version) quand /sw.js est servi :
+// le fichier change à chaque déploiement, le navigateur installe donc la nouvelle version
+const VERSION = '__COMMIT_SHA__';
+
+const SHELL_CACHE = `poulstock-shell-${VERSION}`;
+const DATA_CACHE  = 'poulstock-data';     // une entrée /api/data par site (en-tête X-Tenant)
+const CDN_CACHE   = 'poulstock-cdn';
+
+const SHELL_URLS = [
+    '/',
+    '/static/css/style.css',
+    '/static/js/wire.js',
+    '/static/js/main.js',
+    '/static/manifest.json',
+    '/static/img/logo.png',
+    '/static/img/icon-192x192.png',
+    '/static/img/icon-512x512.png',
+];
+
+// Hors origine : best effort, l'installation ne doit pas échouer si un CDN est injoignable
+const CDN_URLS = [
+    'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.1/css/all.min.css',
+];
+
+/* ===========================================
+   INSTALLATION — Précache de la coquille
+=========================================== */
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const shell = await caches.open(SHELL_CACHE);
+        await shell.addAll(SHELL_URLS);
+        const cdn = await caches.open(CDN_CACHE);
+        await Promise.allSettled(CDN_URLS.map(async url => {
+            if (!(await cdn.match(url))) {
+                await cdn.put(url, await fetch(new Request(url, { mode: 'no-cors' })));
+            }
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter(name => name.startsWith('poulstock-shell-') && name !== SHELL_CACHE)
+            .map(name => caches.delete(name)));
+        await self.clients.claim();
+        await replayOutbox();
+    })());
+});
+
+/* ===========================================
+   FETCH — Stratégies de cache
+=========================================== */
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    const sameOrigin = url.origin === self.location.origin;
+
+    if (request.method !== 'GET') {
+        if (sameOrigin && url.pathname.startsWith('/api/')) {
+            event.respondWith(sendOrQueue(request));
+        }
+        return;
+    }
+
+    if (sameOrigin && url.pathname === '/api/data') {
+        event.respondWith(staleWhileRevalidate(event));
+        return;
+    }
+    // Le reste de l'API (dont le flux /api/stream) passe directement par le réseau
+    if (sameOrigin && url.pathname.startsWith('/api/')) return;
+
+    if (request.mode === 'navigate') {
+        // /?tenant=<site> doit atteindre le serveur : c'est sa réponse qui pose le cookie du site
+        event.respondWith(url.searchParams.has('tenant')
+            ? fetch(request).catch(() => cacheFirst(SHELL_CACHE, '/'))
+            : cacheFirst(SHELL_CACHE, '/'));
+        return;
+    }
+    event.respondWith(cacheFirst(sameOrigin ? SHELL_CACHE : CDN_CACHE, request));
+});
+
+async function cacheFirst(cacheName, request) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request, { ignoreSearch: typeof request === 'string' });
+    if (cached) return cached;
+    const response = await fetch(request);
+    // Les polices Font Awesome / Google arrivent à l'exécution : on les garde aussi
+    if (cacheName === CDN_CACHE && (response.ok || response.type === 'opaque')) {
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// Clé de cache par site : les données d'un site ne doivent jamais s'afficher pour un autre
+function dataCacheKey(request) {
+    const tenant = request.headers.get('X-Tenant');
+    return tenant ? `/api/data?tenant=${encodeURIComponent(tenant)}` : '/api/data';
+}
+
+async function staleWhileRevalidate(event) {
+    const cache = await caches.open(DATA_CACHE);
+    const key = dataCacheKey(event.request);
+    // La réponse varie selon Accept : la page demande toujours le même format, on ignore Vary
+    const cached = await cache.match(key, { ignoreVary: true });
+    const network = fetch(event.request).then(response => {
+        if (response.ok) cache.put(key, response.clone());
+        return response;
+    });
+    if (cached) {
+        // La page reçoit tout de suite la dernière copie (avec son X-Revision) ;
+        // /api/stream lui envoie ensuite ce qui a changé depuis
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+}
+
+/* ===========================================
+   OUTBOX — Écritures hors ligne (IndexedDB)
+=========================================== */
+
+function openOutbox() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open('poulstock', 1);
+        req.onupgradeneeded = () => req.result.createObjectStore('outbox', { keyPath: 'seq', autoIncrement: true });
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+async function outboxTx(mode, fn) {
+    const db = await openOutbox();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction('outbox', mode);
+        const result = fn(tx.objectStore('outbox'));
+        tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+const outboxAll    = () => outboxTx('readonly', store => store.getAll());
+const outboxAdd    = entry => outboxTx('readwrite', store => store.add(entry));
+const outboxDelete = seq => outboxTx('readwrite', store => store.delete(seq));
+
+async function notifyClients(message) {
+    const clients = await self.clients.matchAll({ includeUncontrolled: true });
+    clients.forEach(client => client.postMessage(message));
+}
+
+async function enqueue(request, body) {
+    const idempotencyKey = request.headers.get('Idempotency-Key') || crypto.randomUUID();
+    await outboxAdd({
+        url: request.url,
+        method: request.method,
+        contentType: request.headers.get('Content-Type'),
+        idempotencyKey,
+        // Rejouée sur son site, même si la page a changé de site entre-temps
+        tenant: request.headers.get('X-Tenant'),
+        body,
+        queuedAt: Date.now(),
+    });
+    const pending = (await outboxAll()).length;
+    notifyClients({ type: 'outbox', pending });
+    if (self.registration.sync) {
+        self.registration.sync.register('outbox').catch(() => {});
+    }
+    return new Response(JSON.stringify({ queued: true, pending }), {
+        status: 202,
+        headers: { 'Content-Type': 'application/json' },
+    });
+}
+
+async function sendOrQueue(request) {
+    const body = await request.clone().text();
+    // Des écritures attendent déjà : celle-ci passe après elles, pour garder l'ordre
+    if ((await outboxAll()).length > 0) {
+        const response = await enqueue(request, body);
+        replayOutbox();
+        return response;
+    }
+    try {
+        return await fetch(request);
+    } catch (_) {
+        return enqueue(request, body);
+    }
+}
+
+let replaying = null;
+
+function replayOutbox() {
+    if (!replaying) {
+        replaying = doReplay().finally(() => { replaying = null; });
+    }
+    return replaying;
+}
+
+async function doReplay() {
+    const entries = await outboxAll();
+    let replayed = 0;
+    for (const entry of entries) {
+        const headers = { 'Idempotency-Key': entry.idempotencyKey };
+        if (entry.contentType) headers['Content-Type'] = entry.contentType;
+        if (entry.tenant) headers['X-Tenant'] = entry.tenant;
+        let response;
+        try {
+            response = await fetch(entry.url, { method: entry.method, headers, body: entry.body || undefined });
+        } catch (_) {
+            break;  // toujours hors ligne : on réessaiera
+        }
+        if (response.status >= 500) break;
+        // 2xx, ou 4xx qui échouerait de la même façon : l'écriture est traitée
+        await outboxDelete(entry.seq);
+        replayed++;
+    }
+    const pending = (await outboxAll()).length;
+    if (replayed > 0 || pending !== entries.length) {
+        notifyClients({ type: 'outbox-replayed', replayed, pending });
+    }
+}
+
+self.addEventListener('sync', event => {
+    if (event.tag === 'outbox') event.waitUntil(replayOutbox());
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'replay-outbox') event.waitUntil(replayOutbox());
+});
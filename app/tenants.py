@@ -0,0 +1,226 @@
+"""Plusieurs sites (cuisines, magasins) servis par un même processus, une base SQLite par site
+
+Sans ``TENANTS_DIR``, rien ne change : un seul site, la base ``STOCK_DB_PATH``.
+Avec ``TENANTS_DIR``, chaque site a son fichier ``<TENANTS_DIR>/<site>.db``. Le site d'une
+requête est lu dans l'en-tête ``X-Tenant``, sinon le paramètre ``?tenant=``, sinon le
+cookie ``tenant`` (posé par ``/?tenant=<site>`` pour le navigateur), sinon ``DEFAULT_TENANT``.
+``TenantSession`` (models/db.py) lie alors ``db.session`` à la base du site.
+
+Les moteurs ouverts sont gardés dans un LRU de ``TENANT_POOL_SIZE`` entrées : le moins
+récemment utilisé est fermé au-delà, pour servir des centaines de sites sans épuiser
+les descripteurs de fichiers.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, jsonify, request
+from sqlalchemy import create_engine
+
+from models import db, init_db
+
+logger = logging.getLogger(__name__)
+
+TENANT_HEADER = 'X-Tenant'
+TENANT_COOKIE = 'tenant'
+# Routes transverses à tous les sites : aucun site n'est sélectionné
+GLOBAL_PREFIX = '/api/tenants/'
+# Clé utilisée dans les noms de fichiers : pas de séparateur de chemin possible
+_KEY_RE = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+
+
+def tenants_dir():
+    return os.getenv('TENANTS_DIR') or None
+
+
+def valid_key(key):
+    return bool(key) and _KEY_RE.match(key) is not None
+
+
+class EnginePool:
+    """Moteurs SQLAlchemy des sites, du plus ancien au plus récemment utilisé."""
+
+    def __init__(self, directory, capacity, engine_options):
+        self.directory = directory
+        self.capacity = capacity
+        self.engine_options = engine_options
+        self.on_create = []          # fn(engine), appelées à chaque ouverture (métriques...)
+        self._engines = OrderedDict()
+        self._initialized = set()    # schéma vérifié une fois par processus, même après éviction
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.db')
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def keys(self):
+        """Tous les sites ayant une base, ouverte ou non."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-3] for name in names if name.endswith('.db') and valid_key(name[:-3]))
+
+    def open_keys(self):
+        """Sites dont le moteur est ouvert, du moins au plus récemment utilisé."""
+        with self._lock:
+            return list(self._engines)
+
+    def has_rows(self, key, table):
+        """Test léger par une connexion sqlite3 éphémère en lecture seule : ne fait pas tourner le LRU."""
+        try:
+            conn = sqlite3.connect(f'file:{self.path(key)}?mode=ro', uri=True, timeout=1)
+        except sqlite3.Error:
+            return False
+        try:
+            return conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() is not None
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+
+    def get(self, key, create=True):
+        """Moteur du site, ouvert au besoin ; avec ``create=False``, ``None`` s'il n'est pas déjà ouvert."""
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                self._engines.move_to_end(key)
+                return engine
+            if not create:
+                return None
+            engine = create_engine('sqlite:///' + self.path(key), **self.engine_options)
+            for fn in self.on_create:
+                fn(engine)
+            if key not in self._initialized:
+                init_db(engine)
+                self._initialized.add(key)
+            self._engines[key] = engine
+            while len(self._engines) > self.capacity:
+                evicted_key, evicted = self._engines.popitem(last=False)
+                # Les connexions encore empruntées sont fermées à leur retour
+                evicted.dispose()
+                logger.debug("Site %s : moteur fermé (LRU)", evicted_key)
+            return engine
+
+    def dispose_all(self):
+        with self._lock:
+            while self._engines:
+                self._engines.popitem()[1].dispose()
+
+
+pool = None
+
+
+def current_tenant():
+    """Site de la requête ou du contexte en cours (``None`` en mode mono-site)."""
+    return g.get('tenant')
+
+
+def all_tenants():
+    """Sites à parcourir par les tâches de fond : ``[None]`` (base par défaut) en mode mono-site."""
+    return pool.keys() if pool is not None else [None]
+
+
+def open_tenants():
+    """
+    Sites déjà ouverts par ce processus (``[None]`` en mode mono-site). Les parcourir du plus
+    ancien au plus récent garde l'ordre du LRU : aucun moteur n'est ouvert ni fermé.
+    """
+    return pool.open_keys() if pool is not None else [None]
+
+
+def database_path(app, key):
+    """Fichier SQLite du site ``key`` (``None`` : la base par défaut)."""
+    if key is not None:
+        return pool.path(key)
+    with app.app_context():
+        return db.engine.url.database
+
+
+@contextmanager
+def readonly_connection(app, key, timeout=5):
+    """Connexion sqlite3 éphémère en lecture seule sur la base d'un site, pour les lectures en fan-out."""
+    conn = sqlite3.connect(f'file:{database_path(app, key)}?mode=ro', uri=True, timeout=timeout)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def tenants_with_rows(table):
+    """Sites dont la table ``table`` n'est pas vide (files d'attente des tâches de fond)."""
+    if pool is None:
+        return [None]
+    return [key for key in pool.keys() if pool.has_rows(key, table)]
+
+
+@contextmanager
+def tenant_context(app, key, open_only=False):
+    """
+    Contexte d'application lié à la base du site ``key`` (threads, fan-out). Renvoie False,
+    sans rien ouvrir, si ``open_only`` et que le site n'est pas (ou plus) ouvert.
+    """
+    with app.app_context():
+        if key is not None:
+            engine = pool.get(key, create=not open_only)
+            if engine is None:
+                yield False
+                return
+            g.tenant = key
+            g.tenant_engine = engine
+        yield True
+
+
+def _resolve_key():
+    return (
+        request.headers.get(TENANT_HEADER)
+        or request.args.get('tenant')
+        or request.cookies.get(TENANT_COOKIE)
+        or os.getenv('DEFAULT_TENANT')
+    )
+
+
+def _select_tenant():
+    if pool is None or request.path.startswith(GLOBAL_PREFIX):
+        return None
+    key = _resolve_key()
+    if not key:
+        if request.path.startswith('/api/'):
+            return jsonify({'error': f'Site requis (en-tête {TENANT_HEADER} ou ?tenant=)'}), 400
+        return None
+    if not valid_key(key):
+        return jsonify({'error': 'Identifiant de site invalide'}), 400
+    if not pool.exists(key) and os.getenv('TENANT_AUTO_CREATE', 'false').lower() != 'true':
+        return jsonify({'error': 'Site inconnu'}), 404
+    g.tenant = key
+    g.tenant_engine = pool.get(key)
+    return None
+
+
+def _remember_tenant(response):
+    # Le navigateur garde son site : fetch, EventSource et service worker l'envoient sans y penser
+    key = request.args.get('tenant')
+    if pool is not None and request.path == '/' and key and key == g.get('tenant'):
+        response.set_cookie(TENANT_COOKIE, key, max_age=365 * 24 * 3600, samesite='Lax')
+    return response
+
+
+def init_tenants(app, engine_options):
+    """Active le mode multi-site si ``TENANTS_DIR`` est défini ; à appeler avant les autres hooks."""
+    global pool
+    directory = tenants_dir()
+    if directory is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    # Peu de connexions gardées par site : c'est le nombre de sites ouverts qui compte
+    options = dict(engine_options, pool_size=int(os.getenv('TENANT_ENGINE_POOL_SIZE', '2')))
+    pool = EnginePool(directory, int(os.getenv('TENANT_POOL_SIZE', '64')), options)
+    app.before_request(_select_tenant)
+    app.after_request(_remember_tenant)
+    return pool
@@ -0,0 +1,100 @@
+"""
+Test de stress : K processus modifient en même temps la quantité d'un même produit.
+Compare POST /api/products/<id>/adjust (incrément atomique) au chemin GET + PUT
+(valeur absolue), qui perd des mises à jour.
+
+Le cas « drain » part d'un stock égal à la moitié des retraits demandés : exactement ce
+stock doit être retiré (le reste refusé en 409), la quantité finir à 0 et le journal des
+mouvements ne compter que les retraits appliqués.
+
+    python benchmarks/bench_adjust.py --workers 8 --ops 200
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from common import load_app
+
+INITIAL_QTY = 1_000_000
+
+
+def worker(mode, db_path, prod_id, n_ops, start_event, results):
+    app = load_app(db_path)
+    client = app.test_client()
+    start_event.wait()
+    started = time.perf_counter()
+    applied = 0
+    for i in range(n_ops):
+        delta = -1 if mode == 'drain' else (1 if i % 3 == 0 else -1)
+        if mode in ('adjust', 'drain'):
+            response = client.post(f'/api/products/{prod_id}/adjust', json={'delta': delta})
+        else:
+            current = client.get('/api/data').get_json()[0]['products'][0]['qty']
+            response = client.put(f'/api/products/{prod_id}', json={'qty': current + delta})
+        if response.status_code == 200:
+            applied += delta
+    results.put((applied, time.perf_counter() - started))
+
+
+def run(mode, args, ctx):
+    initial_qty = args.workers * args.ops // 2 if mode == 'drain' else INITIAL_QTY
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        init = ctx.Process(target=load_app, args=(db_path,))
+        init.start()
+        init.join()
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO categories (id, name, icon, color, sort_order, revision) "
+                     "VALUES (1, 'Bench', 'fa-solid fa-box', '#5B8C3E', 0, 0)")
+        conn.execute("INSERT INTO products (id, category_id, name, qty, unit, note, grp, low_stock_threshold, "
+                     "low_stock_alert_sent, revision) VALUES ('bench', 1, 'Produit', ?, '', '', '', 5, 0, 0)",
+                     (initial_qty,))
+        conn.commit()
+
+        start_event = ctx.Event()
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=worker, args=(mode, db_path, 'bench', args.ops, start_event, results))
+            for _ in range(args.workers)
+        ]
+        for proc in procs:
+            proc.start()
+        time.sleep(2)  # laisse chaque processus importer l'application
+        start_event.set()
+        expected, elapsed = initial_qty, 0.0
+        for _ in procs:
+            applied, duration = results.get()
+            expected += applied
+            elapsed = max(elapsed, duration)
+        for proc in procs:
+            proc.join()
+
+        final = conn.execute("SELECT qty FROM products WHERE id = 'bench'").fetchone()[0]
+        ledger = conn.execute("SELECT COALESCE(SUM(delta), 0) FROM stock_movements WHERE product_id = 'bench'").fetchone()[0]
+        conn.close()
+
+    total_ops = args.workers * args.ops
+    status = 'exact' if final == expected else f'{abs(final - expected)} mise(s) à jour perdue(s)'
+    if mode == 'drain':
+        ok = final == 0 and expected == 0 and ledger == -initial_qty
+        status = 'exact' if ok else f'stock {final}, mouvements {ledger} pour {initial_qty} retirables'
+    print(f"  {mode:<7} {total_ops / elapsed:8.1f} op/s   attendu: {expected}   obtenu: {final}   ({status})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=200, help='opérations par processus')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{args.workers} processus × {args.ops} opérations sur un même produit")
+    for mode in ('adjust', 'put', 'drain'):
+        run(mode, args, ctx)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,395 @@
+"""
+Banc de charge des principaux endpoints, via le client de test Flask ou un vrai gunicorn.
+
+Chaque run repart d'une base SQLite temporaire remplie de données synthétiques, avec un
+faux serveur SMTP local pour les alertes. Pour chaque scénario : p50 / p95 / p99, débit,
+et pic de mémoire (RSS) du processus qui sert l'application. Les résultats sont écrits en
+JSON ; ``--baseline`` compare le p95 à un run précédent et sort en erreur au-delà de
+``--max-regression``.
+
+``data`` mesure ``/api/data`` servi par le cache de réponse ; ``data_miss`` fait précéder
+chaque lecture d'un ajustement de stock (non chronométré) qui change la révision : chaque
+lecture reconstruit alors la réponse. En fin de run, le banc attend que la file d'alertes
+soit vidée et sort en erreur si des alertes ont été levées sans qu'aucun email n'arrive.
+
+    python benchmarks/bench_api.py --size small --output bench-client.json
+    python benchmarks/bench_api.py --mode gunicorn --concurrency 8 --output bench-gunicorn.json
+    python benchmarks/bench_api.py --baseline bench-client.json --max-regression 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from common import APP_DIR, TESTS_DIR, load_app, seed
+
+sys.path.insert(0, TESTS_DIR)
+from fake_smtp import FakeSmtpServer
+
+SIZES = {
+    'small': (10, 100),
+    'medium': (50, 1000),
+    'large': (200, 2500),
+}
+
+SCENARIOS = [
+    'data', 'data_miss', 'create_product', 'update_product', 'delete_product',
+    'reorder_categories', 'product_threshold', 'category_threshold',
+]
+# Une lecture concurrente pourrait profiter de la réponse reconstruite par une autre
+SEQUENTIAL_SCENARIOS = {'data_miss'}
+
+
+# ──────────────────────────────────────────
+# Transports : client de test ou HTTP réel
+# ──────────────────────────────────────────
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+    def peak_rss_kb(self):
+        # ru_maxrss est en Kio sous Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def close(self):
+        pass
+
+
+class GunicornTransport:
+    def __init__(self, db_path, env, worker_class, workers):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{self.port}',
+                '--worker-class', worker_class, '--workers', str(workers), 'app:app',
+            ],
+            cwd=APP_DIR,
+            env={**os.environ, **env, 'STOCK_DB_PATH': db_path},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{self.port}/health', timeout=1)
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        self.close()
+        raise RuntimeError("gunicorn n'a pas démarré")
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(
+            f'http://127.0.0.1:{self.port}{path}', data=data, method=method,
+            headers={'Content-Type': 'application/json'} if data is not None else {},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                raw = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            raw, status = e.read(), e.code
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+    def peak_rss_kb(self):
+        """Somme des pics (VmHWM) du master et des workers, lue dans /proc (Linux)."""
+        pids = [self.process.pid]
+        try:
+            children = f'/proc/{self.process.pid}/task/{self.process.pid}/children'
+            with open(children) as f:
+                pids += [int(pid) for pid in f.read().split()]
+            total = 0
+            for pid in pids:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmHWM:'):
+                            total += int(line.split()[1])
+            return total
+        except OSError:
+            return None
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+# ──────────────────────────────────────────
+# Scénarios
+# ──────────────────────────────────────────
+def build_calls(scenario, n, state, rng):
+    """
+    Liste de ``(méthode, chemin, corps)`` à rejouer pour un scénario ; un quatrième élément,
+    s'il est présent, est un appel préalable exécuté hors chronométrage.
+    """
+    categories, products = state['categories'], state['products']
+    if scenario == 'data':
+        return [('GET', '/api/data', None)] * n
+    if scenario == 'data_miss':
+        return [
+            ('GET', '/api/data', None, ('POST', f'/api/products/{rng.choice(products)}/adjust', {'delta': 1}))
+            for _ in range(n)
+        ]
+    if scenario == 'create_product':
+        return [
+            ('POST', '/api/products', {
+                'category_id': rng.choice(categories), 'name': f'Bench {i}', 'qty': rng.randrange(0, 50),
+                'unit': 'kg',
+            })
+            for i in range(n)
+        ]
+    if scenario == 'update_product':
+        return [
+            ('PUT', f'/api/products/{rng.choice(products)}', {'qty': rng.randrange(0, 100)})
+            for _ in range(n)
+        ]
+    if scenario == 'delete_product':
+        # Les produits créés par create_product, pour ne pas vider le jeu de départ
+        return [('DELETE', f'/api/products/{prod_id}', None) for prod_id in state['created'][:n]]
+    if scenario == 'reorder_categories':
+        calls = []
+        for _ in range(n):
+            order = categories[:]
+            rng.shuffle(order)
+            calls.append(('PUT', '/api/categories/reorder', [
+                {'id': cat_id, 'sort_order': i} for i, cat_id in enumerate(order)
+            ]))
+        return calls
+    if scenario == 'product_threshold':
+        return [
+            ('PUT', f'/api/products/{rng.choice(products)}/threshold', {'low_stock_threshold': rng.randrange(0, 20)})
+            for _ in range(n)
+        ]
+    if scenario == 'category_threshold':
+        return [
+            ('PUT', f'/api/categories/{rng.choice(categories)}/threshold', {'low_stock_threshold': rng.randrange(0, 20)})
+            for _ in range(n)
+        ]
+    raise ValueError(scenario)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(transport, calls, concurrency):
+    def timed_call(call):
+        method, path, body = call[:3]
+        if len(call) > 3:
+            transport.request(*call[3])
+        start = time.perf_counter()
+        status, payload = transport.request(method, path, body)
+        return time.perf_counter() - start, status, payload
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(timed_call, calls))
+    else:
+        outcomes = [timed_call(call) for call in calls]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(o[0] * 1000 for o in outcomes)
+    errors = sum(1 for o in outcomes if o[1] >= 400)
+    return {
+        'count': len(outcomes),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'throughput_rps': round(len(outcomes) / wall, 1) if wall else None,
+    }, outcomes
+
+
+def _pending_alerts(db_path):
+    """``(alertes en file, produits signalés en stock faible)``, lus dans la base du run."""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, timeout=5)
+    try:
+        pending = conn.execute('SELECT COUNT(*) FROM alert_outbox').fetchone()[0]
+        flagged = conn.execute('SELECT COUNT(*) FROM products WHERE low_stock_alert_sent = 1').fetchone()[0]
+    finally:
+        conn.close()
+    return pending, flagged
+
+
+def wait_for_alerts(db_path, smtp, timeout):
+    """
+    Attend que le dispatcher ait vidé ``alert_outbox`` (fenêtre de regroupement comprise).
+    Renvoie ``(alertes restantes, produits signalés)``.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        pending, flagged = _pending_alerts(db_path)
+        if pending == 0 and (smtp.messages or not flagged):
+            return pending, flagged
+        if time.monotonic() >= deadline:
+            return pending, flagged
+        time.sleep(0.2)
+
+
+def compare(results, baseline, max_regression):
+    """Lignes de comparaison du p95 et liste des scénarios en régression."""
+    lines, regressions = [], []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not previous.get('p95_ms'):
+            continue
+        ratio = current['p95_ms'] / previous['p95_ms'] - 1
+        flag = ''
+        if ratio > max_regression:
+            flag = '  <-- RÉGRESSION'
+            regressions.append(name)
+        lines.append(f"  {name:<20} p95 {previous['p95_ms']:9.2f} -> {current['p95_ms']:9.2f} ms ({ratio:+.0%}){flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('client', 'gunicorn'), default='client')
+    parser.add_argument('--size', choices=SIZES, default='small')
+    parser.add_argument('--categories', type=int, help='remplace le nombre de catégories de --size')
+    parser.add_argument('--products', type=int, help='remplace le nombre de produits par catégorie de --size')
+    parser.add_argument('--requests', type=int, default=200, help='requêtes par scénario')
+    parser.add_argument('--concurrency', type=int, default=1, help='requêtes simultanées (mode gunicorn)')
+    parser.add_argument('--worker-class', default='sync', help='classe de worker gunicorn (sync, gevent...)')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='fichier JSON des résultats')
+    parser.add_argument('--baseline', help='résultats JSON de référence')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='hausse de p95 tolérée (0.2 = +20 %%)')
+    args = parser.parse_args()
+
+    n_categories, n_products = SIZES[args.size]
+    n_categories = args.categories or n_categories
+    n_products = args.products or n_products
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"scénario(s) inconnu(s) : {', '.join(sorted(unknown))}")
+    if 'delete_product' in scenarios and 'create_product' not in scenarios:
+        parser.error('delete_product supprime les produits créés par create_product')
+
+    smtp = FakeSmtpServer().start()
+    env = {
+        **smtp.env(),
+        'ALERT_DIGEST_WINDOW': '1',
+        'ALERT_POLL_INTERVAL': '1',
+        'LOW_STOCK_SWEEP_INTERVAL': '0',
+    }
+    os.environ.update(env)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        if args.mode == 'client':
+            app = load_app(db_path)
+            seed(db_path, n_categories, n_products, seed_value=args.seed)
+            transport = TestClientTransport(app)
+        else:
+            # Schéma créé dans un processus jetable, puis données, puis gunicorn
+            subprocess.run(
+                [sys.executable, '-c', f'import common; common.load_app({db_path!r})'],
+                cwd=os.path.dirname(os.path.abspath(__file__)), check=True, env={**os.environ},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            seed(db_path, n_categories, n_products, seed_value=args.seed)
+            transport = GunicornTransport(db_path, env, args.worker_class, args.workers)
+
+        try:
+            status, data = transport.request('GET', '/api/data')
+            state = {
+                'categories': [c['id'] for c in data],
+                'products': [p['id'] for c in data for p in c['products']],
+                'created': [],
+            }
+            print(f"{args.mode} : {len(state['categories'])} catégories, {len(state['products'])} produits, "
+                  f"{args.requests} requêtes par scénario, concurrence {args.concurrency}\n")
+            print(f"  {'scénario':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9} {'erreurs':>8}")
+
+            results = {}
+            for scenario in scenarios:
+                calls = build_calls(scenario, args.requests, state, rng)
+                concurrency = 1 if scenario in SEQUENTIAL_SCENARIOS else args.concurrency
+                stats, outcomes = run_scenario(transport, calls, concurrency)
+                if scenario == 'create_product':
+                    state['created'] = [o[2]['id'] for o in outcomes if o[1] == 201]
+                results[scenario] = stats
+                print(f"  {scenario:<20} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} "
+                      f"{stats['throughput_rps']:9.1f} {stats['errors']:8d}")
+            peak_rss = transport.peak_rss_kb()
+            # Le serveur doit tourner tant que la file n'est pas vide : c'est lui qui envoie
+            pending_alerts, flagged = wait_for_alerts(
+                db_path, smtp, timeout=float(env['ALERT_DIGEST_WINDOW']) + 3 * float(env['ALERT_POLL_INTERVAL']) + 5,
+            )
+        finally:
+            transport.close()
+            smtp.shutdown()
+
+    if peak_rss is not None:
+        print(f"\nPic RSS : {peak_rss / 1024:.1f} Mio")
+    print(f"Emails reçus par le faux SMTP : {len(smtp.messages)} "
+          f"({flagged} produit(s) signalé(s), {pending_alerts} alerte(s) non envoyée(s))")
+    alerts_ok = pending_alerts == 0 and (len(smtp.messages) > 0 or flagged == 0)
+
+    output = {
+        'meta': {
+            'mode': args.mode,
+            'categories': n_categories,
+            'products_per_category': n_products,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'worker_class': args.worker_class if args.mode == 'gunicorn' else None,
+            'python': platform.python_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'peak_rss_kb': peak_rss,
+        'emails': {'received': len(smtp.messages), 'flagged_products': flagged, 'pending': pending_alerts},
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Résultats : {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(output, baseline, args.max_regression)
+        print(f"\nComparaison avec {args.baseline} (tolérance +{args.max_regression:.0%}) :")
+        print('\n'.join(lines) or '  aucun scénario commun')
+        if regressions:
+            sys.exit(1)
+    if not alerts_ok:
+        print("\nAlertes stock faible levées mais non envoyées", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
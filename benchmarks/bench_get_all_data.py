@@ -0,0 +1,87 @@
+"""
+Compare l'ancien GET /api/data (chargement paresseux par catégorie + tri Python)
+au chemin actuel (deux requêtes ordonnées par index, sans objets ORM).
+
+    python benchmarks/bench_get_all_data.py --categories 100 --products 10000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from common import QueryCounter, load_app, seed
+
+
+def legacy_get_all_data(Category):
+    """Copie de l'implémentation d'origine, gardée ici comme référence."""
+    categories = Category.query.order_by(Category.sort_order, Category.name).all()
+    result = []
+    for cat in categories:
+        result.append({
+            'id': cat.id,
+            'name': cat.name,
+            'icon': cat.icon,
+            'color': cat.color,
+            'low_stock_threshold': cat.low_stock_threshold if cat.low_stock_threshold is not None else 5,
+            'products': [
+                {
+                    'id': p.id,
+                    'name': p.name,
+                    'qty': p.qty,
+                    'unit': p.unit,
+                    'note': p.note if p.note else None,
+                    'group': p.grp if p.grp else None,
+                    'low_stock_threshold': p.low_stock_threshold if p.low_stock_threshold is not None else 5,
+                }
+                for p in sorted(cat.products, key=lambda x: x.id)
+            ]
+        })
+    return result
+
+
+def measure(app, fn, repeat):
+    from models import db
+    durations, queries = [], 0
+    for _ in range(repeat):
+        with app.test_request_context('/api/data'):
+            with QueryCounter(db.engine) as counter:
+                start = time.perf_counter()
+                fn()
+                durations.append(time.perf_counter() - start)
+            queries = counter.count
+            db.session.remove()
+    return queries, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=100)
+    parser.add_argument('--products', type=int, default=10000, help='produits par catégorie')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = load_app(db_path)
+        seed(db_path, args.categories, args.products)
+
+        from models import Category
+        from flask import jsonify
+        from routes.api import get_all_data
+
+        print(f"{args.categories} catégories × {args.products} produits")
+        for label, fn in (
+            ('ancien', lambda: jsonify(legacy_get_all_data(Category)).get_data()),
+            ('actuel', lambda: get_all_data().get_data()),
+        ):
+            queries, durations = measure(app, fn, args.repeat)
+            print(
+                f"  {label:<7} requêtes SQL: {queries:>5}   "
+                f"médiane: {statistics.median(durations) * 1000:9.1f} ms   "
+                f"min: {min(durations) * 1000:9.1f} ms"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Instantané en ligne et restauration à un instant donné, sur une base de N produits.
+
+1. Instantané par l'API de sauvegarde de SQLite (SNAPSHOT_PAGES_PER_STEP pages par tranche),
+   pendant qu'un thread continue d'ajuster des quantités : durée de la copie et latence
+   maximale des écritures concurrentes (elles ne doivent pas attendre la fin de la copie).
+2. M mutations par l'API (ajustements, modifications, créations, suppressions), toutes
+   inscrites au journal d'audit.
+3. POST /api/admin/restore : à l'instant de l'instantané (rien à rejouer, tout à annuler)
+   puis à la fin des mutations (M entrées d'audit à rejouer), et vérification de l'état obtenu.
+
+    python benchmarks/bench_restore.py --products 100000 --mutations 1000 10000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from common import load_app, seed
+
+TOKEN = 'bench'
+HEADERS = {'Authorization': f'Bearer {TOKEN}'}
+
+
+def state(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return (
+            conn.execute('SELECT id, name, sort_order FROM categories ORDER BY id').fetchall(),
+            conn.execute('SELECT id, category_id, name, qty, unit, note, grp FROM products ORDER BY id').fetchall(),
+        )
+    finally:
+        conn.close()
+
+
+def snapshot_under_load(client, db_path):
+    """Instantané pendant des écritures continues ; renvoie (durée, latence max d'écriture, écritures)."""
+    conn = sqlite3.connect(db_path)
+    ids = [row[0] for row in conn.execute('SELECT id FROM products LIMIT 1000')]
+    conn.close()
+    stop = threading.Event()
+    latencies = []
+
+    def writer():
+        writer_conn = sqlite3.connect(db_path, timeout=30)
+        rng = random.Random(1)
+        while not stop.is_set():
+            started = time.perf_counter()
+            writer_conn.execute('UPDATE products SET qty = qty + 1 WHERE id = ?', (rng.choice(ids),))
+            writer_conn.commit()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.001)
+        writer_conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    response = client.post('/api/admin/snapshot', headers=HEADERS)
+    stop.set()
+    thread.join()
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['seconds'], max(latencies or [0]), len(latencies)
+
+
+def mutate(client, db_path, count, rng):
+    conn = sqlite3.connect(db_path)
+    ids = [row[0] for row in conn.execute('SELECT id FROM products')]
+    categories = [row[0] for row in conn.execute('SELECT id FROM categories')]
+    conn.close()
+    started = time.perf_counter()
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.7:
+            client.post(f'/api/products/{rng.choice(ids)}/adjust', json={'delta': rng.randint(-5, 5) or 1})
+        elif roll < 0.85:
+            client.put(f'/api/products/{rng.choice(ids)}', json={'name': f'Renommé {i}', 'qty': rng.randrange(50)})
+        elif roll < 0.95:
+            body = client.post('/api/products', json={
+                'category_id': rng.choice(categories), 'name': f'Nouveau {i}', 'qty': rng.randrange(50),
+            }).get_json()
+            ids.append(body['id'])
+        else:
+            client.delete(f'/api/products/{ids.pop(rng.randrange(len(ids)))}')
+    return time.perf_counter() - started
+
+
+def restore(client, at):
+    response = client.post(f'/api/admin/restore?at={at.timestamp()}', headers=HEADERS)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--mutations', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        os.environ.update(
+            ADMIN_TOKEN=TOKEN, SNAPSHOT_INTERVAL='0', SNAPSHOT_DIR=os.path.join(tmp, 'snapshots'),
+            LOW_STOCK_SWEEP_INTERVAL='0', ALERT_POLL_INTERVAL='3600',
+        )
+        app = load_app(db_path)
+        client = app.test_client()
+        categories = max(args.products // 1000, 1)
+        seed(db_path, categories, args.products // categories)
+        size = os.path.getsize(db_path) / 1024 / 1024
+        print(f"{args.products} produits, base de {size:.0f} Mio\n")
+
+        seconds, worst, writes = snapshot_under_load(client, db_path)
+        print(f"  instantané en ligne       : {seconds * 1000:8.0f} ms "
+              f"({writes} écritures concurrentes, latence max {worst * 1000:.1f} ms)")
+
+        rng = random.Random(7)
+        for count in args.mutations:
+            # Instantané de référence, puis M mutations journalisées
+            time.sleep(0.01)
+            client.post('/api/admin/snapshot', headers=HEADERS)
+            time.sleep(0.01)
+            snapshot_at = datetime.now(timezone.utc)
+            reference = state(db_path)
+            elapsed = mutate(client, db_path, count, rng)
+            mutated_at = datetime.now(timezone.utc)
+            expected = state(db_path)
+            print(f"\n  {count} mutations ({elapsed / count * 1000:.2f} ms chacune, audit compris)")
+
+            body = restore(client, snapshot_at)
+            assert state(db_path) == reference, "état restauré différent de l'instantané"
+            print(f"  restauration à l'instantané : {body['seconds'] * 1000:8.0f} ms "
+                  f"({body['replayed']} rejouées, {body['products']['upserted']} produits réécrits, "
+                  f"{body['products']['deleted']} supprimés)")
+
+            body = restore(client, mutated_at)
+            assert state(db_path) == expected, "état rejoué différent de l'état après mutations"
+            print(f"  restauration après rejeu    : {body['seconds'] * 1000:8.0f} ms "
+                  f"({body['replayed']} entités rejouées, {body['products']['upserted']} produits réécrits, "
+                  f"{body['products']['deleted']} supprimés)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Latence de GET /api/search (FTS5) comparée à un balayage LIKE '%q%' sur les
+mêmes colonnes (nom, note, groupe, catégorie).
+
+    python benchmarks/bench_search.py --categories 100 --products 1000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from common import load_app, seed
+
+LIKE_SQL = """
+    SELECT p.id, p.name, p.qty, p.unit, p.note, p.grp, p.low_stock_threshold, p.category_id, c.name
+    FROM products p JOIN categories c ON c.id = p.category_id
+    WHERE p.name LIKE :q OR p.note LIKE :q OR p.grp LIKE :q OR c.name LIKE :q
+    ORDER BY p.name
+    LIMIT 21
+"""
+
+NOUNS = [
+    'Lait', 'Crème', 'Beurre', 'Yaourt', 'Fromage', 'Œufs', 'Pâtes', 'Riz', 'Farine', 'Sucre', 'Café', 'Thé',
+    'Chocolat', 'Biscuits', 'Confiture', 'Miel', 'Huile', 'Vinaigre', 'Moutarde', 'Sel', 'Poivre', 'Tomates',
+    'Pommes', 'Poires', 'Bananes', 'Carottes', 'Courgettes', 'Épinards', 'Haricots', 'Lentilles', 'Pois chiches',
+    'Jambon', 'Poulet', 'Saumon', 'Thon', 'Sardines', 'Pain', 'Brioche', 'Céréales', 'Compote', 'Jus', 'Eau',
+    'Savon', 'Lessive', 'Éponges', 'Sacs poubelle', 'Papier toilette', 'Essuie-tout', 'Liquide vaisselle',
+]
+ADJECTIVES = [
+    'entier', 'demi-écrémé', 'fraîche', 'bio', 'doux', 'salé', 'nature', 'complet', 'blanc', 'noir', 'sans gluten',
+    'allégé', 'en poudre', 'surgelé', 'en conserve', 'vrac', 'premier prix', 'extra', 'fumé', 'grillé',
+]
+
+QUERIES = ['lait', 'creme fraiche', 'pat', 'epinards bio', 'frais', 'lessive 12', 'introuvable']
+
+
+def realistic_names(db_path, seed_value=3):
+    """Remplace les noms synthétiques par des libellés d'épicerie variés (accents compris)."""
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(db_path)
+    ids = [row[0] for row in conn.execute('SELECT id FROM products')]
+    conn.executemany('UPDATE products SET name = ? WHERE id = ?', (
+        (f'{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)} {rng.randrange(1, 500)}', prod_id) for prod_id in ids
+    ))
+    conn.commit()
+    conn.close()
+
+
+def measure(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=100)
+    parser.add_argument('--products', type=int, default=1000, help='produits par catégorie')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = load_app(db_path)
+        started = time.perf_counter()
+        seed(db_path, args.categories, args.products)
+        realistic_names(db_path)
+        print(f"{args.categories * args.products} produits (remplissage + indexation "
+              f"{time.perf_counter() - started:.1f} s)")
+
+        conn = sqlite3.connect(db_path)
+        started = time.perf_counter()
+        conn.execute('DELETE FROM products_fts')
+        conn.execute("""
+            INSERT INTO products_fts (rowid, product_id, name, note, grp, category)
+            SELECT p.rowid, p.id, p.name, p.note, p.grp, c.name
+            FROM products p LEFT JOIN categories c ON c.id = p.category_id
+        """)
+        conn.commit()
+        print(f"Reconstruction complète de l'index : {time.perf_counter() - started:.2f} s\n")
+
+        from models import match_expression
+        from routes.search import _SEARCH_SQL
+        fts_sql = str(_SEARCH_SQL)
+        client = app.test_client()
+        print(f"  {'requête':<18} {'FTS5 SQL':>10} {'LIKE SQL':>10} {'/api/search':>12}   (ms, médiane)")
+        for q in QUERIES:
+            params = {'match': match_expression(q), 'limit': 21, 'offset': 0}
+            fts = measure(lambda: conn.execute(fts_sql, params).fetchall(), args.runs)
+            like = measure(lambda: conn.execute(LIKE_SQL, {'q': f'%{q}%'}).fetchall(), args.runs)
+            endpoint = measure(lambda: client.get('/api/search', query_string={'q': q}), args.runs)
+            print(f"  {q:<18} {fts:10.2f} {like:10.2f} {endpoint:12.2f}")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
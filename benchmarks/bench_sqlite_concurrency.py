@@ -0,0 +1,102 @@
+"""
+Test de charge concurrent : N processus lecteurs (GET /api/data) et M rédacteurs
+(PUT /api/products/<id>) sur la même base, pour chaque profil SQLite.
+Rapporte le débit et les erreurs « database is locked ».
+
+    python benchmarks/bench_sqlite_concurrency.py --readers 4 --writers 2 --duration 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from common import load_app, seed
+
+
+def worker(role, profile, db_path, duration, product_ids, results):
+    os.environ['SQLITE_PROFILE'] = profile
+    app = load_app(db_path)
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+    client = app.test_client()
+    rng = random.Random()
+    ops = locked = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            if role == 'reader':
+                response = client.get('/api/data')
+            else:
+                response = client.put(f'/api/products/{rng.choice(product_ids)}', json={'qty': rng.randrange(100)})
+            if response.status_code < 400:
+                ops += 1
+            else:
+                errors += 1
+        except Exception as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                locked += 1
+            else:
+                errors += 1
+    results.put((role, ops, locked, errors))
+
+
+def run_profile(profile, args, ctx):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        # Le schéma est créé dans un processus à part pour garder celui-ci vierge
+        init = ctx.Process(target=_init_schema, args=(profile, db_path))
+        init.start()
+        init.join()
+        seed(db_path, args.categories, args.products)
+        conn = sqlite3.connect(db_path)
+        product_ids = [row[0] for row in conn.execute('SELECT id FROM products')]
+        conn.close()
+
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=worker, args=(role, profile, db_path, args.duration, product_ids, results))
+            for role in ['reader'] * args.readers + ['writer'] * args.writers
+        ]
+        for proc in procs:
+            proc.start()
+        totals = {'reader': [0, 0, 0], 'writer': [0, 0, 0]}
+        for _ in procs:
+            role, ops, locked, errors = results.get()
+            totals[role][0] += ops
+            totals[role][1] += locked
+            totals[role][2] += errors
+        for proc in procs:
+            proc.join()
+
+    for role, (ops, locked, errors) in totals.items():
+        print(
+            f"  {profile:<12} {role:<7} {ops / args.duration:9.1f} op/s   "
+            f"verrous: {locked:>5}   autres erreurs: {errors:>5}"
+        )
+
+
+def _init_schema(profile, db_path):
+    os.environ['SQLITE_PROFILE'] = profile
+    load_app(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--products', type=int, default=100, help='produits par catégorie')
+    parser.add_argument('--profiles', default='legacy,performance')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{args.readers} lecteurs, {args.writers} rédacteurs, {args.duration:.0f} s")
+    for profile in args.profiles.split(','):
+        run_profile(profile, args, ctx)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Démarrage à froid d'un worker : temps d'import de app.py (schéma vérifié / migré
+compris), sur une base existante de N produits. Les dépendances (Flask, SQLAlchemy),
+identiques dans tous les cas, sont importées avant le chrono.
+
+Chaque mesure est un nouveau processus Python. Deux cas :
+- base à jour : ce que fait chaque worker gunicorn à chaque (re)démarrage ;
+- user_version remis à 0 : la migration complète (ce que faisait chaque boot avant
+  les migrations versionnées).
+Avec --workers, N processus démarrent en même temps sur la même base (scaling, redémarrage).
+
+    python benchmarks/bench_startup.py --products 100000 --workers 4
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import APP_DIR, seed
+
+# Flask / SQLAlchemy / modèles importés hors chrono : seul ce qui dépend de la base est mesuré
+BOOT_SCRIPT = (
+    "import os, sys, time; sys.path.insert(0, os.environ['APP_DIR']); import models; "
+    "start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+)
+
+
+def boot(env, count=1):
+    """Lance ``count`` imports simultanés ; renvoie leur durée (s) vue de l'intérieur du processus."""
+    procs = [
+        subprocess.Popen([sys.executable, '-c', BOOT_SCRIPT], env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(count)
+    ]
+    durations = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        if proc.returncode != 0:
+            raise SystemExit('Échec du démarrage')
+        durations.append(float(out.strip().splitlines()[-1]))
+    return durations
+
+
+def reset_version(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA user_version = 0')
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        env = dict(
+            os.environ, APP_DIR=APP_DIR, STOCK_DB_PATH=db_path,
+            LOW_STOCK_SWEEP_INTERVAL='0', ALERT_POLL_INTERVAL='3600',
+        )
+        boot(env)   # crée le schéma
+        categories = max(args.products // 1000, 1)
+        seed(db_path, categories, args.products // categories)
+        boot(env)   # indexe les produits insérés en SQL brut
+        print(f"{args.products} produits\n")
+
+        current = [boot(env)[0] for _ in range(args.runs)]
+        full = []
+        for _ in range(args.runs):
+            reset_version(db_path)
+            full.append(boot(env)[0])
+        print(f"  1 worker, base à jour         : {statistics.median(current) * 1000:8.1f} ms")
+        print(f"  1 worker, migration complète  : {statistics.median(full) * 1000:8.1f} ms")
+
+        if args.workers > 1:
+            started = time.perf_counter()
+            durations = boot(env, args.workers)
+            wall = time.perf_counter() - started
+            print(f"  {args.workers} workers, base à jour        : max {max(durations) * 1000:8.1f} ms "
+                  f"(mur {wall * 1000:.0f} ms)")
+            reset_version(db_path)
+            started = time.perf_counter()
+            durations = boot(env, args.workers)
+            wall = time.perf_counter() - started
+            print(f"  {args.workers} workers, migration complète : max {max(durations) * 1000:8.1f} ms "
+                  f"(mur {wall * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
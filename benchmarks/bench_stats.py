@@ -0,0 +1,121 @@
+"""
+Agrégats de /api/stats sur un gros journal de mouvements : cumul journalier
+(``stock_daily``) contre un GROUP BY direct sur ``stock_movements``, et surcoût
+du journal à l'écriture.
+
+    python benchmarks/bench_stats.py --movements 2000000 --days 365
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import load_app, seed
+
+FULL_SCAN_TOP_MOVERS = """
+    SELECT product_id, SUM(-delta) AS consumed
+    FROM stock_movements
+    WHERE delta < 0 AND created_at >= :start
+    GROUP BY product_id
+    ORDER BY consumed DESC
+    LIMIT 10
+"""
+
+
+def seed_movements(db_path, n_movements, n_days, seed_value=7):
+    """Journal synthétique réparti sur ``n_days`` jours, puis cumul journalier reconstruit en SQL."""
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    products = conn.execute('SELECT id, category_id FROM products').fetchall()
+    now = datetime.now()
+
+    def rows():
+        for _ in range(n_movements):
+            prod_id, cat_id = rng.choice(products)
+            at = now - timedelta(seconds=rng.randrange(n_days * 86400))
+            delta = rng.choice((-3, -2, -1, -1, -1, 1, 5, 10))
+            yield prod_id, cat_id, at.isoformat(sep=' '), delta, None, 'adjust'
+
+    conn.executemany(
+        'INSERT INTO stock_movements (product_id, category_id, created_at, delta, qty_after, reason) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        rows(),
+    )
+    # Les dates générées sont locales : date() donne directement le jour de cumul
+    conn.execute("""
+        INSERT INTO stock_daily (day, product_id, category_id, consumed, added, movements)
+        SELECT date(created_at), product_id, MAX(category_id),
+               SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END),
+               SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END),
+               COUNT(*)
+        FROM stock_movements GROUP BY date(created_at), product_id
+    """)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def measure(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--products', type=int, default=40, help='produits par catégorie')
+    parser.add_argument('--movements', type=int, default=2_000_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = load_app(db_path)
+        seed(db_path, args.categories, args.products)
+        started = time.perf_counter()
+        seed_movements(db_path, args.movements, args.days)
+        print(f"{args.movements} mouvements, {args.categories * args.products} produits, {args.days} jours "
+              f"(remplissage {time.perf_counter() - started:.1f} s)")
+
+        from models import db
+        client = app.test_client()
+        prod_id = client.get('/api/data').get_json()[0]['products'][0]['id']
+
+        print("\nLecture (médiane, ms)")
+        for label, url in (
+            ('top-movers 7 j', '/api/stats/top-movers?days=7'),
+            ('top-movers 90 j', '/api/stats/top-movers?days=90'),
+            ('forecast 28 j', '/api/stats/forecast?days=28'),
+            ('consumption 365 j', '/api/stats/consumption?days=365'),
+            ('consumption catégorie 90 j', '/api/stats/consumption?days=90&category_id=1'),
+            ('movements (page 1)', f'/api/products/{prod_id}/movements'),
+        ):
+            print(f"  {label:<28} {measure(lambda: client.get(url), args.runs):8.2f}")
+
+        with app.app_context():
+            start = (datetime.now() - timedelta(days=6)).replace(hour=0, minute=0, second=0).isoformat(sep=' ')
+            full_scan = measure(
+                lambda: db.session.execute(db.text(FULL_SCAN_TOP_MOVERS), {'start': start}).all(), args.runs
+            )
+        print(f"  {'top-movers 7 j (journal brut)':<28} {full_scan:8.2f}")
+
+        n_writes = 500
+        started = time.perf_counter()
+        for i in range(n_writes):
+            client.post(f'/api/products/{prod_id}/adjust', json={'delta': -1 if i % 2 else 1})
+        elapsed = time.perf_counter() - started
+        print(f"\nÉcriture : {n_writes / elapsed:.0f} ajustements/s avec journal + cumul")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Taille de GET /api/data et temps de décodage côté navigateur, JSON habituel contre
+format compact en colonnes (JSON, et MessagePack si le module est installé).
+
+Le décodage est mesuré avec node sur le vrai app/static/js/wire.js :
+JSON.parse seul pour le format habituel, JSON.parse + decodeData pour le compact.
+
+    python benchmarks/bench_wire.py --sizes 1000 10000 100000
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+
+from common import APP_DIR, load_app, seed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WIRE_JS = os.path.join(APP_DIR, 'static', 'js', 'wire.js')
+
+# Médiane des décodages, fichiers passés en argument : <runs> <json> <compact>
+NODE_SCRIPT = r"""
+require(process.argv[1]);
+const fs = require('fs');
+const runs = parseInt(process.argv[2]);
+const plain = fs.readFileSync(process.argv[3], 'utf8');
+const compact = fs.readFileSync(process.argv[4], 'utf8');
+function median(fn) {
+    // Quelques passes pour que le JIT ait compilé le décodeur
+    for (let i = 0; i < 3; i++) fn();
+    const samples = [];
+    for (let i = 0; i < runs; i++) {
+        const start = process.hrtime.bigint();
+        fn();
+        samples.push(Number(process.hrtime.bigint() - start) / 1e6);
+    }
+    samples.sort((a, b) => a - b);
+    return samples[Math.floor(samples.length / 2)];
+}
+console.log(JSON.stringify({
+    json: median(() => JSON.parse(plain)),
+    compact: median(() => PoulstockWire.decodeData(JSON.parse(compact))),
+}));
+"""
+
+
+def reseed(db_path, n_products):
+    categories = max(n_products // 1000, 10)
+    conn = sqlite3.connect(db_path)
+    conn.execute('DELETE FROM products')
+    conn.execute('DELETE FROM categories')
+    conn.commit()
+    conn.close()
+    seed(db_path, categories, n_products // categories)
+    conn = sqlite3.connect(db_path)
+    # Comme en production : la plupart des produits héritent du seuil de leur catégorie
+    conn.execute('UPDATE products SET low_stock_threshold = NULL WHERE abs(random()) % 10 != 0')
+    # La révision change : le cache de /api/data ne resservira pas la taille précédente
+    conn.execute('UPDATE sync_state SET revision = revision + 1 WHERE id = 1')
+    conn.commit()
+    conn.close()
+
+
+def sizes(body):
+    row = {'brut': len(body), 'gzip': len(gzip.compress(body, compresslevel=6))}
+    if brotli is not None:
+        row['br'] = len(brotli.compress(body, quality=5))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--runs', type=int, default=9)
+    args = parser.parse_args()
+    node = shutil.which('node')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = load_app(db_path)
+        from routes.serializers import data_media_types
+        client = app.test_client()
+
+        for n_products in args.sizes:
+            reseed(db_path, n_products)
+            print(f"\n{n_products} produits")
+            bodies = {}
+            for media_type in data_media_types():
+                started = time.perf_counter()
+                response = client.get('/api/data', headers={'Accept': media_type})
+                elapsed = (time.perf_counter() - started) * 1000
+                bodies[media_type] = response.data
+                row = sizes(response.data)
+                cells = '  '.join(f"{k} {v / 1024:9.1f} Kio" for k, v in row.items())
+                print(f"  {media_type:<40} {cells}   (construction {elapsed:.0f} ms)")
+
+            if node is None:
+                print("  (node introuvable : décodage non mesuré)")
+                continue
+            plain_path = os.path.join(tmp, 'plain.json')
+            compact_path = os.path.join(tmp, 'compact.json')
+            with open(plain_path, 'wb') as f:
+                f.write(bodies['application/json'])
+            with open(compact_path, 'wb') as f:
+                f.write(bodies['application/vnd.poulstock.compact+json'])
+            out = subprocess.run(
+                [node, '-e', NODE_SCRIPT, WIRE_JS, str(args.runs), plain_path, compact_path],
+                check=True, capture_output=True, text=True,
+            )
+            timings = json.loads(out.stdout)
+            print(f"  décodage node (médiane) : JSON {timings['json']:.1f} ms, "
+                  f"compact + decodeData {timings['compact']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
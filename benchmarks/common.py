@@ -0,0 +1,81 @@
+"""Outils partagés par les benchmarks : base SQLite temporaire, données synthétiques, comptage SQL."""
+import os
+import random
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+# Le faux serveur SMTP (fake_smtp.py) est partagé avec les tests
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests')
+
+UNITS = ['', 'kg', 'g', 'L', 'pièces', 'sacs', 'boîtes']
+GROUPS = ['', '', '', 'Frais', 'Sec', 'Surgelé']
+
+
+def load_app(db_path):
+    """Importe l'application Flask pointée sur ``db_path`` (à appeler une seule fois par processus)."""
+    os.environ['STOCK_DB_PATH'] = db_path
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    import app as app_module
+    return app_module.app
+
+
+def seed(db_path, n_categories, n_products_per_category, seed_value=42):
+    """Remplit une base déjà initialisée (schéma créé par ``init_db``) en SQL brut."""
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany(
+        'INSERT INTO categories (id, name, icon, color, sort_order, low_stock_threshold, revision) '
+        'VALUES (?, ?, ?, ?, ?, 5, 0)',
+        [
+            (c, f'Catégorie {c:04d}', 'fa-solid fa-box', f'#{rng.randrange(0xFFFFFF):06x}', c)
+            for c in range(1, n_categories + 1)
+        ],
+    )
+
+    def rows():
+        for c in range(1, n_categories + 1):
+            for i in range(n_products_per_category):
+                yield (
+                    f'{c:04x}{i:06x}', c, f'Produit {c}-{i}', rng.randrange(0, 100),
+                    rng.choice(UNITS), '', rng.choice(GROUPS), 5,
+                )
+
+    conn.executemany(
+        'INSERT INTO products (id, category_id, name, qty, unit, note, grp, low_stock_threshold, '
+        'low_stock_alert_sent, revision) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0)',
+        rows(),
+    )
+    conn.commit()
+    conn.close()
+
+
+class QueryCounter:
+    """Compte les requêtes SQL émises par un moteur SQLAlchemy."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *_):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *_):
+        from sqlalchemy import event
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def timed(label, results):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
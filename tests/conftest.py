@@ -0,0 +1,40 @@
+"""Application pointée sur une base SQLite temporaire, importée une seule fois pour toute la session."""
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+_TMP = tempfile.mkdtemp(prefix='poulstock-tests-')
+DB_PATH = os.path.join(_TMP, 'stock.db')
+
+os.environ.update(
+    STOCK_DB_PATH=DB_PATH,
+    LOW_STOCK_SWEEP_INTERVAL='0',
+    SNAPSHOT_INTERVAL='0',
+    ALERT_POLL_INTERVAL='3600',
+    STREAM_POLL_INTERVAL='0.05',
+)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture(scope='session')
+def app():
+    import app as app_module
+    return app_module.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def raw_db():
+    """Connexion SQLite hors de l'application : simule un autre worker."""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    yield conn
+    conn.close()
@@ -0,0 +1,70 @@
+"""Serveur SMTP minimal pour les tests et les benchmarks : garde les messages en mémoire
+
+Accepte tout, sauf si ``reject`` est vrai : les envois sont alors refusés (451), pour
+simuler un relais indisponible. ``connections`` compte les connexions ouvertes.
+"""
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(line.encode('utf-8') + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self._reply('220 fake-smtp')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self._reply('250 fake-smtp')
+            elif command.startswith('MAIL') and self.server.reject:
+                self._reply('451 Relais indisponible')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self._reply('250 OK')
+            elif command == 'DATA':
+                self._reply('354 Fin par <CRLF>.<CRLF>')
+                body = []
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    body.append(data_line)
+                self.server.messages.append(b''.join(body))
+                self._reply('250 OK')
+            elif command == 'QUIT':
+                self._reply('221 Au revoir')
+                return
+            else:
+                self._reply('502 Commande non gérée')
+
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Handler)
+        self.messages = []
+        self.connections = 0
+        self.reject = False
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='fake-smtp', daemon=True).start()
+        return self
+
+    def env(self):
+        """Variables d'environnement pointant l'application sur ce serveur."""
+        return {
+            'ALERT_EMAIL': 'bench@example.invalid',
+            'SMTP_HOST': '127.0.0.1',
+            'SMTP_PORT': str(self.port),
+            'SMTP_USER': '',
+            'SMTP_STARTTLS': 'false',
+        }
@@ -0,0 +1,38 @@
+import itertools
+
+_names = itertools.count()
+
+
+def _product(client, qty):
+    cat_id = client.post('/api/categories', json={'name': f'Ajustements {next(_names)}'}).get_json()['id']
+    return client.post('/api/products', json={'category_id': cat_id, 'name': 'Farine', 'qty': qty}).get_json()['id']
+
+
+def _ledger(raw_db, prod_id):
+    return [row[0] for row in raw_db.execute(
+        "SELECT delta FROM stock_movements WHERE product_id = ? AND reason = 'adjust' ORDER BY id", (prod_id,),
+    )]
+
+
+def test_adjust_to_exactly_zero_is_applied(client, raw_db):
+    prod_id = _product(client, 3)
+    response = client.post(f'/api/products/{prod_id}/adjust', json={'delta': -3})
+    assert response.status_code == 200
+    assert response.get_json()['qty'] == 0
+    assert _ledger(raw_db, prod_id) == [-3]
+
+
+def test_adjust_below_zero_is_refused_and_nothing_is_recorded(client, raw_db):
+    prod_id = _product(client, 3)
+    revision = client.get('/api/changes').get_json()['revision']
+
+    response = client.post(f'/api/products/{prod_id}/adjust', json={'delta': -5})
+    assert response.status_code == 409
+    assert response.get_json()['qty'] == 3
+    assert raw_db.execute('SELECT qty FROM products WHERE id = ?', (prod_id,)).fetchone()[0] == 3
+    assert _ledger(raw_db, prod_id) == []
+    assert client.get('/api/changes').get_json()['revision'] == revision
+
+
+def test_adjust_unknown_product_is_not_found(client):
+    assert client.post('/api/products/inconnu/adjust', json={'delta': -1}).status_code == 404
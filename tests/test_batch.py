@@ -0,0 +1,55 @@
+import itertools
+
+from sqlalchemy.exc import IntegrityError
+
+import routes.batch
+
+_names = itertools.count()
+
+
+def _revision(client):
+    return client.get('/api/changes').get_json()['revision']
+
+
+def _batch(client, *operations):
+    return client.post('/api/batch', json={'operations': list(operations)})
+
+
+def test_batch_without_effect_does_not_advance_the_revision(client):
+    revision = _revision(client)
+    response = _batch(client, {'op': 'inconnue'}, {'op': 'delete_product', 'id': 'absent'})
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == [400, 200]
+    assert response.get_json()['revision'] == revision
+    assert _revision(client) == revision
+
+
+def test_failed_first_op_does_not_lose_the_revision_of_the_next(client, raw_db):
+    revision = _revision(client)
+    name = f'Lot {next(_names)}'
+    response = _batch(
+        client,
+        {'op': 'create_category', 'data': {'name': ''}},
+        {'op': 'create_category', 'data': {'name': name}},
+    )
+    assert [result['status'] for result in response.get_json()['results']] == [400, 201]
+    assert _revision(client) == revision + 1
+    cat_id = raw_db.execute('SELECT id FROM categories WHERE name = ?', (name,)).fetchone()[0]
+    changes = raw_db.execute(
+        "SELECT revision FROM changes WHERE entity = 'category' AND entity_id = ?", (str(cat_id),),
+    ).fetchall()
+    assert changes == [(revision + 1,)]
+
+
+def test_database_error_fails_only_its_own_op(client, monkeypatch):
+    def conflict(op):
+        raise IntegrityError('INSERT', {}, Exception('UNIQUE constraint failed'))
+
+    monkeypatch.setitem(routes.batch.OPERATIONS, 'conflit', conflict)
+    response = _batch(
+        client,
+        {'op': 'conflit'},
+        {'op': 'create_category', 'data': {'name': f'Lot {next(_names)}'}},
+    )
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == [409, 201]
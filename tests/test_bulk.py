@@ -0,0 +1,77 @@
+import types
+import uuid
+
+import routes.bulk
+
+
+def _category(client, name):
+    return client.post('/api/categories', json={'name': name}).get_json()['id']
+
+
+def _import_csv(client, *rows, header='category_id,name,qty'):
+    return client.post('/api/products/bulk', data='\n'.join([header, *rows]).encode(), content_type='text/csv')
+
+
+def test_generated_id_collision_never_overwrites_an_existing_product(client, raw_db, monkeypatch):
+    cat_id = _category(client, 'Import conflit')
+    taken = uuid.UUID(int=2)
+    raw_db.execute(
+        "INSERT INTO products (id, category_id, name, qty, unit, revision) VALUES (?, ?, 'Déjà là', 1, '', 0)",
+        (taken.hex, cat_id),
+    )
+    raw_db.commit()
+    # La 2e ligne tire l'id d'un produit existant ; le lot est réécrit avec de nouveaux ids
+    ids = iter([uuid.UUID(int=n) for n in (1, 2, 3, 4, 5, 6)])
+    monkeypatch.setattr(routes.bulk, 'uuid', types.SimpleNamespace(uuid4=lambda: next(ids)))
+
+    body = _import_csv(client, f'{cat_id},A,1', f'{cat_id},B,2', f'{cat_id},C,3').get_json()
+    assert body['inserted'] == 3 and body['error_count'] == 0
+    rows = dict(raw_db.execute('SELECT id, name FROM products WHERE category_id = ?', (cat_id,)))
+    assert rows[taken.hex] == 'Déjà là'
+    assert sorted(rows.values()) == ['A', 'B', 'C', 'Déjà là']
+
+
+def test_write_conflict_is_reported_per_line_and_the_rest_is_written(client, raw_db, monkeypatch):
+    cat_id = _category(client, 'Import partiel')
+    other = _category(client, 'Supprimée pendant import')
+    # Catégorie supprimée après validation : seule la ligne qui la vise est refusée
+    original = routes.bulk._validate
+
+    def validate_then_delete(record, *args):
+        row = original(record, *args)
+        if record['name'] == 'B':
+            raw_db.execute('DELETE FROM categories WHERE id = ?', (other,))
+            raw_db.commit()
+        return row
+
+    monkeypatch.setattr(routes.bulk, '_validate', validate_then_delete)
+    response = _import_csv(client, f'{cat_id},A,1', f'{other},B,2', f'{cat_id},C,3')
+    body = response.get_json()
+    assert response.status_code == 207, body
+    assert body['inserted'] == 2
+    assert [error['line'] for error in body['errors']] == [3]
+
+
+def test_reimporting_an_export_updates_instead_of_duplicating(client, raw_db):
+    cat_id = _category(client, 'Aller-retour')
+    product = client.post('/api/products', json={'category_id': cat_id, 'name': 'Lait', 'qty': 4}).get_json()
+    exported = client.get('/api/export?format=csv').data.decode()
+    count = raw_db.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    edited = exported.replace(f'{product["id"]},{cat_id},Aller-retour,Lait,4,', f'{product["id"]},{cat_id},Aller-retour,Lait,9,')
+    response = client.post('/api/products/bulk', data=edited.encode(), content_type='text/csv')
+    body = response.get_json()
+    assert response.status_code == 200, body
+    assert body['inserted'] == 0 and body['updated'] == count
+    assert raw_db.execute('SELECT COUNT(*) FROM products').fetchone()[0] == count
+    assert raw_db.execute('SELECT qty FROM products WHERE id = ?', (product['id'],)).fetchone()[0] == 9
+    deltas = raw_db.execute(
+        "SELECT delta FROM stock_movements WHERE product_id = ? AND reason = 'import'", (product['id'],),
+    ).fetchall()
+    assert deltas == [(5,)]
+
+
+def test_empty_import_returns_the_current_revision(client):
+    revision = client.get('/api/changes').get_json()['revision']
+    body = _import_csv(client).get_json()
+    assert body['inserted'] == 0 and body['revision'] == revision
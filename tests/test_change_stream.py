@@ -0,0 +1,38 @@
+import threading
+import time
+
+from change_stream import broker_for
+
+
+def _next_chunk(response, timeout):
+    """Prochain morceau du flux SSE, ou None s'il n'arrive pas avant ``timeout`` secondes."""
+    chunks = []
+    reader = threading.Thread(target=lambda: chunks.append(next(response.response)), daemon=True)
+    reader.start()
+    reader.join(timeout)
+    return chunks[0] if chunks else None
+
+
+def _revision(client):
+    return client.get('/api/changes').get_json()['revision']
+
+
+def test_stream_delivers_other_worker_writes_after_all_streams_closed(client, raw_db):
+    revision = _revision(client)
+    first = client.get(f'/api/stream?since={revision}', buffered=False)
+    assert _next_chunk(first, 2).startswith(b'retry:')
+    first.close()
+    assert broker_for(None).subscribers == 0
+
+    # Plus personne n'écoute : le poller s'endort ; une nouvelle connexion doit le réveiller
+    time.sleep(0.2)
+    stream = client.get(f'/api/stream?since={revision}', buffered=False)
+    try:
+        assert _next_chunk(stream, 2).startswith(b'retry:')
+        raw_db.execute('UPDATE sync_state SET revision = revision + 1 WHERE id = 1')
+        raw_db.commit()
+        chunk = _next_chunk(stream, 3)
+        assert chunk is not None, "révision d'un autre worker jamais diffusée"
+        assert f'id: {revision + 1}\n'.encode() in chunk
+    finally:
+        stream.close()
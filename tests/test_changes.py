@@ -0,0 +1,25 @@
+import itertools
+
+_names = itertools.count()
+
+
+def _revision(client):
+    return client.get('/api/changes').get_json()['revision']
+
+
+def test_pruned_history_sends_old_clients_to_a_full_reload(client, raw_db, monkeypatch):
+    monkeypatch.setenv('CHANGES_RETENTION', '5')
+    monkeypatch.setenv('CHANGES_PRUNE_EVERY', '1')
+    cat_id = client.post('/api/categories', json={'name': f'Journal {next(_names)}'}).get_json()['id']
+    old = _revision(client)
+    for i in range(8):
+        client.post('/api/products', json={'category_id': cat_id, 'name': f'Produit {i}', 'qty': i})
+    current = _revision(client)
+
+    assert raw_db.execute('SELECT COUNT(*) FROM changes WHERE revision <= ?', (current - 5,)).fetchone()[0] == 0
+    assert raw_db.execute('SELECT pruned_revision FROM sync_state').fetchone()[0] == current - 5
+
+    assert client.get(f'/api/changes?since={old}').get_json() == {'reset': True, 'revision': current}
+    recent = client.get(f'/api/changes?since={current - 2}').get_json()
+    assert 'reset' not in recent
+    assert len(recent['products']) == 2
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from email import message_from_bytes, policy
+
+import pytest
+
+from email_alerts import AlertDispatcher, queue_low_stock_alerts
+from fake_smtp import FakeSmtpServer
+from models import db
+from models.db import utcnow
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    server = FakeSmtpServer().start()
+    for name, value in server.env().items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv('ALERT_DIGEST_WINDOW', '0')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(app, raw_db):
+    """File vide au départ (les autres tests y laissent leurs alertes), puis contexte d'application."""
+    raw_db.execute('DELETE FROM alert_outbox')
+    raw_db.commit()
+    with app.app_context():
+        yield
+        db.session.remove()
+
+
+def _queue(*names):
+    queue_low_stock_alerts([
+        {'product_id': name, 'product_name': name, 'category_name': 'Épicerie', 'qty': 1, 'unit': 'kg', 'threshold': 5}
+        for name in names
+    ])
+    db.session.commit()
+
+
+def _dispatcher(app, **settings):
+    dispatcher = AlertDispatcher(app)
+    for name, value in settings.items():
+        setattr(dispatcher, name, value)
+    return dispatcher
+
+
+def test_alerts_of_one_window_are_sent_as_one_digest(app, smtp, outbox, raw_db):
+    _queue('Riz', 'Pâtes', 'Farine')
+    dispatcher = _dispatcher(app, digest_window=30)
+
+    # Plus récente que la fenêtre : on attend d'autres alertes
+    assert dispatcher.flush() == 0
+    assert smtp.messages == []
+
+    dispatcher.digest_window = 0
+    assert dispatcher.flush() == 3
+    assert len(smtp.messages) == 1
+    message = message_from_bytes(smtp.messages[0], policy=policy.default)
+    assert message['Subject'] == '[Poulstock] Stock faible — 3 produits'
+    body = message.get_body().get_content()
+    assert all(name in body for name in ('Riz', 'Pâtes', 'Farine'))
+    assert raw_db.execute('SELECT COUNT(*) FROM alert_outbox').fetchone()[0] == 0
+
+
+def test_outbox_survives_a_dispatcher_restart(app, smtp, outbox, raw_db):
+    _queue('Sel')
+    first = _dispatcher(app, digest_window=30)
+    assert first.flush() == 0
+    first.stop()
+
+    # Lot réclamé par un worker mort depuis : repris une fois retry_delay écoulé
+    _queue('Sucre')
+    raw_db.execute(
+        "UPDATE alert_outbox SET claimed_by = 'mort:1', claimed_at = ? WHERE product_id = 'Sucre'",
+        ((utcnow() - timedelta(seconds=120)).isoformat(' '),),
+    )
+    raw_db.commit()
+
+    restarted = _dispatcher(app, digest_window=0, retry_delay=60)
+    assert restarted.flush() == 2
+    assert len(smtp.messages) == 1
+
+
+def test_failed_send_is_released_and_retried_after_the_delay(app, smtp, outbox, raw_db):
+    _queue('Huile')
+    dispatcher = _dispatcher(app, digest_window=0, retry_delay=60)
+
+    smtp.reject = True
+    assert dispatcher.flush() == 0
+    claimed_by, attempts = raw_db.execute('SELECT claimed_by, attempts FROM alert_outbox').fetchone()
+    assert claimed_by is None
+    assert attempts == 1
+
+    smtp.reject = False
+    # Pas avant retry_delay
+    assert dispatcher.flush() == 0
+    assert smtp.messages == []
+
+    dispatcher.retry_delay = 0
+    assert dispatcher.flush() == 1
+    assert len(smtp.messages) == 1
+
+
+def test_smtp_connection_is_reused_across_batches(app, smtp, outbox):
+    dispatcher = _dispatcher(app, digest_window=0)
+    _queue('Thé')
+    assert dispatcher.flush() == 1
+    _queue('Café')
+    assert dispatcher.flush() == 1
+
+    assert len(smtp.messages) == 2
+    assert smtp.connections == 1
+    dispatcher._link.close()
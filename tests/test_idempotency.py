@@ -0,0 +1,71 @@
+import itertools
+import uuid
+
+_names = itertools.count()
+
+
+def _category(client):
+    return client.post('/api/categories', json={'name': f'Rejeu {next(_names)}'}).get_json()['id']
+
+
+def _key():
+    return uuid.uuid4().hex
+
+
+def test_replayed_create_returns_the_stored_response_without_a_second_product(client, raw_db):
+    cat_id = _category(client)
+    headers = {'Idempotency-Key': _key()}
+    body = {'category_id': cat_id, 'name': 'Huile', 'qty': 2}
+
+    first = client.post('/api/products', json=body, headers=headers)
+    second = client.post('/api/products', json=body, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert 'Idempotent-Replayed' not in first.headers
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.get_json() == first.get_json()
+    assert raw_db.execute('SELECT COUNT(*) FROM products WHERE category_id = ?', (cat_id,)).fetchone()[0] == 1
+
+
+def test_key_reused_on_another_path_is_refused(client):
+    cat_id = _category(client)
+    headers = {'Idempotency-Key': _key()}
+    client.post('/api/products', json={'category_id': cat_id, 'name': 'Vinaigre'}, headers=headers)
+
+    response = client.post('/api/categories', json={'name': f'Autre {next(_names)}'}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_key_longer_than_255_characters_is_refused(client):
+    response = client.post('/api/categories', json={'name': f'Long {next(_names)}'},
+                           headers={'Idempotency-Key': 'k' * 256})
+    assert response.status_code == 400
+
+
+def test_failed_write_does_not_store_its_key(client, raw_db):
+    cat_id = _category(client)
+    key = _key()
+
+    failed = client.post('/api/products', json={'category_id': cat_id, 'name': ''}, headers={'Idempotency-Key': key})
+    assert failed.status_code == 400
+    assert raw_db.execute('SELECT COUNT(*) FROM idempotency_keys WHERE key = ?', (key,)).fetchone()[0] == 0
+
+    # Corrigée, la même requête s'exécute pour de bon
+    retried = client.post('/api/products', json={'category_id': cat_id, 'name': 'Moutarde'},
+                          headers={'Idempotency-Key': key})
+    assert retried.status_code == 201
+    assert 'Idempotent-Replayed' not in retried.headers
+
+
+def test_batch_replays_its_stored_response(client, raw_db):
+    name = f'Lot rejoué {next(_names)}'
+    headers = {'Idempotency-Key': _key()}
+    payload = {'operations': [{'op': 'create_category', 'data': {'name': name}}]}
+
+    first = client.post('/api/batch', json=payload, headers=headers)
+    second = client.post('/api/batch', json=payload, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.get_json() == first.get_json()
+    assert raw_db.execute('SELECT COUNT(*) FROM categories WHERE name = ?', (name,)).fetchone()[0] == 1
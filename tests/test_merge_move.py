@@ -0,0 +1,64 @@
+import itertools
+
+_names = itertools.count()
+
+
+def test_non_object_payloads_are_rejected(client):
+    cat_id = client.post('/api/categories', json={'name': f'Forme {next(_names)}'}).get_json()['id']
+    assert client.put('/api/categories/reorder', json=[1, 2]).status_code == 400
+    assert client.post(f'/api/categories/{cat_id}/merge', json=[]).status_code == 400
+    assert client.post('/api/products/move', json=[]).status_code == 400
+
+
+def _category(client, threshold=None):
+    cat_id = client.post('/api/categories', json={'name': f'Rangement {next(_names)}'}).get_json()['id']
+    if threshold is not None:
+        client.put(f'/api/categories/{cat_id}/threshold', json={'low_stock_threshold': threshold})
+    return cat_id
+
+
+def _product(client, cat_id, qty=10):
+    return client.post('/api/products', json={'category_id': cat_id, 'name': 'Pâtes', 'qty': qty}).get_json()['id']
+
+
+def test_merge_moves_products_and_deletes_the_source(client, raw_db):
+    source, target = _category(client), _category(client)
+    products = {_product(client, source), _product(client, source)}
+    revision = client.get('/api/changes').get_json()['revision']
+
+    response = client.post(f'/api/categories/{source}/merge', json={'into': target})
+    assert response.status_code == 200
+    assert response.get_json()['moved'] == 2
+
+    assert raw_db.execute('SELECT COUNT(*) FROM categories WHERE id = ?', (source,)).fetchone()[0] == 0
+    delta = client.get(f'/api/changes?since={revision}').get_json()
+    assert delta['deleted']['categories'] == [source]
+    assert {p['id'] for p in delta['products']} == products
+    assert {p['category_id'] for p in delta['products']} == {target}
+
+
+def test_moved_products_follow_the_target_threshold(client):
+    source, target = _category(client, threshold=2), _category(client, threshold=10)
+    prod_id = _product(client, source, qty=4)
+    assert prod_id not in {p['id'] for p in client.get('/api/low-stock').get_json()}
+
+    response = client.post('/api/products/move', json={'category_id': target, 'product_ids': [prod_id]})
+    assert response.status_code == 200
+
+    low = {p['id']: p for p in client.get('/api/low-stock').get_json()}
+    assert low[prod_id]['threshold'] == 10
+    assert low[prod_id]['category_id'] == target
+
+
+def test_move_skips_products_already_in_target_and_caps_the_list(client, monkeypatch):
+    import routes.api
+
+    source, target = _category(client), _category(client)
+    outside, inside = _product(client, source), _product(client, target)
+
+    response = client.post('/api/products/move', json={'category_id': target, 'product_ids': [outside, inside]})
+    assert response.get_json()['moved'] == 1
+
+    monkeypatch.setattr(routes.api, 'MAX_MOVE_PRODUCTS', 2)
+    response = client.post('/api/products/move', json={'category_id': target, 'product_ids': ['a', 'b', 'c']})
+    assert response.status_code == 413
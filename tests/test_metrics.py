@@ -0,0 +1,50 @@
+import cProfile
+import sys
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine
+
+import metrics
+
+
+def test_profiler_is_stopped_when_the_request_raises(monkeypatch, tmp_path):
+    monkeypatch.setenv('PROFILE_SLOW_REQUESTS_MS', '0')
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    app = Flask(__name__)
+    # L'exception remonte sans passer par after_request (comme en mode debug)
+    app.testing = True
+
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+
+    @app.route('/ok')
+    def ok():
+        return 'ok'
+
+    metrics.init_metrics(app, create_engine('sqlite://'))
+    client = app.test_client()
+
+    with pytest.raises(RuntimeError):
+        client.get('/boom')
+    # Plus aucun profileur actif dans ce thread : le suivant peut démarrer
+    assert sys.getprofile() is None
+    probe = cProfile.Profile()
+    probe.enable()
+    probe.disable()
+
+    assert client.get('/ok').status_code == 200
+    assert len(list(tmp_path.glob('*-ok-*.prof'))) == 1
+
+
+def test_health_hides_the_database_error(client, monkeypatch):
+    from models import db
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('/srv/secret/stock.db: disk I/O error')
+
+    monkeypatch.setattr(db.session, 'execute', fail)
+    response = client.get('/health')
+    assert response.status_code == 503
+    assert response.get_json() == {'status': 'error', 'database': 'unavailable'}
@@ -0,0 +1,60 @@
+import base64
+import itertools
+
+_names = itertools.count()
+
+
+def _category(client, threshold=None):
+    cat_id = client.post('/api/categories', json={'name': f'Liste {next(_names)}'}).get_json()['id']
+    if threshold is not None:
+        client.put(f'/api/categories/{cat_id}/threshold', json={'low_stock_threshold': threshold})
+    return cat_id
+
+
+def _cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def test_page_walk_returns_every_product_once(client):
+    cat_id = _category(client)
+    created = {
+        client.post('/api/products', json={'category_id': cat_id, 'name': f'P{i}', 'qty': i}).get_json()['id']
+        for i in range(23)
+    }
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = f'/api/products?category_id={cat_id}&limit=5' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        seen += [p['id'] for p in body['products']]
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert pages == 5
+    assert len(seen) == len(set(seen))
+    assert set(seen) == created
+    assert seen == sorted(seen)
+
+
+def test_low_stock_and_fields_filters(client):
+    cat_id = _category(client, threshold=3)
+    low = client.post('/api/products', json={'category_id': cat_id, 'name': 'Bas', 'qty': 1}).get_json()['id']
+    client.post('/api/products', json={'category_id': cat_id, 'name': 'Plein', 'qty': 50})
+
+    body = client.get(f'/api/products?category_id={cat_id}&low_stock=1&fields=id,qty').get_json()
+    assert body['products'] == [{'id': low, 'qty': 1}]
+    assert body['next_cursor'] is None
+
+    response = client.get('/api/products?fields=id,price')
+    assert response.status_code == 400
+
+
+def test_malformed_cursors_are_rejected(client):
+    for raw in ('null', '5', '{}', '[1]', '[1, 2, 3]', '[true, "a"]', '["1", "a"]', '[1, 2]'):
+        response = client.get(f'/api/products?cursor={_cursor(raw)}')
+        assert response.status_code == 400, raw
+        assert response.get_json() == {'error': 'Curseur invalide'}
+    for cursor in ('!!!', 'bm90IGpzb24'):
+        assert client.get(f'/api/products?cursor={cursor}').status_code == 400
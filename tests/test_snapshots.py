@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+
+import snapshots
+
+
+def test_concurrent_snapshots_of_one_database_are_all_complete(monkeypatch, tmp_path):
+    monkeypatch.setenv('SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setenv('SNAPSHOT_KEEP', '0')
+    db_path = str(tmp_path / 'site.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE products (id TEXT PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO products VALUES (?, ?)', [(str(i), 'x' * 200) for i in range(5000)])
+    conn.commit()
+    conn.close()
+
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def snapshot():
+        barrier.wait()
+        try:
+            snapshots.take_snapshot(db_path, 'site')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=snapshot) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert not [name for name in os.listdir(tmp_path / 'snapshots') if name.endswith('.part')]
+    taken = snapshots.list_snapshots(db_path, 'site')
+    assert len(taken) == 4
+    for _, path in taken:
+        copy = sqlite3.connect(path)
+        assert copy.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 5000
+        assert copy.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        copy.close()
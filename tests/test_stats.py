@@ -0,0 +1,55 @@
+import itertools
+from datetime import date
+
+from models import db, record_movements
+
+_names = itertools.count()
+
+
+def _product(client, qty):
+    cat_id = client.post('/api/categories', json={'name': f'Conso {next(_names)}'}).get_json()['id']
+    prod_id = client.post('/api/products', json={'category_id': cat_id, 'name': 'Lait', 'qty': qty}).get_json()['id']
+    return cat_id, prod_id
+
+
+def _daily(raw_db, prod_id):
+    return raw_db.execute(
+        'SELECT day, consumed, added, movements FROM stock_daily WHERE product_id = ?', (prod_id,),
+    ).fetchall()
+
+
+def test_movements_roll_up_into_daily_totals_and_stats(client, raw_db):
+    cat_id, prod_id = _product(client, 10)
+    for delta in (-3, -2, 4):
+        assert client.post(f'/api/products/{prod_id}/adjust', json={'delta': delta}).status_code == 200
+    # Retrait par le formulaire produit (PUT) : de la consommation aussi
+    assert client.put(f'/api/products/{prod_id}', json={'qty': 7}).status_code == 200
+
+    today = date.today().isoformat()
+    assert _daily(raw_db, prod_id) == [(today, 7, 14, 5)]
+
+    series = client.get(f'/api/stats/consumption?product_id={prod_id}&days=7').get_json()['series']
+    assert len(series) == 7
+    assert series[-1] == {'day': today, 'consumed': 7, 'added': 14}
+    assert all(point['consumed'] == point['added'] == 0 for point in series[:-1])
+    by_category = client.get(f'/api/stats/consumption?category_id={cat_id}&days=1').get_json()['series']
+    assert by_category == [{'day': today, 'consumed': 7, 'added': 14}]
+
+    movers = client.get('/api/stats/top-movers?days=1&limit=100').get_json()['products']
+    assert {'id': prod_id, 'name': 'Lait', 'category_id': cat_id, 'consumed': 7, 'added': 14} in movers
+
+    forecast = {p['id']: p for p in client.get(f'/api/stats/forecast?category_id={cat_id}').get_json()['products']}
+    # Suivi depuis aujourd'hui seulement : 7 consommés sur 1 jour observé, 7 en stock
+    assert forecast[prod_id]['daily_consumption'] == 7
+    assert forecast[prod_id]['days_left'] == 1
+
+
+def test_restore_movements_stay_out_of_the_rollup(app, client, raw_db):
+    cat_id, prod_id = _product(client, 10)
+    with app.app_context():
+        record_movements([{'product_id': prod_id, 'category_id': cat_id, 'delta': -6, 'qty_after': 4}], 'restore')
+        db.session.commit()
+
+    assert _daily(raw_db, prod_id) == [(date.today().isoformat(), 0, 10, 1)]
+    reasons = client.get(f'/api/products/{prod_id}/movements').get_json()['movements']
+    assert [(m['reason'], m['delta']) for m in reasons] == [('restore', -6), ('create', 10)]
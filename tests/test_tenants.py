@@ -0,0 +1,40 @@
+import pytest
+
+import tenants
+from snapshots import SnapshotWorker, list_snapshots
+
+
+@pytest.fixture
+def site_pool(app, tmp_path, monkeypatch):
+    """Quatre sites sur disque, LRU de deux moteurs : les deux derniers créés sont ouverts."""
+    pool = tenants.EnginePool(str(tmp_path), 2, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    for key in ('a', 'b', 'c', 'd'):
+        pool.get(key)
+    monkeypatch.setattr(tenants, 'pool', pool)
+    monkeypatch.setenv('SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    yield pool
+    pool.dispose_all()
+
+
+def test_report_reads_every_site_without_cycling_the_pool(client, site_pool):
+    body = client.get('/api/tenants/report').get_json()
+    assert [site['tenant'] for site in body['tenants']] == ['a', 'b', 'c', 'd']
+    assert body['failed'] == 0
+    assert site_pool.open_keys() == ['c', 'd']
+
+
+def test_open_only_context_never_opens_a_site(app, site_pool):
+    assert tenants.open_tenants() == ['c', 'd']
+    with tenants.tenant_context(app, 'a', open_only=True) as is_open:
+        assert is_open is False
+    with tenants.tenant_context(app, 'c', open_only=True) as is_open:
+        assert is_open is True
+    assert site_pool.open_keys() == ['d', 'c']
+
+
+def test_snapshot_worker_skips_unchanged_sites_without_opening_them(app, site_pool):
+    worker = SnapshotWorker(app)
+    assert worker.snapshot('a') is not None
+    assert worker.snapshot('a') is None
+    assert len(list_snapshots(site_pool.path('a'), 'a')) == 1
+    assert site_pool.open_keys() == ['c', 'd']
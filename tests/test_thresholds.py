@@ -0,0 +1,56 @@
+import itertools
+
+_names = itertools.count()
+
+
+def test_product_threshold_can_be_cleared_to_inherit_the_category(client):
+    cat_id = client.post('/api/categories', json={'name': f'Seuils {next(_names)}'}).get_json()['id']
+    client.put(f'/api/categories/{cat_id}/threshold', json={'low_stock_threshold': 10})
+    prod_id = client.post('/api/products', json={'category_id': cat_id, 'name': 'Sel', 'qty': 8}).get_json()['id']
+
+    assert client.put(f'/api/products/{prod_id}/threshold', json={'low_stock_threshold': 2}).status_code == 200
+    response = client.put(f'/api/products/{prod_id}/threshold', json={'low_stock_threshold': None})
+    assert response.status_code == 200
+
+    category = next(c for c in client.get('/api/data').get_json() if c['id'] == cat_id)
+    product = next(p for p in category['products'] if p['id'] == prod_id)
+    assert product['low_stock_threshold'] is None
+    # Seuil de la catégorie (10) de nouveau appliqué : 8 est en stock faible
+    low = {p['id']: p['threshold'] for p in client.get('/api/low-stock').get_json()}
+    assert low[prod_id] == 10
+
+
+def test_upgrade_turns_legacy_default_thresholds_into_inherited_ones(tmp_path):
+    import sqlite3
+
+    from sqlalchemy import create_engine
+
+    from models import migrate, schema_version
+    from models.migrations import MIGRATIONS
+
+    path = str(tmp_path / 'legacy.db')
+    migrate(create_engine(f'sqlite:///{path}'))
+    conn = sqlite3.connect(path)
+    # Base telle que l'ancien code la laissait : 5 écrit dans chaque produit
+    conn.executescript("""
+        INSERT INTO categories (id, name, icon, color, sort_order, low_stock_threshold, revision)
+        VALUES (1, 'Épicerie', 'fa-box', '#000000', 0, 10, 0);
+        INSERT INTO products (id, category_id, name, qty, unit, note, grp, low_stock_threshold, low_stock_alert_sent, revision)
+        VALUES ('legacy', 1, 'Riz', 8, 'kg', '', '', 5, 0, 0),
+               ('own', 1, 'Sucre', 8, 'kg', '', '', 3, 0, 0);
+    """)
+    index = [fn.__name__ for fn in MIGRATIONS].index('inherit_default_thresholds')
+    conn.execute(f'PRAGMA user_version = {index}')
+    conn.commit()
+
+    migrate(create_engine(f'sqlite:///{path}'))
+
+    products = dict(conn.execute('SELECT id, low_stock_threshold FROM products').fetchall())
+    assert products == {'legacy': None, 'own': 3}
+    flags = dict(conn.execute('SELECT id, low_stock_alert_sent FROM products').fetchall())
+    assert flags == {'legacy': 1, 'own': 0}
+    assert conn.execute('SELECT product_id, threshold FROM alert_outbox').fetchall() == [('legacy', 10)]
+    revision = conn.execute('SELECT revision FROM sync_state').fetchone()[0]
+    assert conn.execute('SELECT entity_id FROM changes WHERE revision = ?', (revision,)).fetchall() == [('legacy',)]
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == schema_version()
+    conn.close()